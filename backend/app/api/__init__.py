@@ -4,5 +4,6 @@ API routes for the Document Brand Detection System.
 
 from .documents import router as documents_router
 from .health import router as health_router
+from .local_batch import router as local_batch_router
 
-__all__ = ["documents_router", "health_router"]
+__all__ = ["documents_router", "health_router", "local_batch_router"]
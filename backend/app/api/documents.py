@@ -5,7 +5,7 @@ Document management API endpoints.
 import logging
 import os
 from typing import List
-from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks, Query
 from fastapi.responses import StreamingResponse
 import asyncio
 
@@ -14,6 +14,8 @@ from ..models.processing_status import ProcessingStatus
 from ..models.brand_detection import BrandReviewUpdate
 from ..services.processing_service import processing_service
 from ..services.firebase_service import firebase_service
+from ..services.brand_knowledge_base import REVIEW_VERDICTS, brand_knowledge_base
+from ..services.brand_canonicalizer import brand_canonicalizer
 from ..services.excel_service import ExcelService
 from ..config import settings
 
@@ -23,6 +25,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
+PROCESSING_CLASSES = ("interactive", "batch")
+
 
 def validate_file_size(file_size: int) -> None:
     """Validate file size."""
@@ -52,7 +56,9 @@ def validate_file_extension(filename: str) -> None:
     logger.info(f"File extension validation passed: {file_ext}")
 
 
-async def _process_document_safely(document_id: str, file_content: bytes, filename: str):
+async def _process_document_safely(
+    document_id: str, file_content: bytes, filename: str, processing_class: str = "interactive"
+):
     """
     Safely process document with proper error handling to prevent application exit.
     
@@ -60,11 +66,12 @@ async def _process_document_safely(document_id: str, file_content: bytes, filena
         document_id: Document ID
         file_content: PDF file content
         filename: Original filename
+        processing_class: "interactive" or "batch"
     """
     try:
         logger.info(f"Starting safe async document processing: {document_id}")
         await processing_service.process_document_async(
-            document_id, file_content, filename
+            document_id, file_content, filename, processing_class
         )
         logger.info(f"Safe async document processing completed successfully: {document_id}")
     except Exception as e:
@@ -83,7 +90,8 @@ async def _process_document_safely(document_id: str, file_content: bytes, filena
 @router.post("/upload", response_model=Document)
 async def upload_document(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None
+    background_tasks: BackgroundTasks = None,
+    processing_class: str = Query("interactive", description="interactive, or batch for non-urgent documents (results within hours)")
 ) -> Document:
     """
     Upload a PDF document for brand detection analysis.
@@ -92,6 +100,7 @@ async def upload_document(
     Args:
         file: PDF file to upload
         background_tasks: FastAPI background tasks
+        processing_class: "interactive" or "batch"
 
     Returns:
         Document object with processing status
@@ -101,6 +110,12 @@ async def upload_document(
         logger.info(f"File size: {file.size} bytes")
         logger.info(f"Content type: {file.content_type}")
 
+        if processing_class not in PROCESSING_CLASSES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid processing class. Allowed values: {', '.join(PROCESSING_CLASSES)}",
+            )
+
         # Validate file
         logger.info("Validating file extension")
         validate_file_extension(file.filename)
@@ -127,13 +142,13 @@ async def upload_document(
         if background_tasks:
             logger.info("Starting async document processing with FastAPI background tasks")
             background_tasks.add_task(
-                _process_document_safely, document.id, file_content, file.filename
+                _process_document_safely, document.id, file_content, file.filename, processing_class
             )
         else:
             # Fallback to manual task creation with proper error handling
             logger.info("Starting async document processing with manual task creation")
             task = asyncio.create_task(
-                _process_document_safely(document.id, file_content, file.filename)
+                _process_document_safely(document.id, file_content, file.filename, processing_class)
             )
             
             # Add simple error callback to prevent task exceptions from crashing the app
@@ -279,15 +294,16 @@ async def get_document_summary(document_id: str) -> dict:
                 "status": document.status
             }
         else:
-            # Generate basic summary from results
-            all_brands = set()
-            for result in document.results or []:
-                all_brands.update(result.brands_detected)
+            # Generate basic summary from results, keyed by canonical brand
+            canonical_brands = brand_canonicalizer.cluster(
+                {result.page_number: result.brands_detected for result in document.results or []}
+            )
             
             basic_summary = {
                 "total_pages": document.total_pages,
-                "total_unique_brands": len(all_brands),
-                "all_detected_brands": sorted(list(all_brands)),
+                "total_unique_brands": len(canonical_brands),
+                "all_detected_brands": [brand.name for brand in canonical_brands],
+                "canonical_brands": {brand.brand_id: brand.to_dict() for brand in canonical_brands},
                 "status": document.status
             }
             
@@ -399,7 +415,10 @@ async def update_brand_review_status(
     document_id: str, review_update: BrandReviewUpdate
 ) -> dict:
     """
-    Update the review status of a detected brand.
+    Update the review status of a detected brand and record an explicit verdict in the brand knowledge base.
+
+    The review is propagated to every spelling of the same canonical brand in the document
+    unless propagate_aliases is false.
 
     Args:
         document_id: Document ID
@@ -408,6 +427,12 @@ async def update_brand_review_status(
     Returns:
         Success message
     """
+    if review_update.verdict is not None and review_update.verdict not in REVIEW_VERDICTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid verdict '{review_update.verdict}'. Expected one of: {', '.join(REVIEW_VERDICTS)}",
+        )
+
     try:
         # Validate that the document exists
         document = await firebase_service.get_document(document_id)
@@ -425,9 +450,57 @@ async def update_brand_review_status(
         if not success:
             raise HTTPException(status_code=404, detail="Brand not found in document")
 
+        # Apply the same review to the other spellings of this canonical brand
+        canonical_name = review_update.canonical_brand
+        alias_pages = {}
+        if review_update.propagate_aliases:
+            results = document.results or []
+            canonical_brands = brand_canonicalizer.cluster(
+                {result.page_number: result.brands_detected for result in results}
+            )
+            canonical = brand_canonicalizer.alias_map(canonical_brands).get(review_update.brand_name)
+            if canonical is not None:
+                canonical_name = canonical_name or canonical.name
+                for result in results:
+                    aliases = [
+                        brand for brand in result.brands_detected
+                        if brand in canonical.aliases
+                        and not (result.page_number == review_update.page_number and brand == review_update.brand_name)
+                    ]
+                    if aliases:
+                        alias_pages[result.page_number] = aliases
+        aliases_updated = 0
+        if alias_pages:
+            aliases_updated = await firebase_service.update_brands_review_status(
+                document_id, alias_pages, review_update.is_reviewed
+            )
+
+        # Only an explicit verdict feeds the knowledge base: is_reviewed is a checklist mark
+        # that reviewers also set on false positives
+        knowledge_status = None
+        if review_update.verdict is not None:
+            # One vote per propagated spelling, not one per page it appears on
+            reviews = [(review_update.page_number, review_update.brand_name)]
+            alias_first_page = {}
+            for page_number, aliases in sorted(alias_pages.items()):
+                for alias in aliases:
+                    if alias != review_update.brand_name:
+                        alias_first_page.setdefault(alias, page_number)
+            reviews.extend((page_number, alias) for alias, page_number in alias_first_page.items())
+            statuses = await brand_knowledge_base.record_reviews(
+                document_id,
+                reviews,
+                review_update.verdict,
+                canonical_brand=canonical_name,
+            )
+            knowledge_status = statuses[review_update.brand_name]
+
         return {
             "message": f"Brand '{review_update.brand_name}' review status updated successfully",
             "is_reviewed": review_update.is_reviewed,
+            "knowledge_status": knowledge_status,
+            "canonical_brand": canonical_name,
+            "aliases_updated": aliases_updated,
         }
     except HTTPException:
         raise
@@ -31,6 +31,39 @@ async def health_check() -> HealthResponse:
     )
 
 
+@router.get("/llm")
+async def llm_status() -> Dict[str, Any]:
+    """LLM rate limiter state (current limits, in-flight requests, queue depth), backends, connection pool, hedging, cascade tiers, token usage, batch jobs, the review knowledge base and LLM record/replay."""
+    from ..services.brand_detection_service import brand_detection_service
+    from ..services.batch_inference_service import batch_inference_service
+    from ..services.brand_knowledge_base import brand_knowledge_base
+    from ..services.llm_replay import llm_replay_store
+
+    return {
+        "rate_limiter": brand_detection_service.rate_limiter.get_status(),
+        "backends": brand_detection_service.llm_pool.get_stats(),
+        "http_pool": brand_detection_service.http_client.get_stats(),
+        "hedging": brand_detection_service.request_hedger.get_stats(),
+        "cascade": brand_detection_service.get_cascade_stats(),
+        "usage": dict(brand_detection_service.usage_totals),
+        "batch": batch_inference_service.get_stats(),
+        "knowledge_base": brand_knowledge_base.get_stats(),
+        "replay": llm_replay_store.get_stats()
+    }
+
+
+@router.get("/ocr")
+async def ocr_status() -> Dict[str, Any]:
+    """OCR capacity: shared tile queue (workers, buffer depth, utilization) and page scheduler totals."""
+    from ..services.ocr_tile_queue import ocr_tile_queue
+    from ..services.page_scheduler import page_scheduler
+
+    return {
+        "tile_queue": ocr_tile_queue.get_stats(),
+        "page_scheduler": page_scheduler.get_stats()
+    }
+
+
 @router.get("/ready")
 async def readiness_check() -> Dict[str, Any]:
     """Readiness check endpoint."""
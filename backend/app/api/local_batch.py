@@ -0,0 +1,85 @@
+"""
+Local stand-in for a provider batch API.
+Accepts the same JSONL request files as the Gemini Batch API and, after a
+simulated turnaround, answers each request from the brand gazetteer. Used to
+exercise the batch processing class end to end without a provider account.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from ..config import settings
+from ..services.brand_gazetteer import brand_gazetteer
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/local-batch", tags=["local-batch"])
+
+# Job name -> {"state", "created_at", "requests", "results"}
+_jobs: Dict[str, Dict[str, Any]] = {}
+
+
+def _answer(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a provider-shaped response for one request from a gazetteer scan."""
+    parts = []
+    for content in request.get("contents") or []:
+        parts.extend(part.get("text", "") for part in content.get("parts") or [])
+    brands = list(brand_gazetteer.scan("\n".join(parts)).brands)
+    text = json.dumps({"brands_detected": brands, "uncertain": []}, ensure_ascii=False)
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+
+
+@router.post("/jobs")
+async def create_job(request: Request, display_name: str = "") -> Dict[str, Any]:
+    """Create a job from a JSONL request body."""
+    body = (await request.body()).decode("utf-8")
+    try:
+        lines = [json.loads(line) for line in body.splitlines() if line.strip()]
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSONL: {str(e)}")
+
+    name = f"jobs/{uuid.uuid4().hex}"
+    _jobs[name] = {"state": "running", "created_at": time.time(), "requests": lines, "results": None}
+    logger.info(f"Local batch job {name} ({display_name}) accepted with {len(lines)} requests")
+    return {"name": name, "state": "running"}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict[str, Any]:
+    """Get job state; jobs complete after BATCH_LOCAL_SERVER_DELAY_SECONDS."""
+    name = f"jobs/{job_id}"
+    job = _jobs.get(name)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["state"] == "running" and time.time() - job["created_at"] >= settings.batch_local_server_delay_seconds:
+        # Gazetteer scans are CPU-bound; keep them off the event loop
+        loop = asyncio.get_event_loop()
+        job["results"] = await loop.run_in_executor(
+            None,
+            lambda: [{"key": line.get("key"), "response": _answer(line.get("request") or {})} for line in job["requests"]]
+        )
+        job["state"] = "succeeded"
+
+    response = {"name": name, "state": job["state"]}
+    if job["state"] == "succeeded":
+        response["responses_file"] = f"{name}/results"
+    return response
+
+
+@router.get("/jobs/{job_id}/results", response_class=PlainTextResponse)
+async def get_job_results(job_id: str) -> str:
+    """Download job results as JSONL."""
+    job = _jobs.get(f"jobs/{job_id}")
+    if job is None or job["results"] is None:
+        raise HTTPException(status_code=404, detail="Results not available")
+    return "\n".join(json.dumps(line, ensure_ascii=False) for line in job["results"])
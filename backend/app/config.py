@@ -31,6 +31,23 @@ class Settings(BaseSettings):
     gemini_api_key: str = Field(..., env="GEMINI_API_KEY")
     gemini_model: str = Field(default="gemini-2.0-flash-exp", env="GEMINI_MODEL")
     
+    # LLM backend - "gemini" or "openai_compatible" (llama.cpp server, vLLM or any /chat/completions endpoint)
+    llm_provider: str = Field(default="gemini", env="LLM_PROVIDER")
+    llm_openai_base_url: str = Field(default="http://localhost:8080/v1", env="LLM_OPENAI_BASE_URL")  # Comma-separated for several servers
+    llm_openai_api_key: str = Field(default="", env="LLM_OPENAI_API_KEY")  # Empty = no Authorization header
+    llm_openai_model: str = Field(default="local-model", env="LLM_OPENAI_MODEL")
+    llm_openai_cheap_model: str = Field(default="", env="LLM_OPENAI_CHEAP_MODEL")  # Cascade cheap tier on the same endpoint; empty = none
+    llm_openai_json_schema: bool = Field(default=True, env="LLM_OPENAI_JSON_SCHEMA")  # Structured output via json_schema; False = json_object mode
+
+    # LLM record/replay for offline benchmarks (record real calls, then replay them without network access)
+    llm_replay_mode: str = Field(default="", env="LLM_REPLAY_MODE")  # "", "record" or "replay"
+    llm_replay_path: str = Field(default="./cache/llm_recording.jsonl", env="LLM_REPLAY_PATH")
+    llm_replay_latency: str = Field(default="recorded", env="LLM_REPLAY_LATENCY")  # recorded, synthetic or none
+    llm_replay_latency_scale: float = Field(default=1.0, env="LLM_REPLAY_LATENCY_SCALE")  # Multiplier on replayed latencies
+    llm_replay_latency_median_seconds: float = Field(default=2.0, env="LLM_REPLAY_LATENCY_MEDIAN_SECONDS")  # Synthetic log-normal median
+    llm_replay_latency_p95_seconds: float = Field(default=6.0, env="LLM_REPLAY_LATENCY_P95_SECONDS")  # Synthetic log-normal 95th percentile
+    llm_replay_seed: int = Field(default=0, env="LLM_REPLAY_SEED")  # Seed for synthetic latencies
+    
     # Firebase
     firebase_project_id: str = Field(default="proyectoshergon", env="FIREBASE_PROJECT_ID")
     firebase_private_key_id: Optional[str] = Field(default=None, env="FIREBASE_PRIVATE_KEY_ID")
@@ -50,6 +67,16 @@ class Settings(BaseSettings):
     processing_timeout: int = Field(default=0, env="PROCESSING_TIMEOUT")  # 0 = no timeout
     batch_size: int = Field(default=4, env="BATCH_SIZE")  # Smaller batches for Windows
     max_concurrent_batches: int = Field(default=2, env="MAX_CONCURRENT_BATCHES")  # Conservative for Windows
+    page_scheduler_slots: int = Field(default=0, env="PAGE_SCHEDULER_SLOTS")  # Pages in flight per document; 0 = processing batch size
+    page_scheduler_largest_first: bool = Field(default=True, env="PAGE_SCHEDULER_LARGEST_FIRST")  # Start pages by estimated cost, heaviest first
+    ocr_tile_workers: int = Field(default=0, env="OCR_TILE_WORKERS")  # OCR workers shared by all pages in flight; 0 = max concurrent pages
+    ocr_tile_queue_size: int = Field(default=32, env="OCR_TILE_QUEUE_SIZE")  # Tiles buffered ahead of the workers before pages wait to enqueue
+
+    # Page classification - routes pages to processing profiles before OCR
+    page_classification_enabled: bool = Field(default=True, env="PAGE_CLASSIFICATION_ENABLED")
+    page_classifier_thumbnail_dpi: int = Field(default=36, env="PAGE_CLASSIFIER_THUMBNAIL_DPI")  # Thumbnail resolution for classification
+    page_classifier_blank_check_dpi: int = Field(default=100, env="PAGE_CLASSIFIER_BLANK_CHECK_DPI")  # Render resolution confirming a page is blank before it is skipped
+    page_profile_light_dpi: int = Field(default=300, env="PAGE_PROFILE_LIGHT_DPI")  # Render DPI for cover and photo pages
 
     # Image Processing - High quality for Windows GPU
     pdf_dpi: int = Field(default=600, env="PDF_DPI")  # High resolution for better text detection
@@ -62,10 +89,113 @@ class Settings(BaseSettings):
     ocr_confidence_threshold: float = Field(default=0.3, env="OCR_CONFIDENCE_THRESHOLD")  # Minimum confidence for text detection
     ocr_max_retries: int = Field(default=3, env="OCR_MAX_RETRIES")  # Retry attempts for OCR
     ocr_retry_delay: float = Field(default=1.0, env="OCR_RETRY_DELAY")  # Initial retry delay in seconds
-    
+
+    # Page-level OCR preprocessing (runs once per page before tiling)
+    ocr_preprocessing_steps: str = Field(default="clahe", env="OCR_PREPROCESSING_STEPS")  # Comma-separated: equalize, clahe, denoise, binarize
+    ocr_clahe_clip_limit: float = Field(default=2.0, env="OCR_CLAHE_CLIP_LIMIT")  # CLAHE contrast clip limit
+    ocr_clahe_tile_grid: int = Field(default=16, env="OCR_CLAHE_TILE_GRID")  # CLAHE grid cells per axis
+    ocr_denoise_kernel: int = Field(default=3, env="OCR_DENOISE_KERNEL")  # Median blur kernel size (odd)
+    ocr_binarize_block_size: int = Field(default=31, env="OCR_BINARIZE_BLOCK_SIZE")  # Adaptive threshold neighbourhood (odd)
+    ocr_binarize_offset: int = Field(default=10, env="OCR_BINARIZE_OFFSET")  # Constant subtracted from the local mean
+    ocr_line_suppression: bool = Field(default=False, env="OCR_LINE_SUPPRESSION")  # Remove long lines and hatching before tiling
+    ocr_line_min_length: int = Field(default=200, env="OCR_LINE_MIN_LENGTH")  # Min horizontal/vertical line length in pixels (at PDF_DPI)
+    ocr_hatch_min_length: int = Field(default=120, env="OCR_HATCH_MIN_LENGTH")  # Min diagonal hatch stroke length in pixels (at PDF_DPI)
+
+    # Region-of-interest OCR targeting
+    ocr_profile: str = Field(default="full", env="OCR_PROFILE")  # full = whole-page grid, balanced = ROIs first then the rest, fast = ROIs only
+    layout_max_side: int = Field(default=2000, env="LAYOUT_MAX_SIDE")  # Longest side of the low-resolution layout render
+    layout_min_block_glyphs: int = Field(default=12, env="LAYOUT_MIN_BLOCK_GLYPHS")  # Min glyphs for a text block to count as dense
+    layout_roi_padding: int = Field(default=48, env="LAYOUT_ROI_PADDING")  # Padding around each ROI in full-resolution pixels
+
+    # Table and schedule extraction
+    table_extraction: str = Field(default="schedules", env="TABLE_EXTRACTION")  # off, schedules (schedule pages only), all
+    table_recognition_batch_size: int = Field(default=32, env="TABLE_RECOGNITION_BATCH_SIZE")  # Cells per recognizer batch
+
+    # LLM response cache (in-memory LRU in front of a SQLite store)
+    llm_cache_enabled: bool = Field(default=True, env="LLM_CACHE_ENABLED")
+    llm_cache_path: str = Field(default="./cache/llm_responses.sqlite3", env="LLM_CACHE_PATH")  # Empty = memory tier only
+    llm_cache_ttl_hours: int = Field(default=720, env="LLM_CACHE_TTL_HOURS")  # 0 = entries never expire
+    llm_cache_memory_entries: int = Field(default=2048, env="LLM_CACHE_MEMORY_ENTRIES")  # LRU capacity
+
+    # Multi-page prompt packing (several small pages per LLM request)
+    llm_packing_enabled: bool = Field(default=False, env="LLM_PACKING_ENABLED")
+    llm_packing_token_budget: int = Field(default=6000, env="LLM_PACKING_TOKEN_BUDGET")  # Estimated input tokens of packed page text per request
+    llm_packing_max_pages: int = Field(default=8, env="LLM_PACKING_MAX_PAGES")  # Max pages per packed request
+    llm_packing_max_wait: float = Field(default=0.5, env="LLM_PACKING_MAX_WAIT")  # Seconds to wait for more pages before sending
+
+    # LLM analysis scope: per page, or document-level over deduplicated lines
+    llm_analysis_scope: str = Field(default="page", env="LLM_ANALYSIS_SCOPE")  # page or document
+    line_dedup_max_distance: int = Field(default=8, env="LINE_DEDUP_MAX_DISTANCE")  # Max SimHash Hamming distance for near-duplicate candidates (0 = exact only)
+    line_dedup_chunk_tokens: int = Field(default=3000, env="LINE_DEDUP_CHUNK_TOKENS")  # Estimated tokens of unique lines per LLM request
+
+    # Local brand gazetteer (Aho-Corasick prefilter before the LLM)
+    brand_gazetteer_enabled: bool = Field(default=True, env="BRAND_GAZETTEER_ENABLED")
+    brand_gazetteer_skip_llm: bool = Field(default=True, env="BRAND_GAZETTEER_SKIP_LLM")  # Skip the LLM when no unexplained candidate tokens remain
+    brand_fuzzy_matching: bool = Field(default=True, env="BRAND_FUZZY_MATCHING")  # Resolve OCR-garbled brand spellings locally
+    brand_gazetteer_path: Optional[str] = Field(default=None, env="BRAND_GAZETTEER_PATH")  # Optional JSON file {"Brand": ["alias", ...]}
+
+    # Brand knowledge base learned from reviews (feeds the gazetteer)
+    brand_knowledge_enabled: bool = Field(default=True, env="BRAND_KNOWLEDGE_ENABLED")
+    brand_knowledge_path: str = Field(default="./cache/brand_knowledge.json", env="BRAND_KNOWLEDGE_PATH")  # Empty = keep reviews in memory only
+    brand_knowledge_min_reviews: int = Field(default=2, env="BRAND_KNOWLEDGE_MIN_REVIEWS")  # Documents with agreeing reviews before a name is auto-accepted or auto-rejected
+
+    # Document-level brand canonicalization (normalization rules + gazetteer aliases, summary and exports keyed by canonical brand)
+    brand_alias_clustering: bool = Field(default=True, env="BRAND_ALIAS_CLUSTERING")  # Fuzzy-cluster spellings of brands the gazetteer does not know
+
+    # Prompt payload pruning (tokens that cannot name a brand are dropped before the LLM)
+    llm_pruning_rules: str = Field(default="measurements,numeric,generic,fragments", env="LLM_PRUNING_RULES")  # Comma-separated; empty disables pruning
+    llm_pruning_min_token_length: int = Field(default=2, env="LLM_PRUNING_MIN_TOKEN_LENGTH")  # Shorter alphabetic fragments are dropped
+    llm_pruning_verify_sample_rate: float = Field(default=0.02, env="LLM_PRUNING_VERIFY_SAMPLE_RATE")  # Fraction of pages also analyzed unpruned to check recall (0 disables)
+
+    # LLM request shape - static instructions in a versioned system prompt, page text as the variable part
+    llm_max_output_tokens: int = Field(default=4096, env="LLM_MAX_OUTPUT_TOKENS")  # Truncated responses are logged and counted
+    llm_structured_output: bool = Field(default=True, env="LLM_STRUCTURED_OUTPUT")  # Request schema-constrained JSON where the provider supports it
+    gemini_context_cache: bool = Field(default=False, env="GEMINI_CONTEXT_CACHE")  # Explicit cached content for the system prompt
+    gemini_context_cache_ttl_minutes: int = Field(default=60, env="GEMINI_CONTEXT_CACHE_TTL_MINUTES")
+
+    # Map-reduce analysis of long pages (split into layout-aware segments analyzed concurrently)
+    llm_segment_token_budget: int = Field(default=4000, env="LLM_SEGMENT_TOKEN_BUDGET")  # Estimated input tokens per LLM request
+    llm_segment_overlap_lines: int = Field(default=1, env="LLM_SEGMENT_OVERLAP_LINES")  # Lines repeated between segments
+
+    # Model cascade - local gazetteer, then a cheaper model, escalating uncertain pages to GEMINI_MODEL
+    llm_cascade_enabled: bool = Field(default=False, env="LLM_CASCADE_ENABLED")
+    llm_cascade_brand_like_threshold: float = Field(default=0.5, env="LLM_CASCADE_BRAND_LIKE_THRESHOLD")  # Candidate brand probability that sends a page straight to GEMINI_MODEL
+    llm_cascade_cheap_model: str = Field(default="gemini-2.0-flash-lite", env="LLM_CASCADE_CHEAP_MODEL")  # Empty = local tier only
+
+    # Adaptive LLM rate limiting (token buckets + AIMD concurrency, backs off on 429/503)
+    gemini_requests_per_minute: int = Field(default=1000, env="GEMINI_REQUESTS_PER_MINUTE")  # Project quota; 0 = unlimited
+    gemini_tokens_per_minute: int = Field(default=1000000, env="GEMINI_TOKENS_PER_MINUTE")  # Input + output tokens; 0 = unlimited
+    llm_min_concurrency: int = Field(default=1, env="LLM_MIN_CONCURRENCY")
+    llm_max_concurrency: int = Field(default=16, env="LLM_MAX_CONCURRENCY")  # Starts at MAX_CONCURRENT_PAGES and adapts within bounds
+    llm_max_retries: int = Field(default=4, env="LLM_MAX_RETRIES")  # Retries after throttling responses
+    llm_throttle_backoff_seconds: float = Field(default=5.0, env="LLM_THROTTLE_BACKOFF_SECONDS")  # Pause when no Retry-After is given
+    llm_transient_retries: int = Field(default=2, env="LLM_TRANSIENT_RETRIES")  # Retries after 5xx, transport errors and timeouts
+    llm_transient_retry_delay: float = Field(default=1.0, env="LLM_TRANSIENT_RETRY_DELAY")  # Base of the jittered exponential backoff, in seconds
+
+    # Request hedging - duplicate LLM calls slower than the observed percentile for their payload size
+    llm_hedging_enabled: bool = Field(default=False, env="LLM_HEDGING_ENABLED")
+    llm_hedge_percentile: float = Field(default=0.95, env="LLM_HEDGE_PERCENTILE")  # Latency percentile that triggers a hedge
+    llm_hedge_max_fraction: float = Field(default=0.05, env="LLM_HEDGE_MAX_FRACTION")  # Hedges as a fraction of requests
+    llm_hedge_min_samples: int = Field(default=20, env="LLM_HEDGE_MIN_SAMPLES")  # Latencies needed before hedging starts
+
+    # Offline batch inference (upload with processing_class=batch)
+    batch_provider: str = Field(default="gemini", env="BATCH_PROVIDER")  # "gemini" (Batch API) or "local" (stand-in server)
+    batch_jobs_dir: str = Field(default="./cache/batch_jobs", env="BATCH_JOBS_DIR")  # Job request files and manifests
+    batch_local_server_enabled: bool = Field(default=False, env="BATCH_LOCAL_SERVER_ENABLED")  # Mount the stand-in batch server at /local-batch
+    batch_local_server_url: str = Field(default="http://localhost:8000/local-batch", env="BATCH_LOCAL_SERVER_URL")
+    batch_local_server_delay_seconds: float = Field(default=30.0, env="BATCH_LOCAL_SERVER_DELAY_SECONDS")  # Simulated job turnaround
+    batch_poll_interval_seconds: float = Field(default=60.0, env="BATCH_POLL_INTERVAL_SECONDS")
+    batch_max_requests_per_job: int = Field(default=500, env="BATCH_MAX_REQUESTS_PER_JOB")
+    batch_flush_seconds: float = Field(default=300.0, env="BATCH_FLUSH_SECONDS")  # Submit a partial job after this long
+
+    # Shared HTTP client for LLM calls (pool size is CONNECTION_POOL_SIZE)
+    llm_http2: bool = Field(default=True, env="LLM_HTTP2")  # HTTP/2 multiplexing; needs httpx[http2]
+    llm_http_keepalive_seconds: float = Field(default=120.0, env="LLM_HTTP_KEEPALIVE_SECONDS")  # Idle connections kept open this long
+    llm_http_connect_timeout_seconds: float = Field(default=10.0, env="LLM_HTTP_CONNECT_TIMEOUT_SECONDS")
+
     # Windows-specific optimizations
     thread_pool_size: int = Field(default=4, env="THREAD_POOL_SIZE")  # Conservative for Windows
-    connection_pool_size: int = Field(default=5, env="CONNECTION_POOL_SIZE")  # Reduced for Windows
+    connection_pool_size: int = Field(default=5, env="CONNECTION_POOL_SIZE")  # Max LLM HTTP connections; reduced for Windows
     request_timeout: int = Field(default=0, env="REQUEST_TIMEOUT")  # No request timeout
     
     # GPU Memory Management
@@ -82,7 +212,17 @@ class Settings(BaseSettings):
     def ocr_languages_list(self) -> List[str]:
         """Get OCR languages as a list."""
         return [lang.strip() for lang in self.ocr_languages.split(',') if lang.strip()]
-    
+
+    @property
+    def ocr_preprocessing_steps_list(self) -> List[str]:
+        """Get page preprocessing steps as a list, in execution order."""
+        return [step.strip().lower() for step in self.ocr_preprocessing_steps.split(',') if step.strip()]
+
+    @property
+    def llm_pruning_rules_list(self) -> List[str]:
+        """Get prompt pruning rules as a list."""
+        return [rule.strip().lower() for rule in self.llm_pruning_rules.split(',') if rule.strip()]
+
     @property
     def is_windows(self) -> bool:
         """Check if running on Windows."""
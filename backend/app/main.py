@@ -10,7 +10,7 @@ from fastapi.responses import JSONResponse
 import uvicorn
 
 from .config import settings
-from .api import documents_router, health_router
+from .api import documents_router, health_router, local_batch_router
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -44,6 +44,8 @@ def create_app() -> FastAPI:
         # No request body limits for unlimited file uploads
         dependencies=[]
     )
+    if settings.batch_local_server_enabled:
+        app.include_router(local_batch_router)
     
     # Global exception handler
     @app.exception_handler(Exception)
@@ -67,6 +69,10 @@ def create_app() -> FastAPI:
             logger.error("Exception handled gracefully, application will continue running")
         
         loop.set_exception_handler(handle_exception)
+        
+        # Resume polling batch jobs submitted before the last restart
+        from .services.processing_service import processing_service
+        processing_service.resume_batch_jobs()
         logger.info("Application startup completed")
     
     # Shutdown event for cleanup
@@ -75,6 +81,8 @@ def create_app() -> FastAPI:
         logger.info("Application shutting down...")
         # Don't try to cancel tasks manually - let uvicorn handle it
         # This prevents recursion errors during shutdown
+        from .services.llm_http_client import llm_http_client
+        await llm_http_client.aclose()
         logger.info("Application shutdown completed")
     
     # Root endpoint
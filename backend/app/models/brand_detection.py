@@ -2,7 +2,7 @@
 Brand detection models for the Document Brand Detection System.
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pydantic import BaseModel, Field
 
 
@@ -14,17 +14,28 @@ class BrandDetectionBase(BaseModel):
 
 class BrandDetectionCreate(BrandDetectionBase):
     """Model for creating a new brand detection result."""
-    pass
+    llm_failed: bool = Field(
+        default=False,
+        description="True when the LLM analysis failed and only locally found brands were kept"
+    )
 
 
 class BrandDetection(BrandDetectionBase):
     """Complete brand detection model."""
     processing_time: float = Field(..., description="Time taken to process this page (seconds)")
-    status: str = Field(..., description="Processing status: pending, processing, completed, failed")
+    status: str = Field(..., description="Processing status: pending, processing, completed, llm_failed, failed")
     brands_review_status: Dict[str, bool] = Field(
         default_factory=dict, 
         description="Review status for each detected brand (brand_name: is_reviewed)"
     )
+    page_class: Optional[str] = Field(
+        default=None,
+        description="Page class assigned before OCR: cover, sheet_index, drawing, schedule, photo, blank"
+    )
+    processing_profile: Optional[str] = Field(
+        default=None,
+        description="Name of the processing profile used for this page"
+    )
     
     class Config:
         from_attributes = True
@@ -36,3 +47,15 @@ class BrandReviewUpdate(BaseModel):
     page_number: int = Field(..., description="Page number")
     brand_name: str = Field(..., description="Brand name to update")
     is_reviewed: bool = Field(..., description="Whether the brand has been reviewed")
+    verdict: Optional[str] = Field(
+        default=None,
+        description="Review verdict recorded in the brand knowledge base: confirmed or rejected (false positive); is_reviewed alone records nothing"
+    )
+    canonical_brand: Optional[str] = Field(
+        default=None,
+        description="Canonical brand this name is a spelling of (learned as an alias)"
+    )
+    propagate_aliases: bool = Field(
+        default=True,
+        description="Apply the review to every spelling of the same canonical brand in the document"
+    )
@@ -0,0 +1,508 @@
+"""
+Offline batch inference for non-urgent documents.
+Accumulates per-page LLM requests into provider batch-job files (JSONL),
+submits them, polls the jobs and hands the parsed results back per document.
+Batch jobs use the provider's batch quota, so backfills do not compete with
+interactive uploads for the online rate limit.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from ..config import settings
+from .llm_providers import to_gemini_schema
+from .prompts import PAGE_RESPONSE_SCHEMA, SYSTEM_PROMPT, build_page_message
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Job states reported by the clients
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+GEMINI_TERMINAL_STATES = {
+    "BATCH_STATE_SUCCEEDED": JOB_SUCCEEDED,
+    "JOB_STATE_SUCCEEDED": JOB_SUCCEEDED,
+    "BATCH_STATE_FAILED": JOB_FAILED,
+    "BATCH_STATE_CANCELLED": JOB_FAILED,
+    "BATCH_STATE_EXPIRED": JOB_FAILED,
+    "JOB_STATE_FAILED": JOB_FAILED,
+    "JOB_STATE_CANCELLED": JOB_FAILED,
+    "JOB_STATE_EXPIRED": JOB_FAILED,
+}
+
+
+def response_text_from_line(line: Dict[str, Any]) -> Optional[str]:
+    """
+    Extract the model text from one batch output line.
+
+    Args:
+        line: Parsed JSONL output line ({"key", "response"} or {"key", "error"})
+
+    Returns:
+        Concatenated text parts, or None if the request failed
+    """
+    response = line.get("response") or {}
+    candidates = response.get("candidates") or []
+    if not candidates:
+        return None
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    text = "".join(part.get("text", "") for part in parts if isinstance(part, dict))
+    return text or None
+
+
+class GeminiBatchClient:
+    """Gemini Batch API over REST: file upload, batchGenerateContent, polling, result download."""
+
+    base_url = "https://generativelanguage.googleapis.com"
+
+    def __init__(self, model: str, api_key: str):
+        self.model = model
+        self.headers = {"x-goog-api-key": api_key}
+
+    async def submit(self, jsonl_path: str, display_name: str) -> str:
+        """
+        Upload a request file and create a batch job.
+
+        Args:
+            jsonl_path: Path to the JSONL request file
+            display_name: Human-readable job name
+
+        Returns:
+            Provider job name (e.g. "batches/123")
+        """
+        size = os.path.getsize(jsonl_path)
+        with open(jsonl_path, "rb") as file:
+            content = file.read()
+
+        async with httpx.AsyncClient(timeout=300) as client:
+            start = await client.post(
+                f"{self.base_url}/upload/v1beta/files",
+                headers={
+                    **self.headers,
+                    "X-Goog-Upload-Protocol": "resumable",
+                    "X-Goog-Upload-Command": "start",
+                    "X-Goog-Upload-Header-Content-Length": str(size),
+                    "X-Goog-Upload-Header-Content-Type": "application/jsonl",
+                },
+                json={"file": {"display_name": display_name}}
+            )
+            start.raise_for_status()
+            upload = await client.post(
+                start.headers["x-goog-upload-url"],
+                headers={"X-Goog-Upload-Offset": "0", "X-Goog-Upload-Command": "upload, finalize"},
+                content=content
+            )
+            upload.raise_for_status()
+            file_name = upload.json()["file"]["name"]
+
+            batch = await client.post(
+                f"{self.base_url}/v1beta/models/{self.model}:batchGenerateContent",
+                headers=self.headers,
+                json={"batch": {"display_name": display_name, "input_config": {"file_name": file_name}}}
+            )
+            batch.raise_for_status()
+            return batch.json()["name"]
+
+    async def poll(self, job_name: str) -> Tuple[str, Optional[str]]:
+        """
+        Get a job's state.
+
+        Args:
+            job_name: Provider job name
+
+        Returns:
+            Tuple of (state, result file name when succeeded)
+        """
+        async with httpx.AsyncClient(timeout=60) as client:
+            response = await client.get(f"{self.base_url}/v1beta/{job_name}", headers=self.headers)
+            response.raise_for_status()
+            data = response.json()
+
+        provider_state = (data.get("metadata") or {}).get("state") or data.get("state", "")
+        state = GEMINI_TERMINAL_STATES.get(provider_state, JOB_RUNNING)
+        if data.get("done") and data.get("error"):
+            state = JOB_FAILED
+        result_file = ((data.get("response") or {}).get("responsesFile")
+                       or ((data.get("metadata") or {}).get("output") or {}).get("responsesFile"))
+        return state, result_file
+
+    async def download(self, result_file: str) -> List[Dict[str, Any]]:
+        """
+        Download and parse a job's JSONL output.
+
+        Args:
+            result_file: Result file name from poll()
+
+        Returns:
+            Parsed output lines
+        """
+        async with httpx.AsyncClient(timeout=300) as client:
+            response = await client.get(
+                f"{self.base_url}/download/v1beta/{result_file}:download",
+                params={"alt": "media"},
+                headers=self.headers
+            )
+            response.raise_for_status()
+        return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+class LocalBatchClient:
+    """Client for the local stand-in batch server (app.api.local_batch)."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+    async def submit(self, jsonl_path: str, display_name: str) -> str:
+        with open(jsonl_path, "rb") as file:
+            content = file.read()
+        async with httpx.AsyncClient(timeout=60) as client:
+            response = await client.post(
+                f"{self.base_url}/jobs",
+                params={"display_name": display_name},
+                content=content,
+                headers={"Content-Type": "application/jsonl"}
+            )
+            response.raise_for_status()
+            return response.json()["name"]
+
+    async def poll(self, job_name: str) -> Tuple[str, Optional[str]]:
+        async with httpx.AsyncClient(timeout=60) as client:
+            response = await client.get(f"{self.base_url}/{job_name}")
+            response.raise_for_status()
+            data = response.json()
+        return data["state"], data.get("responses_file")
+
+    async def download(self, result_file: str) -> List[Dict[str, Any]]:
+        async with httpx.AsyncClient(timeout=60) as client:
+            response = await client.get(f"{self.base_url}/{result_file}")
+            response.raise_for_status()
+        return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+# Called with (document_id, {page_number: response text or None}, document manifest)
+# once every queued page of the document has an answer
+ResultHandler = Callable[[str, Dict[int, Optional[str]], Dict[str, Any]], Awaitable[None]]
+
+
+class BatchInferenceService:
+    """Accumulates page requests into batch jobs and ingests their results."""
+
+    def __init__(self):
+        """Initialize batch service from settings and reload jobs that were still pending."""
+        self.jobs_dir = settings.batch_jobs_dir
+        self.max_requests_per_job = max(1, settings.batch_max_requests_per_job)
+        self.flush_seconds = settings.batch_flush_seconds
+        self.poll_interval = settings.batch_poll_interval_seconds
+        if settings.batch_provider == "local":
+            self.client = LocalBatchClient(settings.batch_local_server_url)
+        else:
+            self.client = GeminiBatchClient(settings.gemini_model, settings.gemini_api_key)
+
+        self.result_handler: Optional[ResultHandler] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self.jobs: Dict[str, Dict[str, Any]] = self._load_jobs()
+        self.stats = {"requests_queued": 0, "jobs_submitted": 0, "jobs_completed": 0, "jobs_failed": 0, "requests_failed": 0}
+
+        logger.info(f"BatchInferenceService initialized (provider: {settings.batch_provider}, jobs dir: {self.jobs_dir}, {len(self.jobs)} pending jobs)")
+
+    def _job_path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.{suffix}")
+
+    def _load_jobs(self) -> Dict[str, Dict[str, Any]]:
+        """Reload metadata of submitted jobs that have not been ingested yet."""
+        jobs = {}
+        if not os.path.isdir(self.jobs_dir):
+            return jobs
+        for filename in os.listdir(self.jobs_dir):
+            if not filename.endswith(".job.json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, filename), "r", encoding="utf-8") as file:
+                    job = json.load(file)
+                if job.get("status") == "submitted":
+                    jobs[job["job_id"]] = job
+            except Exception as e:
+                logger.warning(f"Skipping unreadable batch job file {filename}: {str(e)}")
+        return jobs
+
+    def _save_job(self, job: Dict[str, Any]) -> None:
+        with open(self._job_path(job["job_id"], "job.json"), "w", encoding="utf-8") as file:
+            json.dump(job, file, ensure_ascii=False)
+
+    @staticmethod
+    def build_request(document_id: str, page_number: int, llm_text: str) -> Dict[str, Any]:
+        """
+        Build one JSONL batch request line for a page.
+
+        Args:
+            document_id: Document ID
+            page_number: Page number
+            llm_text: Text for LLM analysis
+
+        Returns:
+            Request line with a "document_id:page_number" key
+        """
+        generation_config = {
+            "temperature": 0.1,
+            "max_output_tokens": settings.llm_max_output_tokens,
+            "response_mime_type": "application/json",
+        }
+        if settings.llm_structured_output:
+            generation_config["response_schema"] = to_gemini_schema(PAGE_RESPONSE_SCHEMA)
+        return {
+            "key": f"{document_id}:{page_number}",
+            "request": {
+                "system_instruction": {"parts": [{"text": SYSTEM_PROMPT}]},
+                "contents": [{"role": "user", "parts": [{"text": build_page_message(page_number, llm_text)}]}],
+                "generation_config": generation_config,
+            },
+        }
+
+    def _load_manifest(self, document_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._job_path(document_id, "doc.json"), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def _save_manifest(self, document_id: str, manifest: Dict[str, Any]) -> None:
+        with open(self._job_path(document_id, "doc.json"), "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False)
+
+    async def enqueue(self, document_id: str, page_texts: Dict[int, str], manifest: Dict[str, Any]) -> None:
+        """
+        Queue a document's pages for the next batch job.
+
+        Requests from several documents share a job; the job is submitted when it
+        reaches batch_max_requests_per_job or after batch_flush_seconds. The
+        manifest is persisted with the job files so results can be ingested after
+        a restart.
+
+        Args:
+            document_id: Document ID
+            page_texts: Page number -> text for LLM analysis
+            manifest: JSON-serializable per-document state returned to the result handler
+        """
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        manifest = dict(
+            manifest,
+            page_texts={str(page): text for page, text in page_texts.items()},
+            pending_pages=sorted(page_texts),
+            responses={}
+        )
+        self._save_manifest(document_id, manifest)
+
+        for page_number, text in sorted(page_texts.items()):
+            self._pending.append(self.build_request(document_id, page_number, text))
+        self.stats["requests_queued"] += len(page_texts)
+
+        if len(self._pending) >= self.max_requests_per_job:
+            await self.flush()
+        elif self._pending and self._flush_timer is None:
+            loop = asyncio.get_event_loop()
+            self._flush_timer = loop.call_later(self.flush_seconds, lambda: asyncio.ensure_future(self.flush()))
+
+    async def flush(self) -> None:
+        """Write pending requests to job files and submit them."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            while self._pending:
+                requests = self._pending[:self.max_requests_per_job]
+                self._pending = self._pending[self.max_requests_per_job:]
+                await self._submit_job(requests)
+        self.start()
+
+    async def _submit_job(self, requests: List[Dict[str, Any]]) -> None:
+        """Write one job file and submit it; failed submissions report their pages as failed."""
+        job_id = f"batch-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        jsonl_path = self._job_path(job_id, "jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as file:
+            for request in requests:
+                file.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+        keys = [request["key"] for request in requests]
+        try:
+            provider_job = await self.client.submit(jsonl_path, job_id)
+        except Exception as e:
+            logger.error(f"Failed to submit batch job {job_id} with {len(requests)} requests: {str(e)}")
+            self.stats["jobs_failed"] += 1
+            await self._deliver(keys, {})
+            return
+
+        job = {
+            "job_id": job_id,
+            "provider_job": provider_job,
+            "keys": keys,
+            "status": "submitted",
+            "submitted_at": time.time(),
+        }
+        self.jobs[job_id] = job
+        self._save_job(job)
+        self.stats["jobs_submitted"] += 1
+        logger.info(f"Submitted batch job {job_id} ({provider_job}) with {len(requests)} page requests")
+
+    async def resume(self) -> None:
+        """
+        Re-queue pages whose requests were never submitted, retry ingestion of documents
+        whose results all arrived but were not ingested, and resume polling submitted jobs.
+        """
+        if not os.path.isdir(self.jobs_dir):
+            return
+        submitted = {key for job in self.jobs.values() for key in job["keys"]}
+        requeued = 0
+        for filename in os.listdir(self.jobs_dir):
+            if not filename.endswith(".doc.json"):
+                continue
+            document_id = filename[:-len(".doc.json")]
+            manifest = self._load_manifest(document_id) or {}
+            if not manifest.get("pending_pages") and "responses" in manifest:
+                logger.info(f"Retrying ingestion of stored batch results for document {document_id}")
+                await self._ingest_document(document_id, manifest)
+                continue
+            for page_number in manifest.get("pending_pages", []):
+                if f"{document_id}:{page_number}" not in submitted:
+                    self._pending.append(self.build_request(document_id, page_number, manifest["page_texts"][str(page_number)]))
+                    requeued += 1
+
+        if requeued:
+            logger.info(f"Re-queued {requeued} unsubmitted batch requests")
+            await self.flush()
+        self.start()
+
+    def start(self) -> None:
+        """Start the polling loop if there are jobs to watch."""
+        if self.jobs and (self._poll_task is None or self._poll_task.done()):
+            self._poll_task = asyncio.ensure_future(self._poll_loop())
+
+    async def _poll_loop(self) -> None:
+        """Poll submitted jobs until none are left."""
+        while self.jobs:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll_once()
+            except Exception as e:
+                logger.error(f"Batch polling failed: {str(e)}")
+
+    async def poll_once(self) -> int:
+        """
+        Poll every submitted job once and ingest finished ones.
+
+        Returns:
+            Number of jobs finished in this pass
+        """
+        finished = 0
+        for job_id, job in list(self.jobs.items()):
+            try:
+                state, result_file = await self.client.poll(job["provider_job"])
+            except Exception as e:
+                logger.warning(f"Could not poll batch job {job_id}: {str(e)}")
+                continue
+            if state == JOB_RUNNING:
+                continue
+
+            responses: Dict[str, Optional[str]] = {}
+            if state == JOB_SUCCEEDED and result_file:
+                try:
+                    for line in await self.client.download(result_file):
+                        responses[line.get("key", "")] = response_text_from_line(line)
+                except Exception as e:
+                    logger.error(f"Could not download results of batch job {job_id}: {str(e)}")
+                    continue
+                self.stats["jobs_completed"] += 1
+            else:
+                logger.error(f"Batch job {job_id} ended in state {state}")
+                self.stats["jobs_failed"] += 1
+
+            await self._deliver(job["keys"], responses)
+            job["status"] = state
+            job["finished_at"] = time.time()
+            self._save_job(job)
+            try:
+                os.remove(self._job_path(job_id, "jsonl"))
+            except OSError:
+                pass
+            self.jobs.pop(job_id, None)
+            finished += 1
+        return finished
+
+    async def _deliver(self, keys: List[str], responses: Dict[str, Optional[str]]) -> None:
+        """Record a job's responses per document and hand over documents with no pages left."""
+        by_document: Dict[str, Dict[int, Optional[str]]] = {}
+        for key in keys:
+            document_id, _, page_number = key.rpartition(":")
+            text = responses.get(key)
+            if text is None:
+                self.stats["requests_failed"] += 1
+            by_document.setdefault(document_id, {})[int(page_number)] = text
+
+        for document_id, page_responses in by_document.items():
+            manifest = self._load_manifest(document_id)
+            if manifest is None:
+                logger.warning(f"No batch manifest for document {document_id}; dropping {len(page_responses)} results")
+                continue
+            for page_number, text in page_responses.items():
+                manifest["responses"][str(page_number)] = text
+            manifest["pending_pages"] = [page for page in manifest["pending_pages"] if page not in page_responses]
+            self._save_manifest(document_id, manifest)
+            if not manifest["pending_pages"]:
+                await self._ingest_document(document_id, manifest)
+
+    async def _ingest_document(self, document_id: str, manifest: Dict[str, Any]) -> bool:
+        """
+        Hand a document whose pages all have responses to the result handler.
+
+        The manifest stays on disk until the handler succeeds, so resume() retries
+        the ingestion after a restart.
+
+        Args:
+            document_id: Document ID
+            manifest: Stored manifest with no pending pages
+
+        Returns:
+            True if the results were ingested
+        """
+        if self.result_handler is None:
+            logger.warning(f"No batch result handler registered; results for document {document_id} stay on disk")
+            return False
+        try:
+            results = {int(page): text for page, text in manifest["responses"].items()}
+            handler_manifest = {key: value for key, value in manifest.items() if key != "responses"}
+            await self.result_handler(document_id, results, handler_manifest)
+            os.remove(self._job_path(document_id, "doc.json"))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to ingest batch results for document {document_id}, retrying on restart: {str(e)}")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get batch queue and job counters.
+
+        Returns:
+            Statistics dictionary
+        """
+        return {**self.stats, "pending_requests": len(self._pending), "running_jobs": len(self.jobs)}
+
+
+# Global batch inference service instance
+batch_inference_service = BatchInferenceService()
@@ -0,0 +1,127 @@
+"""
+Lightweight brand-likeness classifier for OCR tokens.
+Scores the candidate tokens the gazetteer could not explain with a small
+logistic model over surface and context features (casing, nearby "MARCA:" /
+"MODELO" cues, adjacent model codes, word shape). The cascade sends pages with
+a brand-like leftover straight to the primary model instead of the cheap one.
+It never resolves pages on low scores, since unknown brands in all-caps plan
+text rarely score high.
+"""
+
+import logging
+import math
+import re
+from typing import Dict, Iterable, List
+
+from .brand_gazetteer import normalize_for_matching
+from .prompt_pruning import BRAND_CONTEXT_WORDS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+(?:[-&'][^\W\d_]+)*")
+
+# Words that announce a brand in specifications ("MARCA X O SIMILAR", "FABRICADO POR X")
+CONTEXT_CUES = BRAND_CONTEXT_WORDS | {"fabricado", "fabricada", "similar", "distribuidor", "distribuido"}
+MODEL_CODE_PATTERN = re.compile(r"^(?=.*\d)(?=.*[A-Za-z])[A-Za-z0-9][A-Za-z0-9\-/.]{1,}$")
+
+# Endings of ordinary Spanish/English words (brands rarely look like inflected vocabulary)
+COMMON_WORD_SUFFIXES = (
+    "ion", "iones", "mente", "ado", "ada", "ados", "adas", "ido", "ida", "idos", "idas",
+    "dad", "ura", "ble", "bles", "ivo", "iva", "oso", "osa", "ero", "era", "eria", "ista", "ismo",
+    "ente", "ante", "encia", "ancia", "miento", "tion", "ness", "ment", "ing", "able",
+)
+
+# Logistic model weights (hand-tuned on plan text; positive = brand-like)
+FEATURE_WEIGHTS = {
+    "bias": -1.6,
+    "context_cue": 2.6,  # "MARCA: X", "FABRICANTE X", "X MODELO ..."
+    "model_code_nearby": 1.1,  # Followed or preceded by an alphanumeric code ("XR-200")
+    "intercaps": 1.6,  # DeWalt, KitchenAid
+    "title_in_caps_text": 0.8,  # "Helvex" inside mostly upper-case text
+    "joined_symbol": 0.9,  # Soler&Palau, Sherwin-Williams
+    "common_suffix": -1.4,
+    "short_token": -0.5,
+    "unusual_letters": 0.6,  # k, w, x, y are rare in Spanish vocabulary
+    "repeated": 0.3,
+}
+
+
+def _sigmoid(value: float) -> float:
+    return 1.0 / (1.0 + math.exp(-value))
+
+
+class BrandCandidateClassifier:
+    """Scores how likely unexplained OCR tokens are to be brand names."""
+
+    def __init__(self, context_window: int = 3):
+        """
+        Initialize classifier.
+
+        Args:
+            context_window: Tokens on each side inspected for context cues and model codes
+        """
+        self.context_window = context_window
+
+    def _features(self, tokens: List[str], index: int, occurrences: int, upper_ratio: float) -> Dict[str, float]:
+        """Feature vector for one occurrence of a candidate token."""
+        token = tokens[index]
+        normalized = normalize_for_matching(token)
+        window = tokens[max(0, index - self.context_window):index] + tokens[index + 1:index + 1 + self.context_window]
+        letters = [char for char in token if char.isalpha()]
+        return {
+            "bias": 1.0,
+            "context_cue": float(any(normalize_for_matching(word.strip(".,:;()")) in CONTEXT_CUES for word in window)),
+            "model_code_nearby": float(any(MODEL_CODE_PATTERN.match(word.strip(".,:;()")) for word in window)),
+            "intercaps": float(any(char.isupper() for char in token[1:]) and any(char.islower() for char in token)),
+            "title_in_caps_text": float(upper_ratio >= 0.5 and token[:1].isupper() and token[1:].islower()),
+            "joined_symbol": float(any(symbol in token for symbol in "&-'")),
+            "common_suffix": float(normalized.endswith(COMMON_WORD_SUFFIXES)),
+            "short_token": float(len(letters) <= 4),
+            "unusual_letters": float(any(char in "kwxy" for char in normalized)),
+            "repeated": float(occurrences > 1),
+        }
+
+    def score(self, text: str, candidates: Iterable[str]) -> Dict[str, float]:
+        """
+        Score candidate tokens found in text.
+
+        Args:
+            text: OCR text the candidates came from
+            candidates: Normalized candidate tokens (GazetteerScan.unmatched_candidates)
+
+        Returns:
+            Dictionary mapping each candidate to its highest brand probability over its occurrences
+        """
+        candidate_set = set(candidates)
+        if not candidate_set:
+            return {}
+
+        tokens = text.split()
+        letters = [char for char in text if char.isalpha()]
+        upper_ratio = sum(1 for char in letters if char.isupper()) / len(letters) if letters else 0.0
+
+        positions: Dict[str, List[int]] = {}
+        for index, raw in enumerate(tokens):
+            for match in WORD_PATTERN.finditer(raw):
+                normalized = normalize_for_matching(match.group())
+                if normalized in candidate_set:
+                    positions.setdefault(normalized, []).append(index)
+
+        scores: Dict[str, float] = {}
+        for candidate in candidate_set:
+            best = 0.0
+            indexes = positions.get(candidate) or []
+            for index in indexes:
+                features = self._features(tokens, index, len(indexes), upper_ratio)
+                logit = sum(FEATURE_WEIGHTS[name] * value for name, value in features.items())
+                best = max(best, _sigmoid(logit))
+            # Candidates we could not locate in the raw text keep a neutral score
+            scores[candidate] = best if indexes else 0.5
+        return scores
+
+
+# Global brand candidate classifier instance
+brand_candidate_classifier = BrandCandidateClassifier()
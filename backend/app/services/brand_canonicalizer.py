@@ -0,0 +1,292 @@
+"""
+Document-level brand canonicalization.
+Maps the raw brand strings detected on each page ("SCHNEIDER", "Schneider
+Electric", "Schneider") to canonical brands with stable IDs, in three steps:
+normalization rules (case, accents, punctuation, legal suffixes), the alias
+table of the gazetteer (default brands, BRAND_GAZETTEER_PATH and reviewed
+aliases) and fuzzy clustering of the remaining unknown spellings. Raw strings
+are kept on every canonical brand as evidence.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from ..config import settings
+from .brand_gazetteer import brand_gazetteer, normalize_for_matching
+from .fuzzy_brand_index import allowed_edit_distance, confusion_skeleton, ocr_edit_distance
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Company-form suffixes that never distinguish two brands ("Helvex S.A. de C.V." = "Helvex")
+LEGAL_SUFFIXES = (
+    "s a de c v", "sa de cv", "s de r l de c v", "s de rl de cv", "s de r l", "s a", "sa", "sapi de cv",
+    "inc", "incorporated", "ltd", "limited", "llc", "corp", "corporation", "co", "company", "gmbh", "ag", "plc",
+)
+NON_WORD_PATTERN = re.compile(r"[^a-z0-9&]+")
+MIN_PREFIX_LENGTH = 4  # Shorter names are never merged into a longer one by prefix ("LG", "GE")
+# Company-name heads shared by unrelated brands ("Grupo Rotoplas", "Grupo Lamosa"); never a brand by themselves
+GENERIC_HEADS = frozenset({
+    "grupo", "industrias", "industria", "corporativo", "corporacion", "compania", "comercial", "comercializadora",
+    "distribuidora", "productos", "sistemas", "servicios", "fabrica", "manufacturas", "group", "industries",
+})
+
+
+@dataclass
+class CanonicalBrand:
+    """A canonical brand and the raw detections that map to it."""
+    brand_id: str
+    name: str
+    known: bool  # True when resolved through the gazetteer alias table
+    aliases: Dict[str, int] = field(default_factory=dict)  # Raw string -> number of pages it was detected on
+    pages: List[int] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "known": self.known,
+            "aliases": dict(sorted(self.aliases.items())),
+            "pages": sorted(self.pages),
+        }
+
+
+def brand_id_for(name: str) -> str:
+    """
+    Stable ID of a canonical brand name ("Soler & Palau" -> "soler-palau").
+
+    Args:
+        name: Canonical brand name
+
+    Returns:
+        Lower-case slug
+    """
+    return re.sub(r"[^a-z0-9]+", "-", normalize_for_matching(name)).strip("-")
+
+
+class _DisjointSet:
+    """Union-find over list indexes."""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, index: int) -> int:
+        while self.parent[index] != index:
+            self.parent[index] = self.parent[self.parent[index]]
+            index = self.parent[index]
+        return index
+
+    def union(self, a: int, b: int) -> None:
+        self.parent[self.find(a)] = self.find(b)
+
+
+class BrandCanonicalizer:
+    """Resolves raw brand detections of a document to canonical brands."""
+
+    def __init__(self):
+        """Initialize canonicalizer."""
+        self.fuzzy_clustering = settings.brand_alias_clustering
+        self._compact_aliases: Dict[str, str] = {}
+        self._compact_source_size = -1
+
+        logger.info(f"BrandCanonicalizer initialized (fuzzy clustering: {self.fuzzy_clustering})")
+
+    def normalize_name(self, name: str) -> str:
+        """
+        Apply the normalization rules: case, accents, punctuation and legal suffixes.
+
+        Args:
+            name: Raw brand string
+
+        Returns:
+            Normalized name (words separated by single spaces)
+        """
+        normalized = NON_WORD_PATTERN.sub(" ", normalize_for_matching(name)).strip()
+        stripped = True
+        while stripped:
+            stripped = False
+            for suffix in LEGAL_SUFFIXES:
+                if normalized.endswith(f" {suffix}"):
+                    normalized = normalized[:-len(suffix) - 1].rstrip()
+                    stripped = True
+        return normalized
+
+    def _alias_table(self) -> Dict[str, str]:
+        """Gazetteer patterns keyed by their alphanumeric form (rebuilt when patterns are added)."""
+        patterns = brand_gazetteer.patterns
+        if len(patterns) != self._compact_source_size:
+            self._compact_aliases = {
+                re.sub(r"[^a-z0-9]", "", pattern): canonical for pattern, canonical in patterns.items()
+            }
+            self._compact_source_size = len(patterns)
+        return self._compact_aliases
+
+    def resolve_known(self, name: str) -> Optional[str]:
+        """
+        Look a raw string up in the alias table (exact spellings first, then OCR-noise tolerant).
+
+        Args:
+            name: Raw brand string
+
+        Returns:
+            Canonical gazetteer brand, or None for brands the gazetteer does not know
+        """
+        exact = brand_gazetteer.patterns.get(normalize_for_matching(name).strip())
+        if exact is not None:
+            return exact
+        compact = self.normalize_name(name).replace(" ", "")
+        if not compact:
+            return None
+        canonical = self._alias_table().get(compact)
+        if canonical is not None:
+            return canonical
+        fuzzy = brand_gazetteer.normalize_brand(name)
+        return fuzzy if fuzzy != name else None
+
+    def _similar(self, a: str, b: str) -> bool:
+        """Whether two compact names are equal or (with fuzzy clustering) within the OCR edit budget."""
+        if a == b:
+            return True
+        if not self.fuzzy_clustering:
+            return False
+        if len(confusion_skeleton(a)) != len(confusion_skeleton(b)):
+            return False
+        limit = allowed_edit_distance(min(len(a), len(b)))
+        return ocr_edit_distance(a, b, limit) <= limit
+
+    def _same_unknown_brand(self, a: str, b: str) -> bool:
+        """Whether two normalized unknown names are spellings of one brand."""
+        return self._similar(a.replace(" ", ""), b.replace(" ", ""))
+
+    def _is_head_of(self, shorter: str, longer: str) -> bool:
+        """
+        Whether a normalized name is the leading words of a longer one ("acme" / "acme industrial").
+
+        Generic company heads ("grupo", "industrias") never qualify.
+        """
+        short_words, long_words = shorter.split(), longer.split()
+        if len(long_words) <= len(short_words) or len("".join(short_words)) < MIN_PREFIX_LENGTH:
+            return False
+        if all(word in GENERIC_HEADS for word in short_words):
+            return False
+        return self._similar("".join(short_words), "".join(long_words[:len(short_words)]))
+
+    def _resolve_leading_words(self, normalized: str) -> Optional[str]:
+        """Known brand named by the leading words of an unknown name ("helvex grifería" -> "Helvex")."""
+        words = normalized.split()
+        for count in range(len(words) - 1, 0, -1):
+            leading = " ".join(words[:count])
+            if len(leading.replace(" ", "")) >= MIN_PREFIX_LENGTH:
+                canonical = self.resolve_known(leading)
+                if canonical is not None:
+                    return canonical
+        return None
+
+    def _pick_name(self, aliases: Dict[str, int]) -> str:
+        """Display name of an unknown cluster: the most frequent spelling, preferring mixed case, then the longest."""
+        return max(aliases, key=lambda alias: (aliases[alias], not alias.isupper(), len(alias), alias))
+
+    def cluster(self, detections: Dict[int, Iterable[str]]) -> List[CanonicalBrand]:
+        """
+        Group a document's raw detections into canonical brands.
+
+        Args:
+            detections: Page number -> raw brand strings detected on the page
+
+        Returns:
+            Canonical brands sorted by name, each with its raw aliases and pages
+        """
+        raw_pages: Dict[str, List[int]] = {}
+        for page_number, brands in detections.items():
+            for raw in brands:
+                pages = raw_pages.setdefault(raw, [])
+                if page_number not in pages:
+                    pages.append(page_number)
+
+        groups: Dict[str, Dict[str, List[int]]] = {}  # Canonical name -> raw -> pages
+        known_names = set()
+        unknown: List[str] = []
+        for raw in raw_pages:
+            canonical = self.resolve_known(raw) or self._resolve_leading_words(self.normalize_name(raw))
+            if canonical is None:
+                unknown.append(raw)
+                continue
+            known_names.add(canonical)
+            groups.setdefault(canonical, {})[raw] = raw_pages[raw]
+
+        # Unknown spellings are clustered among themselves
+        normalized = [self.normalize_name(raw) or normalize_for_matching(raw) for raw in unknown]
+        clusters = _DisjointSet(len(unknown))
+        for i in range(len(unknown)):
+            for j in range(i + 1, len(unknown)):
+                if clusters.find(i) != clusters.find(j) and self._same_unknown_brand(normalized[i], normalized[j]):
+                    clusters.union(i, j)
+        # A head name joins its longer form only when it extends to a single brand, so "acme"
+        # never chains "acme industrial" and "acme tools" together
+        head_links: Dict[int, set] = {}
+        for i in range(len(unknown)):
+            for j in range(len(unknown)):
+                if i != j and self._is_head_of(normalized[i], normalized[j]):
+                    head_links.setdefault(i, set()).add(clusters.find(j))
+        for i, roots in head_links.items():
+            roots.discard(clusters.find(i))
+            if len(roots) == 1:
+                clusters.union(i, roots.pop())
+        members: Dict[int, List[str]] = {}
+        for index, raw in enumerate(unknown):
+            members.setdefault(clusters.find(index), []).append(raw)
+        for raws in members.values():
+            name = self._pick_name({raw: len(raw_pages[raw]) for raw in raws})
+            group = groups.setdefault(name, {})
+            for raw in raws:
+                group[raw] = raw_pages[raw]
+
+        result = []
+        for name, raws in groups.items():
+            pages = sorted({page for raw_page_list in raws.values() for page in raw_page_list})
+            result.append(CanonicalBrand(
+                brand_id=brand_id_for(name),
+                name=name,
+                known=name in known_names,
+                aliases={raw: len(raw_pages_list) for raw, raw_pages_list in raws.items()},
+                pages=pages
+            ))
+        return sorted(result, key=lambda brand: brand.name.casefold())
+
+    def alias_map(self, brands: Iterable[CanonicalBrand]) -> Dict[str, CanonicalBrand]:
+        """
+        Index canonical brands by raw string.
+
+        Args:
+            brands: Output of cluster()
+
+        Returns:
+            Raw string -> canonical brand
+        """
+        return {raw: brand for brand in brands for raw in brand.aliases}
+
+    def canonical_names(self, raw_brands: Iterable[str], alias_map: Dict[str, CanonicalBrand]) -> List[str]:
+        """
+        Map a page's raw detections to canonical names without duplicates.
+
+        Args:
+            raw_brands: Raw brand strings of one page
+            alias_map: Output of alias_map()
+
+        Returns:
+            Canonical names in detection order (unmapped strings are kept as they are)
+        """
+        names: List[str] = []
+        for raw in raw_brands:
+            canonical = alias_map.get(raw)
+            name = canonical.name if canonical else raw
+            if name not in names:
+                names.append(name)
+        return names
+
+
+# Global brand canonicalizer instance
+brand_canonicalizer = BrandCanonicalizer()
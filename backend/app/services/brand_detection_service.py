@@ -4,19 +4,34 @@ First extracts text using EasyOCR, then analyzes text with Google Gemini 2.5.
 Optimized for performance with parallel processing and connection pooling.
 """
 
-import json
 import logging
-import re
+import random
 import time
 import asyncio
 import gc
-from typing import List
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.schema import HumanMessage
+from typing import Dict, List, Optional, Tuple
 
 from ..config import settings
 from ..models.brand_detection import BrandDetectionCreate
 from .ocr_service import OCRService
+from .table_service import table_extractor
+from .page_classifier import ProcessingProfile
+from .llm_cache import llm_response_cache
+from .llm_http_client import llm_http_client
+from .llm_providers import GeminiContextCache, LLMResponse, ProviderPool, create_provider_pool, provider_models
+from .prompt_packer import PromptPacker, PackedSection, estimate_tokens
+from .brand_gazetteer import brand_gazetteer, normalize_for_matching
+from .brand_candidate_classifier import brand_candidate_classifier
+from .brand_knowledge_base import brand_knowledge_base
+from .prompt_pruning import prompt_pruner
+from .llm_json import ParsedJSON, parse_llm_json
+from .prompts import (
+    SYSTEM_PROMPT, PROMPT_VERSION, PAGE_RESPONSE_FORMAT, PAGE_RESPONSE_SCHEMA, PACKED_RESPONSE_FORMAT,
+    build_page_message, build_packed_message, build_packed_schema, build_json_repair_message
+)
+from .rate_limiter import gemini_rate_limiter, is_throttling_error, is_transient_error, retry_after_seconds
+from .request_hedger import request_hedger
+from .text_segmenter import text_segmenter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,220 +48,893 @@ class BrandDetectionService:
         # Initialize OCR service
         self.ocr_service = OCRService()
         
-        # Create multiple LLM instances for parallel processing
-        self.llm_instances = []
-        max_instances = min(5, settings.max_concurrent_pages)  # Limit instances to avoid rate limits
-        
-        for i in range(max_instances):
-            llm = ChatGoogleGenerativeAI(
-                model=settings.gemini_model,
-                google_api_key=settings.gemini_api_key,
-                max_retries=3,  # Reduced retries for faster failure
-                temperature=0.1,
-                # Optimize for speed
-                max_tokens=1000,  # Limit response size for faster processing
-                timeout=0  # No timeout
+        # Explicit Gemini context cache holding the system prompt (primary model only, created lazily on first call)
+        primary_model, cheap_model = provider_models()
+        self.context_cache: Optional[GeminiContextCache] = None
+        if settings.gemini_context_cache and settings.llm_provider == "gemini":
+            self.context_cache = GeminiContextCache(
+                primary_model,
+                settings.gemini_context_cache_ttl_minutes,
+                f"brand-detection-prompt-{PROMPT_VERSION}"
             )
-            self.llm_instances.append(llm)
         
-        logger.info(f"BrandDetectionService initialized with {len(self.llm_instances)} LLM instances and OCR service")
+        # LLM backends share one pooled HTTP client (CONNECTION_POOL_SIZE connections); requests go to the
+        # backend with the fewest in-flight calls and their rate is governed by the adaptive limiter
+        self.http_client = llm_http_client
+        self.llm_pool: ProviderPool = create_provider_pool(primary_model, self.context_cache)
         
-        # Create semaphore for rate limiting
-        self.semaphore = asyncio.Semaphore(settings.max_concurrent_pages)
+        # Model cascade: local gazetteer, then an optional cheaper model, then the primary model
+        self.cascade_enabled = settings.llm_cascade_enabled
+        self.cheap_llm_pool: Optional[ProviderPool] = None
+        if self.cascade_enabled and cheap_model:
+            self.cheap_llm_pool = create_provider_pool(cheap_model)
+        self.llm_tiers = {"primary": self.llm_pool, "cheap": self.cheap_llm_pool}
+        self.cascade_stats = {tier: {"pages": 0, "resolved": 0, "escalated": 0} for tier in ("local", "cheap")}
+        self.cascade_stats["cheap"]["bypassed"] = 0  # Pages with brand-like candidates sent straight to the primary model
+        # Cached answers depend on the backend and on which tiers may produce them
+        self.cache_model_key = primary_model if settings.llm_provider == "gemini" else f"{settings.llm_provider}:{primary_model}"
+        if self.cheap_llm_pool:
+            self.cache_model_key = f"{self.cache_model_key}+cascade:{cheap_model}"
+        
+        logger.info(f"BrandDetectionService initialized with {len(self.llm_pool.providers)} {settings.llm_provider} LLM backends ({primary_model}) and OCR service (prompt version {PROMPT_VERSION})")
+        
+        # Token usage across all calls since startup
+        self.usage_totals = {
+            "llm_calls": 0, "input_tokens": 0, "output_tokens": 0, "cached_input_tokens": 0, "truncated_responses": 0,
+            "json_retries": 0, "partial_responses": 0, "wasted_calls": 0
+        }
+        
+        # Requests/minute, tokens/minute and adaptive concurrency for all LLM calls
+        self.rate_limiter = gemini_rate_limiter
+        self.request_hedger = request_hedger
+        
+        # LLM usage counters per document, collected into the document summary
+        self.document_stats: Dict[str, Dict[str, int]] = {}
+        
+        # Optional packing of several small pages into one request
+        self.prompt_packer = PromptPacker(self._analyze_packed_sections) if settings.llm_packing_enabled else None
+    
+    def _record_cascade(self, tier: str, resolved: bool, document_id: Optional[str]) -> None:
+        """Count a page handled (resolved) or passed on (escalated) by a cascade tier."""
+        outcome = "resolved" if resolved else "escalated"
+        self.cascade_stats[tier]["pages"] += 1
+        self.cascade_stats[tier][outcome] += 1
+        self.record_document_stat(document_id, f"cascade_{tier}_{outcome}")
+    
+    def get_cascade_stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get per-tier cascade counters and escalation rates.
+        
+        Returns:
+            Dictionary keyed by tier ("local", "cheap")
+        """
+        return {
+            tier: {**stats, "escalation_rate": round(stats["escalated"] / stats["pages"], 4) if stats["pages"] else 0.0}
+            for tier, stats in self.cascade_stats.items()
+        }
+    
+    def record_document_stat(self, document_id: Optional[str], key: str, amount: int = 1) -> None:
+        """Increment a per-document counter (no-op when the caller has no document)."""
+        if document_id is None:
+            return
+        stats = self.document_stats.setdefault(document_id, {})
+        stats[key] = stats.get(key, 0) + amount
     
-    def _create_text_analysis_prompt(self, page_number: int, extracted_text: str) -> str:
+    def pop_document_stats(self, document_id: str) -> Dict[str, int]:
         """
-        Create optimized prompt for brand detection from extracted text.
+        Get and clear LLM usage counters for a document.
         
         Args:
-            page_number: Page number being analyzed
-            extracted_text: Complete text extracted from the page
+            document_id: Document ID
             
         Returns:
-            Formatted prompt string for text analysis
+            Counter dictionary (empty if nothing was recorded)
+        """
+        return self.document_stats.pop(document_id, {})
+    
+    async def _invoke_llm(
+        self,
+        user_content: str,
+        label: str,
+        document_ids: List[Optional[str]],
+        tier: str = "primary",
+        response_schema: Optional[Dict] = None
+    ) -> LLMResponse:
+        """
+        Send the system prompt plus a variable user message to the LLM and record token usage.
+        
+        Args:
+            user_content: Variable part of the request (page text)
+            label: Description of the request for logging (e.g. "page 3")
+            document_ids: Document of each page in the request; usage is split evenly among them
+            tier: Model tier ("primary" or the cascade's "cheap" model)
+            response_schema: JSON schema for structured output (sent when LLM_STRUCTURED_OUTPUT is enabled)
+        
+        Returns:
+            Completion result (may be truncated; truncation is logged and counted)
         """
-        logger.info(f"Creating text analysis prompt for page {page_number}")
+        if not settings.llm_structured_output:
+            response_schema = None
+        # Reserve input plus a typical brand-list answer; the limiter reconciles with actual usage
+        estimated_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(user_content) + 256
         
-        return f"""
-        Eres un experto analista especializado en detectar marcas comerciales en texto extraído de planos arquitectónicos. 
-        Analiza el siguiente texto extraído de un plano arquitectónico (página {page_number}) y detecta TODAS las marcas comerciales mencionadas.
-
-        TEXTO EXTRAÍDO DEL PLANO (PÁGINA {page_number}):
-        {extracted_text}
-
-        METODOLOGÍA DE ANÁLISIS SISTEMÁTICO:
-        
-        1. **ANÁLISIS COMPLETO DEL TEXTO**:
-           - Revisa cada palabra y frase del texto extraído
-           - Examina TODAS las líneas y párrafos sin importar el contexto
-           - Busca marcas en diferentes formatos (mayúsculas, minúsculas, mixtas)
-           - Considera variaciones de escritura y abreviaciones
-           - Analiza nombres de modelos y números de serie que puedan indicar marcas
-        
-        2. **TIPOS DE MARCAS A DETECTAR**:
-           - Equipos eléctricos y electrónicos (Samsung, LG, Bosch, Siemens, Schneider, ABB, General Electric, Westinghouse, etc.)
-           - Materiales de construcción (Cemex, Holcim, Cementos Argos, Corona, LafargeHolcim, etc.)
-           - Equipos de iluminación (Philips, Osram, GE Lighting, Sylvania, Cree, etc.)
-           - Sistemas de seguridad (Honeywell, Johnson Controls, Bosch Security, Axis, Hikvision, etc.)
-           - Equipos de aire acondicionado (Carrier, Trane, York, Daikin, Mitsubishi Electric, Lennox, etc.)
-           - Herramientas y equipos (Makita, DeWalt, Milwaukee, Bosch, Hilti, Caterpillar, etc.)
-           - Pinturas y acabados (Sherwin-Williams, PPG, Comex, Pinturas Osel, Benjamin Moore, etc.)
-           - Plomería y sanitarios (Kohler, Toto, American Standard, Corona, Moen, Delta, etc.)
-           - Pisos y acabados (Armstrong, Mohawk, Porcelanite, Tarkett, Shaw, etc.)
-           - Equipos de cocina (Whirlpool, Samsung, LG, Bosch, KitchenAid, Frigidaire, etc.)
-           - Sistemas de audio/video (Sony, Samsung, LG, Bose, JBL, Yamaha, etc.)
-           - Equipos de cómputo (Dell, HP, Lenovo, Apple, IBM, Microsoft, etc.)
-           - Equipos de red (Cisco, TP-Link, Netgear, Ubiquiti, D-Link, etc.)
-           - Equipos médicos (Philips Healthcare, GE Healthcare, Siemens Healthineers, etc.)
-           - Elevadores y escaleras (Otis, Schindler, KONE, ThyssenKrupp, etc.)
-           - Cualquier otra marca comercial reconocible
-        
-        3. **CRITERIOS DE DETECCIÓN**:
-           - Busca nombres de marcas completos y abreviados
-           - Incluye variaciones de escritura (ej: "Samsung" y "SAMSUNG")
-           - Detecta marcas en combinación con números de modelo
-           - Considera marcas en contexto de especificaciones
-           - Incluye marcas mencionadas en listas de materiales
-           - Detecta marcas en notas técnicas y especificaciones
-           - Considera marcas en diferentes idiomas (español e inglés)
-        
-        4. **EXCLUSIONES ESPECÍFICAS**:
-           - Hergonsa y todas sus variantes (HERGONSA, hergonsa, Grupo Hergonsa, Hergonsa SA, etc.)
-           - Nombres genéricos de productos (ej: "lámpara", "interruptor", "cable", "tubo")
-           - Nombres de materiales genéricos (ej: "concreto", "acero", "aluminio", "cobre")
-           - Nombres de empresas que no son marcas comerciales reconocidas
-           - Texto que no representa marcas comerciales (códigos, referencias, medidas)
-           - Palabras comunes que no son marcas (colores, formas, tamaños)
-           - Términos técnicos genéricos (voltaje, amperaje, frecuencia)
-        
-        5. **PROCESO DE VALIDACIÓN**:
-           - Verifica que cada detección sea una marca comercial real
-           - Confirma que el texto detectado sea legible y completo
-           - Asegúrate de que no sean nombres genéricos o descriptivos
-           - Valida que las marcas estén en contexto comercial
-        
-        EJEMPLOS DE DETECCIÓN CORRECTA:
-        ✅ "Samsung" 
-        ✅ "LG" 
-        ✅ "Bosch" 
-        ✅ "Philips" 
-        ✅ "Carrier" 
-        ✅ "Kohler" 
-        ✅ "Cemex" 
-        ❌ "Hergonsa" (excluido - nombre de la empresa cliente)
-        ❌ "lámpara LED" (descripción genérica)
-        ❌ "interruptor simple" (descripción genérica)
-        
-        INSTRUCCIONES FINALES:
-        - Analiza exhaustivamente todo el texto proporcionado
-        - No te apresures, revisa cada palabra con atención
-        - Si no encuentras marcas, responde con una lista vacía
-        - Responde ÚNICAMENTE con el JSON especificado
-        - Asegúrate de que el JSON sea válido y completo
-        
-        Formato de respuesta requerido:
-        {{
-            "brands_detected": [
-                "Nombre exacto de la marca 1",
-                "Nombre exacto de la marca 2"
-            ],
-            "page_number": {page_number},
-            "text_analysis_summary": "Resumen breve del análisis realizado"
-        }}
-
-        Responde únicamente con el JSON, sin texto adicional ni explicaciones.
+        # Slow calls are duplicated on another client when hedging is enabled; the first non-empty answer wins
+        response = await self.request_hedger.run(
+            lambda: self._call_llm(user_content, estimated_tokens, label, tier, response_schema),
+            lambda: self._call_llm(user_content, estimated_tokens, f"{label} (hedge)", tier, response_schema),
+            estimated_tokens,
+            label,
+            is_valid=lambda result: bool(result.text)
+        )
+        
+        input_tokens = response.input_tokens
+        output_tokens = response.output_tokens
+        cached_tokens = response.cached_tokens
+        finish_reason = response.finish_reason
+        truncated = response.truncated
+        
+        self.usage_totals["llm_calls"] += 1
+        self.usage_totals["input_tokens"] += input_tokens
+        self.usage_totals["output_tokens"] += output_tokens
+        self.usage_totals["cached_input_tokens"] += cached_tokens
+        logger.info(f"LLM call for {label}: {input_tokens} input tokens ({cached_tokens} cached), {output_tokens} output tokens, finish reason {finish_reason or 'unknown'}")
+        if truncated:
+            self.usage_totals["truncated_responses"] += 1
+            logger.warning(f"LLM response for {label} hit the {settings.llm_max_output_tokens} output token limit and is truncated")
+        
+        shares = len(document_ids) or 1
+        for document_id in document_ids:
+            self.record_document_stat(document_id, "llm_calls")
+            self.record_document_stat(document_id, "llm_input_tokens", input_tokens // shares)
+            self.record_document_stat(document_id, "llm_output_tokens", output_tokens // shares)
+            self.record_document_stat(document_id, "llm_cached_input_tokens", cached_tokens // shares)
+            if truncated:
+                self.record_document_stat(document_id, "llm_truncated_responses")
+        
+        return response
+    
+    def _record_llm_outcome(self, document_ids: List[Optional[str]], outcome: str) -> None:
+        """Count a JSON retry, partial response or wasted call globally and for each document in the request."""
+        self.usage_totals[outcome] += 1
+        for document_id in document_ids:
+            self.record_document_stat(document_id, f"llm_{outcome}")
+    
+    async def _request_json(
+        self,
+        user_content: str,
+        label: str,
+        document_ids: List[Optional[str]],
+        response_format: str,
+        response_schema: Optional[Dict] = None,
+        tier: str = "primary"
+    ) -> ParsedJSON:
+        """
+        Ask the LLM for a JSON answer, retrying once with a request that only re-asks for the JSON.
+        
+        Args:
+            user_content: Variable part of the request
+            label: Description of the request for logging
+            document_ids: Document of each page in the request
+            response_format: Expected JSON format example (used by the retry)
+            response_schema: JSON schema for structured output
+            tier: Model tier
+            
+        Returns:
+            Parsed answer; complete is False when it was recovered from a truncated response
+        """
+        response = await self._invoke_llm(user_content, label, document_ids, tier, response_schema)
+        parsed = parse_llm_json(response.text)
+        if parsed.ok:
+            if not parsed.complete:
+                logger.warning(f"Using the complete prefix of a truncated JSON response for {label}")
+                self._record_llm_outcome(document_ids, "partial_responses")
+            return parsed
+        
+        if response.text.strip():
+            # The answer is there but not as parseable JSON: have the model restate it without the page text
+            logger.warning(f"Unparseable JSON response for {label}, retrying for the JSON only: {response.text[:200]!r}")
+            self._record_llm_outcome(document_ids, "json_retries")
+            try:
+                retry = await self._invoke_llm(
+                    build_json_repair_message(response.text, response_format),
+                    f"{label} (JSON retry)",
+                    document_ids,
+                    tier,
+                    response_schema
+                )
+                parsed = parse_llm_json(retry.text)
+                if parsed.ok:
+                    return parsed
+            except Exception as e:
+                logger.error(f"JSON retry failed for {label}: {str(e)}")
+        
+        # Neither the original call nor the retry produced a usable answer
+        self._record_llm_outcome(document_ids, "wasted_calls")
+        return parsed
+    
+    async def _call_llm(
+        self,
+        user_content: str,
+        estimated_tokens: int,
+        label: str,
+        tier: str = "primary",
+        response_schema: Optional[Dict] = None
+    ) -> LLMResponse:
+        """
+        Make one LLM call through the rate limiter, retrying failed attempts.
+        
+        Throttling responses are reported to the limiter, which pauses and lowers
+        concurrency before the retry; other transient errors (5xx, transport
+        errors, timeouts) get a few retries after a jittered exponential backoff.
+        
+        Args:
+            user_content: Variable part of the request
+            estimated_tokens: Tokens reserved in the limiter's TPM bucket
+            label: Description of the request for logging
+            tier: Model tier selecting the backend pool
+            response_schema: JSON schema for structured output
+        
+        Returns:
+            Provider-neutral completion result
         """
+        pool = self.llm_tiers[tier]
+        attempt = 0
+        transient_attempt = 0
+        retry_delay = 0.0
+        while True:
+            if retry_delay:
+                # Back off without holding a concurrency slot
+                await asyncio.sleep(retry_delay)
+                retry_delay = 0.0
+            async with self.rate_limiter.acquire(estimated_tokens) as permit:
+                try:
+                    # Least-outstanding backend at the moment the limiter admits the request
+                    async with pool.lease() as llm:
+                        response = await llm.complete(SYSTEM_PROMPT, user_content, response_schema)
+                except Exception as e:
+                    if is_throttling_error(e):
+                        if attempt >= settings.llm_max_retries:
+                            raise
+                        permit.throttled(retry_after_seconds(e))
+                        attempt += 1
+                        logger.warning(f"{pool.name} throttled request for {label} (attempt {attempt}/{settings.llm_max_retries}): {str(e)[:200]}")
+                        continue
+                    if not is_transient_error(e) or transient_attempt >= settings.llm_transient_retries:
+                        raise
+                    transient_attempt += 1
+                    # Full jitter keeps retries from pages that failed together from arriving together
+                    retry_delay = random.uniform(0, settings.llm_transient_retry_delay * 2 ** (transient_attempt - 1))
+                    logger.warning(f"{pool.name} transient error for {label}, retrying in {retry_delay:.2f}s (attempt {transient_attempt}/{settings.llm_transient_retries}): {str(e)[:200]}")
+                    continue
+                permit.success(response.total_tokens or None)
+                return response
     
     async def detect_brands_from_text(
         self, 
         extracted_text: str, 
-        page_number: int
+        page_number: int,
+        document_id: Optional[str] = None,
+        run_llm: bool = True
     ) -> List[str]:
         """
-        Detect brands from extracted text using Gemini 2.5.
+        Detect brands from extracted text: local gazetteer first, then Gemini 2.5 with response caching.
         
         Args:
             extracted_text: Complete text extracted from the page
             page_number: Page number being analyzed
+            document_id: Optional document ID for per-document cache statistics
+            run_llm: False to match the text against the gazetteer only (OCR-only profiles)
             
         Returns:
             List of detected brands
         """
-        async with self.semaphore:  # Rate limiting
+        brands, _ = await self.analyze_page_text(extracted_text, page_number, document_id, run_llm)
+        return brands
+    
+    async def analyze_page_text(
+        self, 
+        extracted_text: str, 
+        page_number: int,
+        document_id: Optional[str] = None,
+        run_llm: bool = True
+    ) -> Tuple[List[str], bool]:
+        """
+        Detect brands from extracted text and report whether the LLM analysis failed.
+        
+        Args:
+            extracted_text: Complete text extracted from the page
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document cache statistics
+            run_llm: False to match the text against the gazetteer only (OCR-only profiles)
+            
+        Returns:
+            Tuple of (detected brands, True if the LLM analysis failed and only local brands were kept)
+        """
+        logger.info(f"Starting text-based brand detection for page {page_number}")
+        logger.info(f"Text length: {len(extracted_text)} characters")
+        
+        gazetteer_brands, llm_text = self.prepare_llm_text(extracted_text, page_number, document_id, run_llm)
+        if llm_text is None:
+            return gazetteer_brands, False
+        
+        try:
+            segments = text_segmenter.split(llm_text)
+            if len(segments) > 1:
+                # Map-reduce: long pages are analyzed as concurrent segments and merged
+                brands = await self._analyze_segments(segments, page_number, document_id)
+            elif llm_text != extracted_text and not text_segmenter.needs_split(extracted_text) and random.random() < settings.llm_pruning_verify_sample_rate:
+                # Recall check: analyze the unpruned text too and report brands pruning lost
+                brands, unpruned_brands = await asyncio.gather(
+                    self._cached_llm_analysis(llm_text, page_number, document_id),
+                    self._analyze_text_with_llm(extracted_text, page_number, document_id)
+                )
+                brands = self._check_pruning_recall(brands, unpruned_brands, page_number, document_id)
+            else:
+                brands = await self._cached_llm_analysis(llm_text, page_number, document_id)
+        except Exception as e:
+            logger.error(f"Text analysis failed for page {page_number}: {str(e)}")
+            self.record_document_stat(document_id, "llm_failed_pages")
+            return gazetteer_brands, True
+        
+        if brands is None:
+            # Request or JSON retry failed: keep the gazetteer hits, but flag the page
+            logger.warning(f"LLM analysis failed for page {page_number}; keeping {len(gazetteer_brands)} gazetteer brands")
+            self.record_document_stat(document_id, "llm_failed_pages")
+            return gazetteer_brands, True
+        
+        return self.finalize_brands(brands, gazetteer_brands, document_id), False
+    
+    def prepare_llm_text(
+        self, 
+        extracted_text: str, 
+        page_number: int,
+        document_id: Optional[str] = None,
+        run_llm: bool = True
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Run the local stages (gazetteer with reviewed knowledge, pruning) for a page.
+        
+        Args:
+            extracted_text: Complete text extracted from the page
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document statistics
+            run_llm: False to stop after the gazetteer (OCR-only profiles)
+            
+        Returns:
+            Tuple of (gazetteer brands, text for the LLM or None when the page was resolved locally)
+        """
+        if not extracted_text or extracted_text.strip() == "":
+            logger.info(f"No text extracted for page {page_number} - no brands to detect")
+            return [], None
+        
+        # Known brands first (including reviewed knowledge); skip the LLM when nothing unexplained is left
+        scan = brand_gazetteer.scan(extracted_text)
+        if scan.brands:
+            self.record_document_stat(document_id, "gazetteer_hits", len(scan.brands))
+        skip_llm = brand_gazetteer.skip_llm and scan.can_skip_llm
+        if brand_knowledge_base.record_page(scan.learned, scan.rejected, skip_llm):
+            for key, names in (("knowledge_auto_accepted", scan.learned), ("knowledge_auto_rejected", scan.rejected)):
+                if names:
+                    self.record_document_stat(document_id, key, len(names))
+            if skip_llm:
+                self.record_document_stat(document_id, "llm_calls_skipped_knowledge")
+        if skip_llm:
+            logger.info(f"Gazetteer resolved page {page_number} without LLM: {scan.brands}")
+            self.record_document_stat(document_id, "llm_calls_skipped_gazetteer")
+            if self.cascade_enabled:
+                self._record_cascade("local", True, document_id)
+            return list(scan.brands), None
+        
+        # OCR-only profiles keep what the gazetteer recognized and never call the LLM
+        if not run_llm:
+            logger.info(f"Processing profile skips the LLM for page {page_number}, keeping gazetteer brands: {scan.brands}")
+            self.record_document_stat(document_id, "llm_calls_skipped_profile")
+            return list(scan.brands), None
+        
+        # The cascade's local tier is the gazetteer: it resolves a page with nothing left to explain
+        # even when BRAND_GAZETTEER_SKIP_LLM is off, and escalates every other page
+        if self.cascade_enabled:
+            if scan.can_skip_llm:
+                logger.info(f"Local tier resolved page {page_number} without LLM (no unknown candidates): {scan.brands}")
+                self._record_cascade("local", True, document_id)
+                return list(scan.brands), None
+            self._record_cascade("local", False, document_id)
+        
+        # Drop dimensions, numbers, generic vocabulary and fragments from the payload
+        llm_text = self._prune_text(extracted_text, scan.brands, page_number, document_id)
+        if not llm_text.strip():
+            logger.info(f"Nothing left to analyze on page {page_number} after pruning")
+            self.record_document_stat(document_id, "llm_calls_skipped_pruning")
+            return list(scan.brands), None
+        
+        return list(scan.brands), llm_text
+    
+    def finalize_brands(
+        self, 
+        llm_brands: Optional[List[str]], 
+        gazetteer_brands: List[str],
+        document_id: Optional[str] = None
+    ) -> List[str]:
+        """
+        Combine LLM brands with local gazetteer hits, dropping reviewed false positives.
+        
+        Args:
+            llm_brands: Brands reported by the LLM (None if the analysis failed)
+            gazetteer_brands: Brands found by the gazetteer
+            document_id: Optional document ID for per-document statistics
+            
+        Returns:
+            Final brand list for the page
+        """
+        # Fix OCR-garbled names echoed by the LLM, then add local hits it missed
+        normalized = []
+        for brand in llm_brands or []:
+            brand = brand_gazetteer.normalize_brand(brand)
+            if brand not in normalized:
+                normalized.append(brand)
+        kept = brand_knowledge_base.filter_rejected(normalized)
+        if len(kept) != len(normalized):
+            self.record_document_stat(document_id, "knowledge_auto_rejected", len(normalized) - len(kept))
+        return brand_gazetteer.merge(kept, gazetteer_brands)
+    
+    def make_cache_key(self, text: str) -> str:
+        """LLM response cache key for a page text under the current model tiers and prompt version."""
+        return llm_response_cache.make_key(text, self.cache_model_key, PROMPT_VERSION)
+    
+    def parse_brand_response(self, response_text: str) -> Optional[List[str]]:
+        """
+        Parse a single-page JSON answer (e.g. from a batch job) into a brand list.
+        
+        Args:
+            response_text: Raw model output
+            
+        Returns:
+            Cleaned brand list, or None if the output is not a valid answer
+        """
+        parsed = parse_llm_json(response_text)
+        if parsed.ok:
+            return self._clean_brand_list(parsed.value.get("brands_detected"))
+        return None
+    
+    async def _cached_llm_analysis(
+        self, 
+        text: str, 
+        page_number: int, 
+        document_id: Optional[str]
+    ) -> Optional[List[str]]:
+        """
+        Analyze text with the LLM through the response cache.
+        
+        Args:
+            text: Text for LLM analysis (one request's worth)
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document statistics
+            
+        Returns:
+            List of detected brands, or None if the analysis failed
+        """
+        cache_key = self.make_cache_key(text)
+        brands, source = await llm_response_cache.get_or_compute(
+            cache_key,
+            lambda: self._analyze_text_with_llm(text, page_number, document_id)
+        )
+        if source in ("memory", "disk", "in_flight"):
+            logger.info(f"LLM cache hit ({source}) for page {page_number}")
+            self.record_document_stat(document_id, "llm_cache_hits")
+        else:
+            self.record_document_stat(document_id, "llm_cache_misses")
+        return brands
+    
+    async def _analyze_segments(
+        self, 
+        segments: List[str], 
+        page_number: int, 
+        document_id: Optional[str]
+    ) -> Optional[List[str]]:
+        """
+        Analyze the segments of a long page concurrently and merge their brands.
+        
+        Each segment is cached on its own, so a failed segment is retried on the
+        next run without repeating the others.
+        
+        Args:
+            segments: Segments from the text segmenter
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document statistics
+            
+        Returns:
+            Deduplicated brands in order of first appearance, or None if every segment failed
+        """
+        logger.info(f"Page {page_number} text exceeds {text_segmenter.token_budget} tokens, analyzing {len(segments)} segments")
+        self.record_document_stat(document_id, "segmented_pages")
+        self.record_document_stat(document_id, "segments_analyzed", len(segments))
+        
+        results = await asyncio.gather(
+            *[self._cached_llm_analysis(segment, page_number, document_id) for segment in segments],
+            return_exceptions=True
+        )
+        
+        merged: List[str] = []
+        seen = set()
+        failed = 0
+        for result in results:
+            if isinstance(result, Exception) or result is None:
+                failed += 1
+                continue
+            for brand in result:
+                if brand.casefold() not in seen:
+                    seen.add(brand.casefold())
+                    merged.append(brand)
+        
+        if failed:
+            logger.warning(f"{failed}/{len(segments)} segments failed for page {page_number}")
+            self.record_document_stat(document_id, "segments_failed", failed)
+        if failed == len(segments):
+            return None
+        return merged
+    
+    def _prune_text(
+        self, 
+        extracted_text: str, 
+        gazetteer_brands: List[str], 
+        page_number: int, 
+        document_id: Optional[str]
+    ) -> str:
+        """
+        Prune the LLM payload, keeping the original text if pruning would hide a known brand.
+        
+        Args:
+            extracted_text: Text for LLM analysis
+            gazetteer_brands: Brands the gazetteer found in the unpruned text
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document statistics
+            
+        Returns:
+            Text to send to the LLM
+        """
+        if not prompt_pruner.enabled:
+            return extracted_text
+        
+        pruned_text, stats = prompt_pruner.prune(extracted_text)
+        
+        # Every brand visible locally must survive pruning
+        lost_brands = set(gazetteer_brands) - set(brand_gazetteer.scan(pruned_text).brands)
+        if lost_brands:
+            logger.warning(f"Pruning would drop known brands {sorted(lost_brands)} on page {page_number}, sending unpruned text")
+            self.record_document_stat(document_id, "pruning_fallbacks")
+            return extracted_text
+        
+        logger.info(f"Pruned {stats['tokens_removed']}/{stats['tokens_in']} tokens on page {page_number}: {dict((k, v) for k, v in stats.items() if k not in ('tokens_in', 'tokens_removed'))}")
+        self.record_document_stat(document_id, "prompt_tokens_in", stats["tokens_in"])
+        self.record_document_stat(document_id, "prompt_tokens_pruned", stats["tokens_removed"])
+        return pruned_text
+    
+    def _check_pruning_recall(
+        self, 
+        pruned_brands: Optional[List[str]], 
+        unpruned_brands: Optional[List[str]], 
+        page_number: int, 
+        document_id: Optional[str]
+    ) -> Optional[List[str]]:
+        """
+        Compare brands found with and without pruning on a sampled page.
+        
+        Args:
+            pruned_brands: Brands from the pruned payload
+            unpruned_brands: Brands from the original payload
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document statistics
+            
+        Returns:
+            Union of both results, so a sampled page never loses a brand
+        """
+        if pruned_brands is None or unpruned_brands is None:
+            return pruned_brands if pruned_brands is not None else unpruned_brands
+        
+        self.record_document_stat(document_id, "pruning_recall_checks")
+        found = {brand.casefold() for brand in pruned_brands}
+        missed = [brand for brand in unpruned_brands if brand.casefold() not in found]
+        if missed:
+            logger.warning(f"Pruning recall check on page {page_number}: brands only found in unpruned text: {missed}")
+            self.record_document_stat(document_id, "pruning_recall_misses", len(missed))
+        return list(pruned_brands) + missed
+    
+    async def _analyze_text_with_llm(
+        self, 
+        extracted_text: str, 
+        page_number: int,
+        document_id: Optional[str] = None
+    ) -> Optional[List[str]]:
+        """
+        Analyze page text with Gemini, packed with other pages when packing is enabled.
+        
+        Args:
+            extracted_text: Complete text extracted from the page
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document token usage
+            
+        Returns:
+            List of detected brands, or None if the request or parsing failed (not cached)
+        """
+        if self.cheap_llm_pool:
+            if self._has_brand_like_candidates(extracted_text):
+                # The cheap model tends to miss unknown brands; spend its call only on pages without strong cues
+                logger.info(f"Page {page_number} has brand-like candidates, skipping the cheap tier")
+                self.cascade_stats["cheap"]["bypassed"] += 1
+                self.record_document_stat(document_id, "cascade_cheap_bypassed")
+            else:
+                brands = await self._analyze_cheap_tier(extracted_text, page_number, document_id)
+                if brands is not None:
+                    return brands
+        if self.prompt_packer is not None and self.prompt_packer.fits(extracted_text):
+            return await self.prompt_packer.submit(page_number, extracted_text, document_id)
+        return await self._analyze_single_page(extracted_text, page_number, document_id)
+    
+    def _has_brand_like_candidates(self, extracted_text: str) -> bool:
+        """
+        Check whether any token the gazetteer cannot explain scores as brand-like.
+        
+        Args:
+            extracted_text: Text for LLM analysis
+            
+        Returns:
+            True if a candidate reaches LLM_CASCADE_BRAND_LIKE_THRESHOLD
+        """
+        candidates = brand_gazetteer.scan(extracted_text).unmatched_candidates
+        scores = brand_candidate_classifier.score(extracted_text, candidates)
+        return any(score >= settings.llm_cascade_brand_like_threshold for score in scores.values())
+    
+    async def _analyze_cheap_tier(
+        self, 
+        extracted_text: str, 
+        page_number: int,
+        document_id: Optional[str] = None
+    ) -> Optional[List[str]]:
+        """
+        First LLM tier of the cascade: ask the cheaper model and keep only confident answers.
+        
+        An answer is confident when it parses, the model reports no uncertain terms
+        and every brand it names actually occurs in the text.
+        
+        Args:
+            extracted_text: Text for LLM analysis
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document statistics
+            
+        Returns:
+            Detected brands, or None to escalate to the primary model
+        """
+        brands = None
+        try:
+            parsed = await self._request_json(
+                build_page_message(page_number, extracted_text),
+                f"page {page_number} ({self.cheap_llm_pool.model})",
+                [document_id],
+                PAGE_RESPONSE_FORMAT,
+                PAGE_RESPONSE_SCHEMA,
+                tier="cheap"
+            )
+            # A truncated answer may have lost brands; not confident enough to skip the primary model
+            if parsed.ok and parsed.complete and not parsed.value.get("uncertain"):
+                brands = self._clean_brand_list(parsed.value.get("brands_detected"))
+        except Exception as e:
+            logger.warning(f"Cheap-tier analysis failed for page {page_number}, escalating: {str(e)}")
+        
+        if brands:
+            # Names absent from the text are likely hallucinated; let the primary model decide
+            compact_text = "".join(char for char in normalize_for_matching(extracted_text) if char.isalnum())
+            local_brands = set(brand_gazetteer.scan(extracted_text).brands)
+            for brand in brands:
+                compact_brand = "".join(char for char in normalize_for_matching(brand) if char.isalnum())
+                if compact_brand not in compact_text and brand_gazetteer.normalize_brand(brand) not in local_brands:
+                    brands = None
+                    break
+        
+        self._record_cascade("cheap", brands is not None, document_id)
+        if brands is None:
+            logger.info(f"Escalating page {page_number} to {self.llm_pool.model}")
+        return brands
+    
+    async def _analyze_single_page(
+        self, 
+        extracted_text: str, 
+        page_number: int,
+        document_id: Optional[str] = None
+    ) -> Optional[List[str]]:
+        """
+        Send one page's text to Gemini and parse the detected brands.
+        
+        Args:
+            extracted_text: Complete text extracted from the page
+            page_number: Page number being analyzed
+            document_id: Optional document ID for per-document token usage
+            
+        Returns:
+            List of detected brands, or None if the request or parsing failed (not cached)
+        """
+        try:
+            start_time = time.time()
+            
+            # Only the page text varies; the instructions go in the (cacheable) system prompt
             try:
-                start_time = time.time()
-                logger.info(f"Starting text-based brand detection for page {page_number}")
-                logger.info(f"Text length: {len(extracted_text)} characters")
-                
-                if not extracted_text or extracted_text.strip() == "":
-                    logger.info(f"No text extracted for page {page_number} - no brands to detect")
-                    return []
-                
-                # Create text analysis prompt
-                prompt = self._create_text_analysis_prompt(page_number, extracted_text)
-                
-                # Create message with text
-                message = HumanMessage(content=prompt)
-                
-                # Get response from Gemini
-                try:
-                    response = await self.llm_instances[page_number % len(self.llm_instances)].ainvoke([message])
-                    response_text = response.content
-                    logger.info(f"Received text analysis response for page {page_number}: {len(response_text)} characters")
-                except Exception as e:
-                    logger.error(f"Error getting Gemini response for page {page_number}: {str(e)}")
-                    return []
-                
-                # Parse response
-                if not response_text or response_text.strip() == "":
-                    logger.info(f"Empty response for page {page_number} - no brands detected")
-                    return []
-                
-                # Extract JSON from response
-                json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group()
-                    result = json.loads(json_str)
-                else:
-                    logger.warning(f"No JSON pattern found in response for page {page_number}, trying to parse entire response")
-                    result = json.loads(response_text)
-                
-                # Validate and extract brands
-                if isinstance(result, dict) and "brands_detected" in result:
-                    brands = result["brands_detected"]
-                    if isinstance(brands, list):
-                        # Filter out empty strings and normalize
-                        brands = [brand.strip() for brand in brands if brand and brand.strip()]
-                        
-                        # Filter out Hergon and its variants
-                        excluded_brands = ['hergon', 'grupo hergon', 'hergon sa', 'grupo hergon sa']
-                        brands = [
-                            brand for brand in brands
-                            if not any(excluded.lower() in brand.lower() for excluded in excluded_brands)
-                        ]
-                        
-                        processing_time = time.time() - start_time
-                        logger.info(f"Text analysis completed for page {page_number}: {len(brands)} brands found in {processing_time:.2f} seconds")
-                        
-                        if brands:
-                            logger.info(f"Brands detected on page {page_number}: {brands}")
-                        
-                        return brands
-                
-                logger.warning(f"Invalid response format for page {page_number}")
-                return []
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse response as JSON for page {page_number}: {str(e)}")
-                return []
+                parsed = await self._request_json(
+                    build_page_message(page_number, extracted_text),
+                    f"page {page_number}",
+                    [document_id],
+                    PAGE_RESPONSE_FORMAT,
+                    PAGE_RESPONSE_SCHEMA
+                )
             except Exception as e:
-                logger.error(f"Text analysis failed for page {page_number}: {str(e)}")
-                return []
+                logger.error(f"Error getting LLM response for page {page_number}: {str(e)}")
+                return None
+            
+            # A truncated answer may have lost brands; never return (and cache) a partial list
+            if parsed.ok and not parsed.complete:
+                logger.warning(f"Truncated LLM response for page {page_number}; treating the analysis as failed")
+                return None
+            
+            # Validate and extract brands
+            if parsed.ok and "brands_detected" in parsed.value:
+                brands = self._clean_brand_list(parsed.value["brands_detected"])
+                if brands is not None:
+                    processing_time = time.time() - start_time
+                    logger.info(f"Text analysis completed for page {page_number}: {len(brands)} brands found in {processing_time:.2f} seconds")
+                    
+                    if brands:
+                        logger.info(f"Brands detected on page {page_number}: {brands}")
+                    
+                    return brands
+            
+            logger.warning(f"Invalid response format for page {page_number}")
+            return None
+            
+        except Exception as e:
+            logger.error(f"Text analysis failed for page {page_number}: {str(e)}")
+            return None
+    
+    def _clean_brand_list(self, brands) -> Optional[List[str]]:
+        """
+        Normalize a brand list from an LLM response.
+        
+        Args:
+            brands: Value of a "brands_detected" field
+            
+        Returns:
+            Stripped brand names without Hergon variants, or None if the value is not a list
+        """
+        if not isinstance(brands, list):
+            return None
+        
+        # Filter out empty strings and normalize
+        brands = [brand.strip() for brand in brands if isinstance(brand, str) and brand.strip()]
+        
+        # Filter out Hergon and its variants
+        excluded_brands = ['hergon', 'grupo hergon', 'hergon sa', 'grupo hergon sa']
+        return [
+            brand for brand in brands
+            if not any(excluded.lower() in brand.lower() for excluded in excluded_brands)
+        ]
+    
+    async def _analyze_packed_sections(
+        self, 
+        sections: List[PackedSection], 
+        document_ids: Optional[List[Optional[str]]] = None
+    ) -> Dict[int, Optional[List[str]]]:
+        """
+        Analyze several pages in one Gemini request, falling back to per-page calls.
+        
+        Args:
+            sections: (page_number, extracted_text) pairs
+            document_ids: Optional document ID of each section for per-document token usage
+            
+        Returns:
+            Dictionary mapping section index to detected brands (None = analysis failed)
+        """
+        document_ids = document_ids or [None] * len(sections)
+        if len(sections) == 1:
+            page_number, text = sections[0]
+            return {0: await self._analyze_single_page(text, page_number, document_ids[0])}
+        
+        page_numbers = [page_number for page_number, _ in sections]
+        results: Dict[int, Optional[List[str]]] = {}
+        
+        try:
+            start_time = time.time()
+            parsed = await self._request_json(
+                build_packed_message(sections),
+                f"pages {page_numbers}",
+                document_ids,
+                PACKED_RESPONSE_FORMAT,
+                build_packed_schema(len(sections))
+            )
+            page_map = parsed.value.get("pages", {}) if parsed.ok else {}
+            if not isinstance(page_map, dict):
+                page_map = {}
+            
+            keys = [str(index + 1) for index in range(len(sections))]
+            if not parsed.complete:
+                # The last section in a truncated answer may have lost brands; re-ask for it separately
+                present = [key for key in keys if key in page_map]
+                if present:
+                    page_map.pop(present[-1])
+            for index, key in enumerate(keys):
+                entry = page_map.get(key)
+                if isinstance(entry, dict):
+                    results[index] = self._clean_brand_list(entry.get("brands_detected"))
+            
+            logger.info(f"Packed analysis of pages {page_numbers} completed in {time.time() - start_time:.2f} seconds ({len([r for r in results.values() if r is not None])}/{len(sections)} sections parsed)")
+            
+        except Exception as e:
+            logger.warning(f"Packed analysis failed for pages {page_numbers}, falling back to per-page requests: {str(e)}")
+        
+        # Sections missing from the response (or an unparseable response) are retried one page per request
+        missing = [index for index in range(len(sections)) if results.get(index) is None]
+        if missing:
+            fallback_results = await asyncio.gather(
+                *[self._analyze_single_page(sections[index][1], sections[index][0], document_ids[index]) for index in missing]
+            )
+            results.update(zip(missing, fallback_results))
+        
+        return results
+    
+    async def extract_page_text(
+        self, 
+        image_path: str, 
+        page_number: int,
+        profile: Optional[ProcessingProfile] = None
+    ) -> str:
+        """
+        Run OCR on a page and build the text that would be sent to the LLM.
+        
+        Args:
+            image_path: Path to the grayscale image file
+            page_number: Page number being analyzed
+            profile: Optional processing profile from page classification (tiling, OCR profile)
+            
+        Returns:
+            Text for LLM analysis (empty if nothing was extracted)
+        """
+        # Step 1: Extract text using memory-efficient chunk-based OCR
+        logger.info(f"Step 1: Extracting text using memory-efficient OCR for page {page_number}")
+        extract_tables = settings.table_extraction == "all" or (
+            settings.table_extraction == "schedules" and profile is not None and profile.name == "schedule"
+        )
+        if profile is not None:
+            ocr_result = await self.ocr_service.extract_text_from_image_file(
+                image_path,
+                page_number,
+                ocr_profile=profile.ocr_profile,
+                chunk_size=profile.chunk_size,
+                chunk_overlap=profile.chunk_overlap,
+                extract_tables=extract_tables
+            )
+        else:
+            ocr_result = await self.ocr_service.extract_text_from_image_file(
+                image_path, page_number, extract_tables=extract_tables
+            )
+        
+        extracted_text = ocr_result['full_text']
+        logger.info(f"Memory-efficient OCR completed for page {page_number}: {len(extracted_text)} characters extracted from {len(ocr_result['text_detections'])} text detections in {ocr_result['processing_time']:.2f} seconds")
+        
+        if not extracted_text or extracted_text.strip() == "":
+            logger.warning(f"No text extracted from page {page_number} - no brands to detect")
+            return ""
+        
+        # Schedules: put the compact manufacturer/model columns first, ahead of the full page text
+        # (all table rows with every column, and the text outside the tables)
+        brand_column_text = table_extractor.build_brand_column_text(ocr_result.get('tables') or [])
+        if brand_column_text:
+            logger.info(f"Prepending {len(brand_column_text.splitlines())} schedule rows from manufacturer/model columns for page {page_number}")
+            extracted_text = f"{brand_column_text}\n{extracted_text}".strip()
+        
+        return extracted_text
     
     async def detect_brands_in_image_file(
         self, 
         image_path: str, 
-        page_number: int
+        page_number: int,
+        profile: Optional[ProcessingProfile] = None,
+        document_id: Optional[str] = None
     ) -> BrandDetectionCreate:
         """
         Detect brands in a grayscale image file using memory-efficient OCR + LLM pipeline.
@@ -260,6 +948,8 @@ class BrandDetectionService:
         Args:
             image_path: Path to the grayscale image file
             page_number: Page number being analyzed
+            profile: Optional processing profile from page classification (tiling, OCR profile, LLM use)
+            document_id: Optional document ID for per-document statistics
             
         Returns:
             BrandDetectionCreate object with detected brands
@@ -269,18 +959,8 @@ class BrandDetectionService:
             logger.info(f"Starting memory-efficient OCR + LLM brand detection for page {page_number}")
             logger.info(f"Image file: {image_path}")
             
-            # Step 1: Extract text using memory-efficient chunk-based OCR
-            logger.info(f"Step 1: Extracting text using memory-efficient OCR for page {page_number}")
-            ocr_result = await self.ocr_service.extract_text_from_image_file(image_path, page_number)
-            
-            extracted_text = ocr_result['full_text']
-            text_detections = ocr_result['text_detections']
-            ocr_processing_time = ocr_result['processing_time']
-            
-            logger.info(f"Memory-efficient OCR completed for page {page_number}: {len(extracted_text)} characters extracted from {len(text_detections)} text detections in {ocr_processing_time:.2f} seconds")
-            
-            if not extracted_text or extracted_text.strip() == "":
-                logger.warning(f"No text extracted from page {page_number} - no brands to detect")
+            extracted_text = await self.extract_page_text(image_path, page_number, profile)
+            if not extracted_text:
                 return BrandDetectionCreate(
                     page_number=page_number,
                     brands_detected=[]
@@ -290,12 +970,12 @@ class BrandDetectionService:
             logger.info(f"Step 2: Analyzing complete page text for brands on page {page_number}")
             logger.info(f"Text sample for LLM analysis: {extracted_text[:500]}...")
             
-            detected_brands = await self.detect_brands_from_text(extracted_text, page_number)
+            detected_brands, llm_failed = await self.analyze_page_text(
+                extracted_text, page_number, document_id, run_llm=profile is None or profile.run_llm
+            )
             
             # Clear large text variables to free memory immediately
             del extracted_text
-            del text_detections
-            del ocr_result
             gc.collect()
             
             # Calculate total processing time
@@ -309,7 +989,8 @@ class BrandDetectionService:
             
             return BrandDetectionCreate(
                 page_number=page_number,
-                brands_detected=detected_brands
+                brands_detected=detected_brands,
+                llm_failed=llm_failed
             )
             
         except Exception as e:
@@ -0,0 +1,428 @@
+"""
+Local brand gazetteer service.
+Compiles known brands and their aliases into an Aho-Corasick automaton that
+scans OCR text in linear time, case- and accent-insensitively. Pages whose
+candidate tokens are all explained by the gazetteer or generic plan vocabulary
+can skip the LLM; gazetteer hits are merged with LLM output otherwise.
+"""
+
+import json
+import logging
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+
+from ..config import settings
+from .fuzzy_brand_index import FuzzyBrandIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Canonical brand -> aliases (the canonical name is always matched too)
+DEFAULT_BRANDS: Dict[str, List[str]] = {
+    # Electrical
+    "Samsung": [], "LG": [], "Bosch": [], "Siemens": [], "Schneider Electric": ["Schneider", "Square D"],
+    "ABB": [], "General Electric": ["GE"], "Westinghouse": [], "Eaton": ["Cutler-Hammer"], "Legrand": [],
+    "Leviton": [], "Hubbell": [], "Viakon": [], "Condumex": [], "Bticino": [],
+    # Building materials
+    "Cemex": [], "Holcim": ["LafargeHolcim"], "Cementos Argos": ["Argos"], "USG": ["Tablaroca"], "Sika": [],
+    # Lighting
+    "Philips": ["Signify"], "Osram": [], "GE Lighting": [], "Sylvania": [], "Cree": [], "Lithonia": [],
+    "Tecnolite": [], "Construlita": [],
+    # Security
+    "Honeywell": [], "Johnson Controls": [], "Bosch Security": [], "Axis": [], "Hikvision": [], "Dahua": [],
+    # HVAC
+    "Carrier": [], "Trane": [], "York": [], "Daikin": [], "Mitsubishi Electric": [], "Lennox": [],
+    "Rheem": [], "Goodman": [], "Greenheck": [], "Soler & Palau": ["Soler y Palau", "S&P"],
+    # Tools and equipment
+    "Makita": [], "DeWalt": [], "Milwaukee": [], "Hilti": [], "Caterpillar": ["CAT"],
+    # Paints and finishes
+    "Sherwin-Williams": ["Sherwin Williams"], "PPG": [], "Comex": [], "Pinturas Osel": ["Osel"],
+    "Benjamin Moore": [],
+    # Plumbing
+    "Kohler": [], "Toto": [], "American Standard": [], "Corona": [], "Moen": [], "Delta": [],
+    "Helvex": [], "Rotoplas": [], "Grundfos": [], "Tuboplus": [], "Urrea": [], "Nibco": [], "Victaulic": [],
+    # Floors
+    "Armstrong": [], "Mohawk": [], "Porcelanite": [], "Tarkett": [], "Shaw": [], "Interceramic": [],
+    # Kitchen
+    "Whirlpool": [], "KitchenAid": [], "Frigidaire": [], "Mabe": [],
+    # Audio/video and computing
+    "Sony": [], "Bose": [], "JBL": [], "Yamaha": [], "Dell": [], "Lenovo": [], "Apple": [], "IBM": [],
+    "Microsoft": [],
+    # Networking
+    "Cisco": [], "TP-Link": [], "Netgear": [], "Ubiquiti": [], "D-Link": [], "Panduit": [], "Belden": [],
+    "CommScope": [],
+    # Medical
+    "Philips Healthcare": [], "GE Healthcare": [], "Siemens Healthineers": [],
+    # Elevators
+    "Otis": [], "Schindler": [], "KONE": [], "ThyssenKrupp": ["TK Elevator"],
+    # Fire protection
+    "Tyco": [], "Viking": [], "Notifier": [], "Simplex": [], "Edwards": [],
+}
+
+# Brands that are also ordinary words or abbreviations on plans ("delta" connection,
+# "GE" prefix, "CAT" category...). A hit keeps the page eligible for the LLM instead of
+# confirming the brand on its own.
+AMBIGUOUS_BRANDS = frozenset({
+    "Delta", "Corona", "York", "Shaw", "Armstrong", "Axis", "Apple", "Viking", "Edwards",
+    "Simplex", "Carrier", "Caterpillar", "General Electric", "Toto", "Milwaukee",
+})
+
+# Generic plan vocabulary (Spanish/English) that never names a brand
+GENERIC_VOCABULARY = frozenset("""
+a al ante bajo con contra de del desde el en entre hacia hasta la las lo los para por segun sin sobre tras un una unos unas
+y o u e ni que se su sus es son ser sera este esta estos estas ese esa dicho dicha cada todo toda todos todas otro otra
+no si mas menos muy tipo tipos ver nota notas ver vease indicado indicada indicados indicadas segun similar igual
+the of and or to in on at by for with from as is are be all any each see note notes typ typical similar per as shown
+plano planos planta plantas corte cortes fachada fachadas detalle detalles elevacion elevaciones seccion secciones
+escala esc hoja lamina proyecto obra cliente fecha revision rev dibujo reviso aprobo aprobado nombre clave
+arquitectonico arquitectonica estructural estructura instalacion instalaciones electrica electricas electrico
+hidraulica hidraulico sanitaria sanitario pluvial gas especial especiales aire acondicionado mecanica mecanico
+nivel niveles piso pisos losa losas muro muros pared paredes columna columnas viga vigas trabe trabes zapata zapatas
+cimentacion castillo castillos dala dalas cadena cadenas block tabique tabiques concreto acero aluminio cobre vidrio
+madera yeso panel paneles placa placas tubo tubos tuberia tuberias cable cables conductor conductores
+ducto ductos registro registros tapa tapas rejilla rejillas puerta puertas ventana ventanas cancel canceles
+escalera escaleras rampa rampas barandal barandales pasamanos plafon plafones cielo falso acabado acabados
+pintura recubrimiento impermeabilizante firme aplanado zoclo azulejo loseta lambrin
+bano banos sanitarios cocina comedor sala recamara recamaras oficina oficinas bodega almacen cuarto cuartos
+estacionamiento acceso vestibulo pasillo circulacion area areas zona zonas local locales terraza azotea patio jardin
+norte sur este oeste oriente poniente eje ejes nivel npt nps nivel piso terminado
+lampara lamparas luminaria luminarias apagador apagadores contacto contactos interruptor interruptores tablero
+tableros centro carga cargas circuito circuitos salida salidas alumbrado fuerza tierra fisica neutro fase fases
+transformador subestacion medidor acometida canalizacion charola charolas registro
+bomba bombas tinaco tinacos cisterna cisternas calentador calentadores valvula valvulas llave llaves coladera
+coladeras wc lavabo lavabos mingitorio mingitorios regadera regaderas tarja tarjas fregadero drenaje bajada bajadas
+equipo equipos unidad unidades condensadora condensadoras evaporadora evaporadoras manejadora manejadoras
+difusor difusores extractor extractores ventilador ventiladores termostato
+diametro diam longitud ancho alto altura espesor largo profundidad distancia separacion pendiente
+metros metro cm mm m ml m2 m3 kg ton pulg pulgadas plg volts volt amperes amp watts watt hp kw kva hz fases
+minimo minima maximo maxima nominal total parcial general generales especificacion especificaciones
+proveer suministrar instalar colocar fijar conectar cortar soldar pintar limpiar verificar revisar
+marca modelo modelos equivalente aprobado aprobada calidad fabricante proveedor serie catalogo
+nuevo nueva existente existentes proyectado proyectada futuro futura demoler demolicion
+izquierda derecha superior inferior interior exterior frontal posterior lateral
+blanco blanca negro negra gris rojo roja azul verde amarillo
+cuadro tabla lista simbologia simbolo simbolos leyenda leyendas referencia referencias croquis localizacion
+cantidad cant pza pzas pieza piezas lote juego
+drawing drawings plan plans section sections elevation elevations detail details schedule scale sheet title
+floor floors wall walls door doors window windows ceiling roof level levels room rooms
+light lights lighting fixture fixtures panel panels circuit circuits outlet outlets switch switches pipe pipes
+pump pumps valve valves water hot cold supply return exhaust duct ducts unit units
+new existing remove provide install contractor owner architect engineer manufacturer model equal approved
+hergon hergonsa grupo
+""".split())
+
+
+def normalize_for_matching(text: str) -> str:
+    """
+    Case-fold and strip accents so "Schnéider" and "SCHNEIDER" match the same pattern.
+
+    Args:
+        text: Raw text
+
+    Returns:
+        Lower-case text without combining marks
+    """
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in text if not unicodedata.combining(char)).casefold()
+
+
+@dataclass
+class GazetteerScan:
+    """Result of scanning text with the gazetteer."""
+    brands: List[str] = field(default_factory=list)  # Confirmed canonical brands
+    ambiguous: List[str] = field(default_factory=list)  # Hits that need LLM confirmation
+    unmatched_candidates: List[str] = field(default_factory=list)  # Tokens that might be unknown brands
+    fuzzy_matches: Dict[str, str] = field(default_factory=dict)  # Noisy token -> canonical brand
+    learned: List[str] = field(default_factory=list)  # Confirmed brands known only from reviews
+    rejected: List[str] = field(default_factory=list)  # Terms suppressed as reviewed false positives
+
+    @property
+    def can_skip_llm(self) -> bool:
+        """True when every candidate-looking token is explained locally by exact patterns (fuzzy hits still go to the LLM)."""
+        return not self.ambiguous and not self.unmatched_candidates and not self.fuzzy_matches
+
+
+class BrandGazetteer:
+    """Aho-Corasick automaton over known brands and aliases."""
+
+    def __init__(self):
+        """Initialize gazetteer and compile the automaton."""
+        self.enabled = settings.brand_gazetteer_enabled
+        self.skip_llm = settings.brand_gazetteer_skip_llm
+        self.fuzzy_enabled = settings.brand_fuzzy_matching
+        self.fuzzy_index = FuzzyBrandIndex()
+        self.min_candidate_length = 3  # Shorter alphabetic tokens are abbreviations, not brands
+
+        self.patterns: Dict[str, str] = {}  # Normalized pattern -> canonical brand
+        self._goto: List[Dict[str, int]] = [{}]
+        self._own_output: List[List[str]] = [[]]  # Patterns ending exactly at each state
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]  # Own patterns plus those reachable through failure links
+
+        # Knowledge from brand reviews (see brand_knowledge_base)
+        self.learned_brands: Set[str] = set()
+        self.rejected_terms: Set[str] = set()  # Normalized names
+
+        brands = dict(DEFAULT_BRANDS)
+        if settings.brand_gazetteer_path:
+            brands.update(self._load_brand_file(settings.brand_gazetteer_path))
+        self.base_brands = frozenset(brands)
+        for canonical, aliases in brands.items():
+            self.add_brand(canonical, aliases, rebuild=False)
+        self._build_failure_links()
+        self.fuzzy_index.build(self.patterns, excluded=AMBIGUOUS_BRANDS)
+
+        logger.info(f"BrandGazetteer initialized with {len(brands)} brands and {len(self.patterns)} patterns (enabled: {self.enabled}, skip LLM: {self.skip_llm})")
+
+    def _load_brand_file(self, path: str) -> Dict[str, List[str]]:
+        """
+        Load additional brands from a JSON file ({"Brand": ["alias", ...]}).
+
+        Args:
+            path: JSON file path
+
+        Returns:
+            Brand-to-aliases dictionary (empty if the file cannot be read)
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as brand_file:
+                data = json.load(brand_file)
+            return {str(brand): [str(alias) for alias in aliases or []] for brand, aliases in data.items()}
+        except Exception as e:
+            logger.error(f"Failed to load brand gazetteer file {path}: {str(e)}")
+            return {}
+
+    def add_brand(self, canonical: str, aliases: List[str], rebuild: bool = True) -> None:
+        """
+        Add a brand and its aliases to the automaton.
+
+        Args:
+            canonical: Canonical brand name
+            aliases: Alternative spellings
+            rebuild: Recompute failure links immediately (disable when adding in bulk)
+        """
+        for name in [canonical] + list(aliases):
+            pattern = normalize_for_matching(name).strip()
+            if not pattern or pattern in self.patterns:
+                continue
+            self.patterns[pattern] = canonical
+
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._own_output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._own_output[state].append(pattern)
+
+        if rebuild:
+            self._build_failure_links()
+            self.fuzzy_index.build(self.patterns, excluded=AMBIGUOUS_BRANDS)
+
+    def apply_knowledge(self, confirmed: Dict[str, List[str]], rejected: Iterable[str]) -> None:
+        """
+        Apply reviewed brand knowledge: confirmed brands become patterns, rejected terms are suppressed.
+
+        Args:
+            confirmed: Canonical brand -> reviewed spellings confirmed as that brand
+            rejected: Names reviewers rejected as false positives
+        """
+        pattern_count = len(self.patterns)
+        for canonical, aliases in confirmed.items():
+            self.add_brand(canonical, aliases, rebuild=False)
+        if len(self.patterns) != pattern_count:
+            self._build_failure_links()
+            self.fuzzy_index.build(self.patterns, excluded=AMBIGUOUS_BRANDS)
+
+        self.learned_brands = {canonical for canonical in confirmed if canonical not in self.base_brands}
+        self.rejected_terms = {normalize_for_matching(name).strip() for name in rejected}
+
+    def is_rejected(self, brand: str) -> bool:
+        """
+        Check whether reviewers rejected a brand name (or the canonical brand it spells).
+
+        Args:
+            brand: Brand name as reported
+
+        Returns:
+            True for reviewed false positives
+        """
+        if not self.rejected_terms:
+            return False
+        normalized = normalize_for_matching(brand).strip()
+        canonical = self.patterns.get(normalized)
+        return normalized in self.rejected_terms or (
+            canonical is not None and normalize_for_matching(canonical) in self.rejected_terms
+        )
+
+    def _build_failure_links(self) -> None:
+        """Breadth-first construction of failure links and merged outputs."""
+        self._fail = [0] * len(self._goto)
+        self._output = [list(patterns) for patterns in self._own_output]
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def find_matches(self, normalized_text: str) -> List[Tuple[int, int, str]]:
+        """
+        Find whole-word pattern occurrences in normalized text.
+
+        Args:
+            normalized_text: Output of normalize_for_matching
+
+        Returns:
+            List of (start, end, pattern) tuples
+        """
+        matches = []
+        state = 0
+        for index, char in enumerate(normalized_text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                start = index - len(pattern) + 1
+                end = index + 1
+                before = normalized_text[start - 1] if start > 0 else " "
+                after = normalized_text[end] if end < len(normalized_text) else " "
+                if not before.isalnum() and not after.isalnum():
+                    matches.append((start, end, pattern))
+        return matches
+
+    def scan(self, text: str) -> GazetteerScan:
+        """
+        Scan text for known brands and leftover candidate tokens.
+
+        Args:
+            text: OCR text
+
+        Returns:
+            GazetteerScan with confirmed brands, ambiguous hits and unmatched candidates
+        """
+        result = GazetteerScan()
+        if not self.enabled or not text:
+            return result
+
+        normalized = normalize_for_matching(text)
+        covered = bytearray(len(normalized))
+        for start, end, pattern in self.find_matches(normalized):
+            canonical = self.patterns[pattern]
+            covered[start:end] = b"\x01" * (end - start)
+            if self.rejected_terms and (pattern in self.rejected_terms or normalize_for_matching(canonical) in self.rejected_terms):
+                if canonical not in result.rejected:
+                    result.rejected.append(canonical)
+                continue
+            target = result.ambiguous if canonical in AMBIGUOUS_BRANDS else result.brands
+            if canonical not in target:
+                target.append(canonical)
+            if canonical in self.learned_brands and canonical not in result.learned:
+                result.learned.append(canonical)
+
+        # OCR-garbled brand spellings ("schnelder", "phi1ips") resolved by the fuzzy index
+        if self.fuzzy_enabled:
+            for match in re.finditer(r"[a-z0-9|]*[a-z][a-z0-9|]*", normalized):
+                token = match.group()
+                if token in GENERIC_VOCABULARY or any(covered[match.start():match.end()]):
+                    continue
+                canonical = self.fuzzy_index.lookup(token)
+                if canonical is None or self.is_rejected(canonical):
+                    continue
+                target = result.ambiguous if canonical in AMBIGUOUS_BRANDS else result.brands
+                if canonical not in target:
+                    target.append(canonical)
+                if canonical in self.learned_brands and canonical not in result.learned:
+                    result.learned.append(canonical)
+                result.fuzzy_matches[token] = canonical
+                covered[match.start():match.end()] = b"\x01" * (match.end() - match.start())
+
+        # Remaining alphabetic words that are not generic vocabulary might be unknown brands
+        candidates: Set[str] = set()
+        for match in re.finditer(r"[a-z]+(?:[-&'][a-z]+)*", normalized):
+            token = match.group()
+            if len(token) < self.min_candidate_length or token in GENERIC_VOCABULARY or any(covered[match.start():match.end()]):
+                continue
+            # Tokens glued to digits are model or sheet codes (e.g. "ie05", "x200")
+            before = normalized[match.start() - 1] if match.start() > 0 else " "
+            after = normalized[match.end()] if match.end() < len(normalized) else " "
+            if before.isdigit() or after.isdigit():
+                continue
+            if token in self.rejected_terms:
+                if token not in result.rejected:
+                    result.rejected.append(token)
+                continue
+            candidates.add(token)
+        result.unmatched_candidates = sorted(candidates)
+        return result
+
+    def aliases_for(self, brand: str) -> List[str]:
+        """
+        Get every normalized pattern (canonical name and aliases) of a brand.
+
+        Args:
+            brand: Brand name as returned by the gazetteer or the LLM
+
+        Returns:
+            Normalized patterns, empty for brands not in the gazetteer
+        """
+        canonical = self.patterns.get(normalize_for_matching(brand), brand)
+        return [pattern for pattern, owner in self.patterns.items() if owner == canonical]
+
+    def normalize_brand(self, brand: str) -> str:
+        """
+        Correct an OCR-garbled brand name reported by the LLM ("SCHNElDER").
+
+        Known spellings and aliases are returned unchanged; only names that
+        resolve through the fuzzy index are replaced by the canonical brand.
+
+        Args:
+            brand: Brand name as reported
+
+        Returns:
+            Corrected brand name, or the input when it is already clean or unknown
+        """
+        if not self.fuzzy_enabled or normalize_for_matching(brand).strip() in self.patterns:
+            return brand
+        return self.fuzzy_index.normalize_brand(brand)
+
+    def merge(self, llm_brands: List[str], gazetteer_brands: List[str]) -> List[str]:
+        """
+        Merge LLM output with gazetteer hits without duplicating brands.
+
+        Args:
+            llm_brands: Brands returned by the LLM
+            gazetteer_brands: Confirmed gazetteer brands
+
+        Returns:
+            LLM brands followed by gazetteer brands the LLM did not report
+        """
+        # Compare by canonical name so an alias from the LLM ("Schneider") covers its canonical hit
+        seen = set()
+        for brand in llm_brands:
+            normalized = normalize_for_matching(brand)
+            seen.add(normalized)
+            seen.add(normalize_for_matching(self.patterns.get(normalized, brand)))
+        merged = list(llm_brands)
+        for brand in gazetteer_brands:
+            if normalize_for_matching(brand) not in seen:
+                merged.append(brand)
+                seen.add(normalize_for_matching(brand))
+        return merged
+
+
+# Global brand gazetteer instance
+brand_gazetteer = BrandGazetteer()
@@ -0,0 +1,259 @@
+"""
+Brand knowledge base built from reviews.
+Every review submitted through /api/documents/{id}/brands/review is stored as
+a vote (confirmed brand or rejected false positive, optionally naming the
+canonical brand a spelling belongs to). Names with enough agreeing votes are
+pushed into the brand gazetteer: confirmed brands and aliases become patterns,
+so they are accepted without an LLM call, and rejected names are suppressed in
+both gazetteer scans and LLM output.
+All votes of one review (the brand and the spellings it propagates to) are
+applied together and written to disk once, off the event loop.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .brand_gazetteer import brand_gazetteer, normalize_for_matching
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+VERDICT_CONFIRMED = "confirmed"
+VERDICT_REJECTED = "rejected"
+REVIEW_VERDICTS = (VERDICT_CONFIRMED, VERDICT_REJECTED)
+STATUS_PENDING = "pending"
+
+
+class BrandKnowledgeBase:
+    """Review votes per brand name, applied to the gazetteer once they agree."""
+
+    def __init__(self):
+        """Initialize knowledge base and apply the stored reviews to the gazetteer."""
+        self.enabled = settings.brand_knowledge_enabled
+        self.path = settings.brand_knowledge_path
+        self.min_reviews = max(1, settings.brand_knowledge_min_reviews)
+
+        # Normalized name -> {"name", "canonical", "votes": {"document:page": verdict}, "updated_at"}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.stats = {
+            "reviews": 0,
+            "pages_checked": 0,
+            "pages_with_hits": 0,
+            "auto_accepted": 0,
+            "auto_rejected": 0,
+            "llm_calls_avoided": 0,
+        }
+
+        # File writes run in order on a single dedicated thread
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="brand_knowledge"
+        )
+
+        if self.enabled:
+            self._load()
+            self._apply_to_gazetteer()
+
+        logger.info(f"BrandKnowledgeBase initialized with {len(self.entries)} reviewed names (enabled: {self.enabled}, min reviews: {self.min_reviews})")
+
+    def _load(self) -> None:
+        """Load stored entries (a missing or unreadable file starts an empty knowledge base)."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as knowledge_file:
+                self.entries = json.load(knowledge_file).get("entries", {})
+        except Exception as e:
+            logger.error(f"Failed to load brand knowledge base {self.path}: {str(e)}")
+            self.entries = {}
+
+    def _write(self, payload: str) -> None:
+        """Write serialized entries atomically so a crash never leaves a truncated file."""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as knowledge_file:
+                knowledge_file.write(payload)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save brand knowledge base {self.path}: {str(e)}")
+
+    async def _save(self) -> None:
+        """Snapshot entries in the event loop and write them on the knowledge base thread."""
+        if not self.path:
+            return
+        payload = json.dumps({"entries": self.entries}, ensure_ascii=False, indent=1)
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._write, payload)
+
+    def status_of(self, entry: Dict[str, Any]) -> str:
+        """
+        Decide an entry's status from its votes, counting each document once per verdict
+        (one review propagated over many pages or spellings is a single vote).
+
+        Args:
+            entry: Knowledge entry
+
+        Returns:
+            "confirmed" or "rejected" once that verdict comes from at least min_reviews
+            documents and outnumbers the other, otherwise "pending"
+        """
+        votes = {(vote_key.rsplit(":", 1)[0], verdict) for vote_key, verdict in entry.get("votes", {}).items()}
+        confirmations = sum(1 for _, verdict in votes if verdict == VERDICT_CONFIRMED)
+        rejections = sum(1 for _, verdict in votes if verdict == VERDICT_REJECTED)
+        if confirmations >= self.min_reviews and confirmations > rejections:
+            return VERDICT_CONFIRMED
+        if rejections >= self.min_reviews and rejections > confirmations:
+            return VERDICT_REJECTED
+        return STATUS_PENDING
+
+    def _apply_to_gazetteer(self) -> None:
+        """Push confirmed spellings and rejected names into the gazetteer."""
+        confirmed: Dict[str, List[str]] = {}
+        rejected: List[str] = []
+        for entry in self.entries.values():
+            status = self.status_of(entry)
+            if status == VERDICT_CONFIRMED:
+                confirmed.setdefault(entry["canonical"], []).append(entry["name"])
+            elif status == VERDICT_REJECTED:
+                rejected.append(entry["name"])
+        brand_gazetteer.apply_knowledge(confirmed, rejected)
+
+    async def record_reviews(
+        self,
+        document_id: str,
+        reviews: List[Tuple[int, str]],
+        verdict: Optional[str],
+        canonical_brand: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        Record (or withdraw) one reviewer verdict for several names, saving once.
+
+        Args:
+            document_id: Document ID
+            reviews: (page number, brand name as detected) pairs, e.g. a brand and its aliases
+            verdict: "confirmed", "rejected", or None to withdraw these pages' votes
+            canonical_brand: Canonical brand the names are spellings of (records aliases)
+
+        Returns:
+            Resulting status per brand name ("confirmed", "rejected" or "pending")
+        """
+        statuses: Dict[str, str] = {}
+        changed = False
+        for page_number, brand_name in reviews:
+            statuses[brand_name], name_changed = self._record_vote(document_id, page_number, brand_name, verdict, canonical_brand)
+            changed = changed or name_changed
+
+        if self.enabled and reviews:
+            if changed:
+                self._apply_to_gazetteer()
+            await self._save()
+        return statuses
+
+    def _record_vote(
+        self,
+        document_id: str,
+        page_number: int,
+        brand_name: str,
+        verdict: Optional[str],
+        canonical_brand: Optional[str]
+    ) -> Tuple[str, bool]:
+        """
+        Apply one vote in memory.
+
+        Returns:
+            Tuple of (resulting status, whether the gazetteer needs the update)
+        """
+        key = normalize_for_matching(brand_name).strip()
+        if not self.enabled or not key:
+            return STATUS_PENDING, False
+
+        entry = self.entries.setdefault(key, {"name": brand_name, "canonical": brand_name, "votes": {}})
+        if canonical_brand:
+            entry["canonical"] = canonical_brand
+        previous_status = self.status_of(entry)
+
+        vote_key = f"{document_id}:{page_number}"
+        if verdict is None:
+            entry["votes"].pop(vote_key, None)
+        else:
+            entry["votes"][vote_key] = verdict
+            self.stats["reviews"] += 1
+        entry["updated_at"] = time.time()
+        if not entry["votes"]:
+            del self.entries[key]
+
+        status = self.status_of(entry) if entry["votes"] else STATUS_PENDING
+        if status != previous_status:
+            logger.info(f"Brand knowledge: '{brand_name}' is now {status}")
+        return status, status != previous_status or bool(canonical_brand and status == VERDICT_CONFIRMED)
+
+    def record_page(self, learned: List[str], rejected: List[str], resolved_without_llm: bool) -> bool:
+        """
+        Count the knowledge used on one page.
+
+        Args:
+            learned: Review-confirmed brands accepted on the page
+            rejected: Reviewed false positives suppressed on the page
+            resolved_without_llm: Whether the page was resolved locally
+
+        Returns:
+            True when the knowledge base contributed to the page
+        """
+        self.stats["pages_checked"] += 1
+        if not learned and not rejected:
+            return False
+        self.stats["pages_with_hits"] += 1
+        self.stats["auto_accepted"] += len(learned)
+        self.stats["auto_rejected"] += len(rejected)
+        if resolved_without_llm:
+            self.stats["llm_calls_avoided"] += 1
+        return True
+
+    def filter_rejected(self, brands: List[str]) -> List[str]:
+        """
+        Drop reviewed false positives from an LLM answer.
+
+        Args:
+            brands: Brand names reported by the LLM
+
+        Returns:
+            Brands that were not rejected by reviewers
+        """
+        if not self.enabled:
+            return brands
+        kept = [brand for brand in brands if not brand_gazetteer.is_rejected(brand)]
+        self.stats["auto_rejected"] += len(brands) - len(kept)
+        return kept
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get entry counts and usage counters.
+
+        Returns:
+            Statistics dictionary; hit_rate is the share of pages where reviewed knowledge applied
+        """
+        statuses = [self.status_of(entry) for entry in self.entries.values()]
+        checked = self.stats["pages_checked"]
+        return {
+            "enabled": self.enabled,
+            "names": len(self.entries),
+            "confirmed": statuses.count(VERDICT_CONFIRMED),
+            "rejected": statuses.count(VERDICT_REJECTED),
+            "pending": statuses.count(STATUS_PENDING),
+            **self.stats,
+            "hit_rate": round(self.stats["pages_with_hits"] / checked, 4) if checked else 0.0,
+        }
+
+
+# Global brand knowledge base instance
+brand_knowledge_base = BrandKnowledgeBase()
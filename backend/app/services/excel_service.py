@@ -4,13 +4,14 @@ Excel export service for brand detection results.
 
 from datetime import datetime
 from io import BytesIO
-from typing import List
+from typing import Dict, List
 import openpyxl
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils import get_column_letter
 
 from app.models.document import Document
 from app.models.brand_detection import BrandDetection
+from app.services.brand_canonicalizer import brand_canonicalizer
 
 
 class ExcelService:
@@ -19,6 +20,7 @@ class ExcelService:
     def __init__(self):
         self.wb = None
         self.ws = None
+        self.alias_map = {}
 
     def generate_document_results_excel(self, document: Document) -> BytesIO:
         """
@@ -47,6 +49,12 @@ class ExcelService:
             bottom=Side(style="thin"),
         )
 
+        # Rows are keyed by canonical brand; raw spellings are listed as variants
+        canonical_brands = brand_canonicalizer.cluster(
+            {result.page_number: result.brands_detected for result in document.results or []}
+        )
+        self.alias_map = brand_canonicalizer.alias_map(canonical_brands)
+
         # Document information section
         self._add_document_info(document, header_font, header_fill, border)
 
@@ -113,10 +121,10 @@ class ExcelService:
         self.ws[f"A{start_row}"].font = header_font
         self.ws[f"A{start_row}"].fill = header_fill
         self.ws[f"A{start_row}"].border = border
-        self.ws.merge_cells(f"A{start_row}:C{start_row}")
+        self.ws.merge_cells(f"A{start_row}:D{start_row}")
 
         # Table headers
-        headers = ["Página", "Marca Detectada", "Estado de Revisión"]
+        headers = ["Página", "Marca Detectada", "Variantes Detectadas", "Estado de Revisión"]
         header_row = start_row + 2
 
         for col, header in enumerate(headers, start=1):
@@ -135,23 +143,32 @@ class ExcelService:
 
             for result in sorted_results:
                 if result.brands_detected:
-                    # Sort brands alphabetically within each page
-                    sorted_brands = sorted(result.brands_detected)
-
-                    for brand in sorted_brands:
-                        # Get review status
-                        is_reviewed = result.brands_review_status.get(brand, False)
+                    # Sort canonical brands alphabetically within each page
+                    variants_by_brand = self._variants_by_brand(result)
+
+                    for brand in sorted(variants_by_brand, key=str.casefold):
+                        variants = variants_by_brand[brand]
+                        # Reviewed once every spelling of the brand on this page is reviewed
+                        is_reviewed = all(
+                            result.brands_review_status.get(variant, False)
+                            for variant in variants
+                        )
                         review_status = "Revisado" if is_reviewed else "Por Revisar"
 
                         # Add row data
-                        row_data = [result.page_number, brand, review_status]
+                        row_data = [
+                            result.page_number,
+                            brand,
+                            ", ".join(sorted(variants)),
+                            review_status,
+                        ]
 
                         for col, value in enumerate(row_data, start=1):
                             cell = self.ws.cell(
                                 row=current_row, column=col, value=value
                             )
                             cell.border = border
-                            if col == 3:  # Review status column
+                            if col == 4:  # Review status column
                                 if is_reviewed:
                                     cell.fill = PatternFill(
                                         start_color="C6EFCE",
@@ -167,6 +184,17 @@ class ExcelService:
 
                         current_row += 1
 
+    def _variants_by_brand(self, result: BrandDetection) -> Dict[str, List[str]]:
+        """Group a page's raw detections by canonical brand name."""
+        variants_by_brand: Dict[str, List[str]] = {}
+        for raw in result.brands_detected:
+            canonical = self.alias_map.get(raw)
+            name = canonical.name if canonical else raw
+            variants = variants_by_brand.setdefault(name, [])
+            if raw not in variants:
+                variants.append(raw)
+        return variants_by_brand
+
     def _add_statistics_section(
         self,
         document: Document,
@@ -179,16 +207,22 @@ class ExcelService:
         total_brands = 0
         reviewed_brands = 0
         pages_with_results = 0
+        unique_brands = set()
 
         if document.results:
             for result in document.results:
                 if result.brands_detected:
                     pages_with_results += 1
-                    total_brands += len(result.brands_detected)
+                    variants_by_brand = self._variants_by_brand(result)
+                    unique_brands.update(variants_by_brand)
+                    total_brands += len(variants_by_brand)
                     reviewed_brands += sum(
                         1
-                        for brand in result.brands_detected
-                        if result.brands_review_status.get(brand, False)
+                        for variants in variants_by_brand.values()
+                        if all(
+                            result.brands_review_status.get(variant, False)
+                            for variant in variants
+                        )
                     )
 
         # Find next available row
@@ -203,6 +237,7 @@ class ExcelService:
 
         # Statistics data
         stats_data = [
+            ("Marcas únicas:", str(len(unique_brands))),
             ("Total de marcas detectadas:", str(total_brands)),
             ("Marcas revisadas:", str(reviewed_brands)),
             ("Marcas por revisar:", str(total_brands - reviewed_brands)),
@@ -2,9 +2,10 @@
 Firebase service for database operations.
 """
 
+import logging
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 import firebase_admin
 from firebase_admin import credentials, firestore
 from firebase_admin.exceptions import FirebaseError
@@ -14,6 +15,8 @@ from ..models.document import Document, DocumentCreate, DocumentUpdate
 from ..models.brand_detection import BrandDetection, BrandDetectionCreate
 from ..models.processing_status import ProcessingStatus
 
+logger = logging.getLogger(__name__)
+
 
 class FirebaseService:
     """Service for Firebase Firestore operations."""
@@ -364,6 +367,8 @@ class FirebaseService:
         page_number: int,
         result: BrandDetectionCreate,
         processing_time: float,
+        page_class: Optional[str] = None,
+        processing_profile: Optional[str] = None,
     ) -> BrandDetection:
         """Save brand detection result for a specific page."""
         try:
@@ -374,13 +379,18 @@ class FirebaseService:
             for brand in result.brands_detected:
                 brands_review_status[brand] = False  # Default to not reviewed
 
+            # Pages whose LLM analysis failed keep their local brands but are flagged
+            status = "llm_failed" if result.llm_failed else "completed"
+
             # Create result data
             result_data = {
                 "page_number": result.page_number,
                 "brands_detected": result.brands_detected,
                 "processing_time": processing_time,
-                "status": "completed",
+                "status": status,
                 "brands_review_status": brands_review_status,
+                "page_class": page_class,
+                "processing_profile": processing_profile,
             }
 
             # Update the results subcollection
@@ -390,8 +400,10 @@ class FirebaseService:
                 page_number=result.page_number,
                 brands_detected=result.brands_detected,
                 processing_time=processing_time,
-                status="completed",
+                status=status,
                 brands_review_status=brands_review_status,
+                page_class=page_class,
+                processing_profile=processing_profile,
             )
         except FirebaseError as e:
             raise Exception(f"Failed to save brand detection result: {str(e)}")
@@ -540,6 +552,38 @@ class FirebaseService:
         except FirebaseError as e:
             raise Exception(f"Failed to update brand review status: {str(e)}")
 
+    async def update_brands_review_status(
+        self, document_id: str, brands_by_page: Dict[int, List[str]], is_reviewed: bool
+    ) -> int:
+        """Update the review status of several detected brands in one write (e.g. all aliases of a brand)."""
+        try:
+            doc_ref = self.documents_collection.document(document_id)
+            doc = doc_ref.get()
+
+            if not doc.exists:
+                return 0
+
+            results = doc.to_dict().get("results", {})
+            updates = {}
+            updated = 0
+            for page_number, brand_names in brands_by_page.items():
+                page_result = results.get(str(page_number))
+                if not page_result:
+                    continue
+                review_status = page_result.get("brands_review_status") or {}
+                for brand_name in brand_names:
+                    if brand_name in page_result.get("brands_detected", []):
+                        review_status[brand_name] = is_reviewed
+                        updated += 1
+                updates[f"results.{page_number}.brands_review_status"] = review_status
+
+            if updates:
+                doc_ref.update(updates)
+
+            return updated
+        except FirebaseError as e:
+            raise Exception(f"Failed to update brand review status: {str(e)}")
+
 
 # Global Firebase service instance
 firebase_service = FirebaseService()
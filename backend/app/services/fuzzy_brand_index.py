@@ -0,0 +1,224 @@
+"""
+OCR-noise-tolerant fuzzy brand index.
+SymSpell-style deletion index over confusion-folded brand spellings, verified
+with an edit distance that charges little for typical OCR confusions
+(l/1/I, O/0, S/5, rn/m). Resolves tokens like "SCHNElDER" or "Phi1ips" to
+canonical brands without an LLM call.
+"""
+
+import logging
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Characters OCR commonly swaps, folded to one representative
+CONFUSION_FOLD = str.maketrans({
+    "1": "l", "i": "l", "|": "l", "!": "l",
+    "0": "o",
+    "5": "s", "8": "b", "6": "b",
+})
+MULTI_CHAR_CONFUSIONS = (("rn", "m"), ("vv", "w"), ("cl", "d"))
+
+CONFUSION_SUBSTITUTION_COST = 0.25  # Cost of swapping two characters that fold together
+EDIT_COST = 1.0
+
+
+def confusion_skeleton(token: str) -> str:
+    """
+    Fold OCR-confusable characters so misreads share a skeleton.
+
+    Args:
+        token: Lower-case, accent-stripped token
+
+    Returns:
+        Skeleton string used as index key
+    """
+    for source, target in MULTI_CHAR_CONFUSIONS:
+        token = token.replace(source, target)
+    return token.translate(CONFUSION_FOLD)
+
+
+def weighted_edit_distance(a: str, b: str, limit: float) -> float:
+    """
+    Damerau-Levenshtein distance with cheap substitutions for confusable characters.
+
+    Args:
+        a: Observed token
+        b: Brand pattern
+        limit: Stop early once every path exceeds this cost
+
+    Returns:
+        Weighted distance (a value above limit when the limit was exceeded)
+    """
+    previous_previous: List[float] = []
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [float(i)] + [0.0] * len(b)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                substitution = 0.0
+            elif a[i - 1].translate(CONFUSION_FOLD) == b[j - 1].translate(CONFUSION_FOLD):
+                substitution = CONFUSION_SUBSTITUTION_COST
+            else:
+                substitution = EDIT_COST
+            current[j] = min(
+                previous[j] + EDIT_COST,
+                current[j - 1] + EDIT_COST,
+                previous[j - 1] + substitution
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + EDIT_COST)
+        if min(current) > limit:
+            return limit + 1.0
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def ocr_edit_distance(a: str, b: str, limit: float) -> float:
+    """
+    Weighted edit distance that also charges multi-character misreads ("rn" for "m") as confusions.
+
+    Args:
+        a: Observed token
+        b: Brand pattern
+        limit: Stop early once every path exceeds this cost
+
+    Returns:
+        Weighted distance (a value above limit when the limit was exceeded)
+    """
+    folded = []
+    for token in (a, b):
+        replacements = 0
+        for source, target in MULTI_CHAR_CONFUSIONS:
+            replacements += token.count(source)
+            token = token.replace(source, target)
+        folded.append((token, replacements))
+    (a, a_replacements), (b, b_replacements) = folded
+    multi_char_cost = abs(a_replacements - b_replacements) * CONFUSION_SUBSTITUTION_COST
+    if multi_char_cost > limit:
+        return limit + 1.0
+    return weighted_edit_distance(a, b, limit - multi_char_cost) + multi_char_cost
+
+
+def allowed_edit_distance(length: int) -> float:
+    """
+    Edit budget by token length. Only OCR confusions fit in it: a single real
+    insertion, deletion or substitution ("legrande", "porcelanato") never matches.
+
+    Args:
+        length: Length of the shorter token
+
+    Returns:
+        Maximum weighted edit distance for a match
+    """
+    if length <= 6:
+        return 2 * CONFUSION_SUBSTITUTION_COST
+    return 3 * CONFUSION_SUBSTITUTION_COST
+
+
+class FuzzyBrandIndex:
+    """Deletion-neighbourhood index from confusion skeletons to canonical brands."""
+
+    def __init__(self, max_deletes: int = 2, min_token_length: int = 5):
+        """
+        Initialize an empty index.
+
+        Args:
+            max_deletes: Deletions generated per skeleton (bounds the edit distance found)
+            min_token_length: Shorter tokens are never fuzzily matched
+        """
+        self.max_deletes = max_deletes
+        self.min_token_length = min_token_length
+        self._deletes: Dict[str, Set[str]] = {}  # Skeleton deletion -> patterns
+        self._patterns: Dict[str, str] = {}  # Pattern -> canonical brand
+        self._lookup_cache: Dict[str, Optional[str]] = {}
+
+    def build(self, patterns: Dict[str, str], excluded: Iterable[str] = ()) -> None:
+        """
+        (Re)build the index from normalized brand patterns.
+
+        Args:
+            patterns: Normalized pattern -> canonical brand (e.g. BrandGazetteer.patterns)
+            excluded: Canonical brands that must never be matched fuzzily
+        """
+        excluded = set(excluded)
+        self._deletes = {}
+        self._patterns = {}
+        self._lookup_cache = {}
+        for pattern, canonical in patterns.items():
+            if canonical in excluded:
+                continue
+            # Multi-word brands are indexed glued together ("sherwinwilliams"), as OCR often drops spaces
+            key = "".join(char for char in pattern if char.isalnum())
+            if len(key) < self.min_token_length:
+                continue
+            self._patterns[key] = canonical
+            for variant in self._generate_deletes(confusion_skeleton(key), self.max_deletes):
+                self._deletes.setdefault(variant, set()).add(key)
+
+    def _generate_deletes(self, word: str, depth: int) -> Set[str]:
+        """All strings reachable from word by up to depth single-character deletions."""
+        results = {word}
+        frontier = {word}
+        for _ in range(depth):
+            next_frontier = set()
+            for item in frontier:
+                for i in range(len(item)):
+                    next_frontier.add(item[:i] + item[i + 1:])
+            results.update(next_frontier)
+            frontier = next_frontier
+        return results
+
+    def lookup(self, token: str) -> Optional[str]:
+        """
+        Resolve a noisy token to a canonical brand.
+
+        Args:
+            token: Lower-case, accent-stripped token (digits and '|' allowed)
+
+        Returns:
+            Canonical brand name, or None when no brand is close enough
+        """
+        if len(token) < self.min_token_length:
+            return None
+        if token in self._lookup_cache:
+            return self._lookup_cache[token]
+
+        limit = allowed_edit_distance(len(token))
+        skeleton = confusion_skeleton(token)
+        candidates: Set[str] = set()
+        for variant in self._generate_deletes(skeleton, self.max_deletes):
+            candidates.update(self._deletes.get(variant, ()))
+
+        best: Optional[Tuple[float, str]] = None
+        for key in candidates:
+            if len(confusion_skeleton(key)) != len(skeleton):  # Lengths only differ by real edits
+                continue
+            distance = ocr_edit_distance(token, key, limit)
+            if distance <= limit and (best is None or distance < best[0]):
+                best = (distance, key)
+
+        result = self._patterns[best[1]] if best else None
+        if len(self._lookup_cache) < 100000:
+            self._lookup_cache[token] = result
+        return result
+
+    def normalize_brand(self, brand: str) -> str:
+        """
+        Map a brand name (e.g. an LLM echo of OCR noise) to its canonical form.
+
+        Args:
+            brand: Brand as reported
+
+        Returns:
+            Canonical brand if the name resolves, otherwise the input unchanged
+        """
+        folded = unicodedata.normalize("NFKD", brand).casefold()
+        key = "".join(char for char in folded if (char.isalnum() or char == "|") and not unicodedata.combining(char))
+        if key in self._patterns:
+            return self._patterns[key]
+        return self.lookup(key) or brand
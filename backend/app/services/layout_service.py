@@ -0,0 +1,263 @@
+"""
+Page layout analysis service.
+Locates dense text blocks (general notes, legends, spec tables) and table grids
+(equipment schedules) on a low-resolution render so OCR effort can be
+concentrated on the regions where brands actually appear.
+"""
+
+import logging
+import time
+from typing import List, Optional
+from dataclasses import dataclass
+import cv2
+import numpy as np
+
+from ..config import settings
+from .image_preprocessing import page_preprocessor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RegionOfInterest:
+    """Represents a page region worth OCR'ing, in full-resolution pixel coordinates."""
+    x: int
+    y: int
+    width: int
+    height: int
+    kind: str  # "table" or "text_block"
+    score: float  # Priority, higher is processed first
+
+    @property
+    def right(self) -> int:
+        return self.x + self.width
+
+    @property
+    def bottom(self) -> int:
+        return self.y + self.height
+
+    def overlaps(self, other: "RegionOfInterest") -> bool:
+        """Check whether two regions intersect."""
+        return not (
+            self.right <= other.x or other.right <= self.x or
+            self.bottom <= other.y or other.bottom <= self.y
+        )
+
+    def contains(self, x: int, y: int, width: int, height: int) -> bool:
+        """Check whether a rectangle lies entirely inside this region."""
+        return (
+            self.x <= x and self.y <= y and
+            x + width <= self.right and y + height <= self.bottom
+        )
+
+
+class LayoutAnalyzer:
+    """Low-resolution page layout analyzer for text block and table grid detection."""
+
+    def __init__(self):
+        """Initialize layout analyzer with settings."""
+        self.max_side = settings.layout_max_side
+        self.min_block_glyphs = settings.layout_min_block_glyphs
+        self.roi_padding = settings.layout_roi_padding
+        self.table_line_fraction = 0.04  # Grid rules must span 4% of the page's short side
+        self.min_table_intersections = 4  # A grid needs at least a 2x2 lattice
+        logger.info(f"LayoutAnalyzer initialized (max side: {self.max_side}px, min glyphs per block: {self.min_block_glyphs})")
+
+    def analyze_page(self, image: np.ndarray, page_number: int) -> Optional[List[RegionOfInterest]]:
+        """
+        Locate text blocks and table grids on a page.
+
+        Args:
+            image: OpenCV grayscale page image at full resolution
+            page_number: Page number being analyzed (for logging)
+
+        Returns:
+            List of RegionOfInterest sorted by descending priority (empty when the page has no
+            text blocks or tables), or None if the analysis failed
+        """
+        try:
+            start_time = time.time()
+            height, width = image.shape
+
+            # Work on a low-resolution render
+            scale = min(1.0, self.max_side / float(max(height, width)))
+            if scale < 1.0:
+                small = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+            else:
+                small = image
+
+            ink_mask = page_preprocessor.compute_ink_mask(small)
+
+            # Separate ruled lines from glyphs
+            min_line = max(15, int(min(small.shape) * self.table_line_fraction))
+            horizontal_mask, vertical_mask = page_preprocessor.detect_grid_masks(ink_mask, min_line)
+            grid_mask = cv2.bitwise_or(horizontal_mask, vertical_mask)
+            grid_mask = cv2.dilate(grid_mask, np.ones((3, 3), dtype=np.uint8))
+
+            regions = self._find_tables(horizontal_mask, vertical_mask, grid_mask)
+
+            text_mask = cv2.bitwise_and(ink_mask, cv2.bitwise_not(grid_mask))
+            regions.extend(self._find_text_blocks(text_mask))
+            del ink_mask, horizontal_mask, vertical_mask, grid_mask, text_mask
+
+            # Back to full-resolution coordinates with padding
+            full_regions = []
+            for region in regions:
+                x = max(0, int(region.x / scale) - self.roi_padding)
+                y = max(0, int(region.y / scale) - self.roi_padding)
+                right = min(width, int(region.right / scale) + self.roi_padding)
+                bottom = min(height, int(region.bottom / scale) + self.roi_padding)
+                full_regions.append(RegionOfInterest(
+                    x=x, y=y, width=right - x, height=bottom - y,
+                    kind=region.kind, score=region.score
+                ))
+
+            merged_regions = self._merge_overlapping(full_regions)
+            merged_regions.sort(key=lambda r: r.score, reverse=True)
+
+            covered = sum(r.width * r.height for r in merged_regions) / float(width * height)
+            logger.info(f"Layout analysis for page {page_number}: {len([r for r in merged_regions if r.kind == 'table'])} tables, {len([r for r in merged_regions if r.kind == 'text_block'])} text blocks covering {covered:.1%} of the page in {time.time() - start_time:.2f} seconds")
+            return merged_regions
+
+        except Exception as e:
+            logger.error(f"Layout analysis failed for page {page_number}: {str(e)}")
+            return None
+
+    def _find_tables(
+        self,
+        horizontal_mask: np.ndarray,
+        vertical_mask: np.ndarray,
+        grid_mask: np.ndarray
+    ) -> List[RegionOfInterest]:
+        """
+        Find table grids as connected rule structures with several line intersections.
+
+        Args:
+            horizontal_mask: Horizontal rules (low resolution)
+            vertical_mask: Vertical rules (low resolution)
+            grid_mask: Dilated union of both masks
+
+        Returns:
+            List of table regions in low-resolution coordinates
+        """
+        kernel = np.ones((3, 3), dtype=np.uint8)
+        intersections = cv2.bitwise_and(cv2.dilate(horizontal_mask, kernel), cv2.dilate(vertical_mask, kernel))
+        _, _, _, intersection_points = cv2.connectedComponentsWithStats(intersections, connectivity=8)
+        intersection_points = intersection_points[1:]  # Drop background
+
+        tables = []
+        contours, _ = cv2.findContours(grid_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w < 20 or h < 20:
+                continue
+
+            inside = (
+                (intersection_points[:, 0] >= x) & (intersection_points[:, 0] <= x + w) &
+                (intersection_points[:, 1] >= y) & (intersection_points[:, 1] <= y + h)
+            )
+            intersection_count = int(inside.sum())
+            if intersection_count < self.min_table_intersections:
+                continue
+
+            # Page borders and title-block frames span almost the whole sheet
+            if w * h > 0.8 * grid_mask.size:
+                continue
+
+            # Schedules get top priority: they carry manufacturer/model columns
+            tables.append(RegionOfInterest(x=x, y=y, width=w, height=h, kind="table", score=1000.0 + intersection_count))
+
+        return tables
+
+    def _find_text_blocks(self, text_mask: np.ndarray) -> List[RegionOfInterest]:
+        """
+        Find dense text blocks by merging glyph-sized components into paragraphs.
+
+        Args:
+            text_mask: Ink mask without ruled lines (low resolution)
+
+        Returns:
+            List of text block regions in low-resolution coordinates
+        """
+        count, labels, stats, centroids = cv2.connectedComponentsWithStats(text_mask, connectivity=8)
+        if count <= 1:
+            return []
+
+        component_widths = stats[1:, cv2.CC_STAT_WIDTH]
+        component_heights = stats[1:, cv2.CC_STAT_HEIGHT]
+
+        # Glyph-sized components: small, not hair-thin, not elongated like dimension lines
+        glyph_filter = (
+            (component_heights >= 2) & (component_heights <= 40) &
+            (component_widths <= 6 * np.maximum(component_heights, 1))
+        )
+        glyph_ids = np.nonzero(glyph_filter)[0] + 1
+        if len(glyph_ids) < self.min_block_glyphs:
+            return []
+
+        glyph_centroids = centroids[glyph_ids]
+        median_height = max(2, int(np.median(component_heights[glyph_filter])))
+
+        # Paint glyphs and close gaps between characters, words and lines
+        glyph_mask = np.where(np.isin(labels, glyph_ids), 255, 0).astype(np.uint8)
+        del labels
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3 * median_height, 2 * median_height))
+        cv2.morphologyEx(glyph_mask, cv2.MORPH_CLOSE, kernel, dst=glyph_mask)
+
+        blocks = []
+        contours, _ = cv2.findContours(glyph_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            inside = (
+                (glyph_centroids[:, 0] >= x) & (glyph_centroids[:, 0] <= x + w) &
+                (glyph_centroids[:, 1] >= y) & (glyph_centroids[:, 1] <= y + h)
+            )
+            glyph_count = int(inside.sum())
+            if glyph_count < self.min_block_glyphs:
+                continue  # Sparse drawing-body labels
+
+            blocks.append(RegionOfInterest(x=x, y=y, width=w, height=h, kind="text_block", score=float(glyph_count)))
+
+        return blocks
+
+    def _merge_overlapping(self, regions: List[RegionOfInterest]) -> List[RegionOfInterest]:
+        """
+        Merge overlapping regions into their bounding union.
+
+        Args:
+            regions: Regions in full-resolution coordinates
+
+        Returns:
+            List of non-overlapping regions
+        """
+        merged = list(regions)
+        changed = True
+        while changed:
+            changed = False
+            result = []
+            while merged:
+                current = merged.pop()
+                for i, other in enumerate(merged):
+                    if current.overlaps(other):
+                        merged.pop(i)
+                        x = min(current.x, other.x)
+                        y = min(current.y, other.y)
+                        right = max(current.right, other.right)
+                        bottom = max(current.bottom, other.bottom)
+                        merged.append(RegionOfInterest(
+                            x=x, y=y, width=right - x, height=bottom - y,
+                            kind="table" if "table" in (current.kind, other.kind) else "text_block",
+                            score=max(current.score, other.score) + min(current.score, other.score) * 0.5
+                        ))
+                        changed = True
+                        break
+                else:
+                    result.append(current)
+            merged = result
+        return merged
+
+
+# Global layout analyzer instance
+layout_analyzer = LayoutAnalyzer()
@@ -0,0 +1,292 @@
+"""
+Document-level line deduplication service.
+Collects OCR lines from every page of a plan set, collapses exact and
+near-duplicate lines (general notes repeated on dozens of sheets), sends only
+the unique lines to the LLM and maps detected brands back to every page that
+contained a matching line.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
+from dataclasses import dataclass, field
+
+from ..config import settings
+from .prompt_packer import estimate_tokens
+from .brand_gazetteer import brand_gazetteer
+from .fuzzy_brand_index import confusion_skeleton
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_line(text: str) -> str:
+    """
+    Normalize a line for matching: strip accents, case-fold, keep alphanumerics.
+
+    Args:
+        text: Raw OCR line
+
+    Returns:
+        Space-separated lower-case alphanumeric tokens
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"[a-z0-9]+", text.casefold()))
+
+
+@dataclass
+class UniqueLine:
+    """A unique (or near-duplicate cluster representative) line and the pages it appears on."""
+    text: str
+    key: str  # Normalized form of the representative
+    pages: Set[int] = field(default_factory=set)
+    occurrences: int = 0
+
+
+class DocumentLineDeduplicator:
+    """Exact and SimHash near-duplicate line deduplication across a document."""
+
+    SIMHASH_BITS = 64
+    SIMHASH_BANDS = 4  # LSH bands; near duplicates must agree on at least one 16-bit band
+
+    def __init__(self):
+        """Initialize deduplicator from settings."""
+        self.max_distance = settings.line_dedup_max_distance
+        self.chunk_tokens = settings.line_dedup_chunk_tokens
+        self.min_line_chars = 3  # Shorter normalized lines carry no brand information
+        self.min_near_dup_chars = 20  # SimHash is unreliable on very short lines
+        self.min_distinct_word_chars = 4  # Alphabetic tokens this long that differ keep lines apart
+        logger.info(f"DocumentLineDeduplicator initialized (max SimHash distance: {self.max_distance}, chunk tokens: {self.chunk_tokens})")
+
+    def _simhash(self, key: str) -> int:
+        """64-bit SimHash over character trigrams of a normalized line."""
+        weights = [0] * self.SIMHASH_BITS
+        for i in range(max(1, len(key) - 2)):
+            digest = hashlib.blake2b(key[i:i + 3].encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "big")
+            for bit in range(self.SIMHASH_BITS):
+                weights[bit] += 1 if value >> bit & 1 else -1
+        return sum(1 << bit for bit in range(self.SIMHASH_BITS) if weights[bit] > 0)
+
+    @staticmethod
+    def _within_one_edit(a: str, b: str) -> bool:
+        """Check whether two tokens differ by at most one insertion, deletion or substitution."""
+        if abs(len(a) - len(b)) > 1:
+            return False
+        if len(a) == len(b):
+            return sum(1 for x, y in zip(a, b) if x != y) <= 1
+        if len(a) > len(b):
+            a, b = b, a
+        for i in range(len(b)):
+            if a == b[:i] + b[i + 1:]:
+                return True
+        return False
+
+    def _is_safe_near_duplicate(self, key: str, other_key: str) -> bool:
+        """
+        Verify a SimHash candidate: token-aligned lines whose differing tokens are
+        numbers/codes, OCR confusions or one-edit slips in short tokens, so no
+        distinct word (brand) is hidden. "TRANE" and "CRANE" never fold together.
+        """
+        tokens = key.split()
+        other_tokens = other_key.split()
+        if len(tokens) != len(other_tokens):
+            return False
+        for token, other_token in zip(tokens, other_tokens):
+            if token == other_token:
+                continue
+            if any(char.isdigit() for char in token) and any(char.isdigit() for char in other_token):
+                continue
+            if confusion_skeleton(token) == confusion_skeleton(other_token):
+                continue
+            # A different alphabetic word of four or more letters may be a different brand
+            if max(len(token), len(other_token)) >= self.min_distinct_word_chars and (token.isalpha() or other_token.isalpha()):
+                return False
+            if not self._within_one_edit(token, other_token):
+                return False
+        return True
+
+    def deduplicate(self, page_texts: Dict[int, str]) -> Tuple[List[UniqueLine], Dict[str, int]]:
+        """
+        Collapse the lines of all pages into unique lines with page back-references.
+
+        Args:
+            page_texts: Text per page number
+
+        Returns:
+            Tuple of (unique lines, statistics)
+        """
+        by_key: Dict[str, UniqueLine] = {}
+        total_lines = 0
+        for page_number in sorted(page_texts):
+            for raw_line in page_texts[page_number].splitlines():
+                key = normalize_line(raw_line)
+                if len(key) < self.min_line_chars:
+                    continue
+                total_lines += 1
+                line = by_key.get(key)
+                if line is None:
+                    line = by_key[key] = UniqueLine(text=raw_line.strip(), key=key)
+                line.pages.add(page_number)
+                line.occurrences += 1
+
+        exact_unique = list(by_key.values())
+
+        # Near-duplicate clustering: SimHash with banded lookup
+        band_bits = self.SIMHASH_BITS // self.SIMHASH_BANDS
+        band_mask = (1 << band_bits) - 1
+        buckets: Dict[Tuple[int, int], List[Tuple[int, UniqueLine]]] = {}
+        unique_lines: List[UniqueLine] = []
+        near_duplicates = 0
+
+        # Most frequent lines first so they become cluster representatives
+        for line in sorted(exact_unique, key=lambda l: l.occurrences, reverse=True):
+            if len(line.key) < self.min_near_dup_chars or self.max_distance <= 0:
+                unique_lines.append(line)
+                continue
+
+            fingerprint = self._simhash(line.key)
+            bands = [(band, fingerprint >> (band * band_bits) & band_mask) for band in range(self.SIMHASH_BANDS)]
+            representative = None
+            for band in bands:
+                for other_fingerprint, other in buckets.get(band, []):
+                    if bin(fingerprint ^ other_fingerprint).count("1") <= self.max_distance and self._is_safe_near_duplicate(line.key, other.key):
+                        representative = other
+                        break
+                if representative is not None:
+                    break
+
+            if representative is not None:
+                representative.pages.update(line.pages)
+                representative.occurrences += line.occurrences
+                near_duplicates += 1
+                continue
+
+            unique_lines.append(line)
+            for band in bands:
+                buckets.setdefault(band, []).append((fingerprint, line))
+
+        stats = {
+            "total_lines": total_lines,
+            "exact_unique_lines": len(exact_unique),
+            "near_duplicate_lines": near_duplicates,
+            "unique_lines": len(unique_lines),
+        }
+        return unique_lines, stats
+
+    def build_chunks(self, unique_lines: List[UniqueLine]) -> List[List[UniqueLine]]:
+        """
+        Group unique lines into LLM-sized chunks, keeping page order for context.
+
+        Args:
+            unique_lines: Unique lines from deduplicate
+
+        Returns:
+            List of line groups, each under the chunk token budget
+        """
+        ordered = sorted(unique_lines, key=lambda line: min(line.pages))
+        chunks: List[List[UniqueLine]] = []
+        current: List[UniqueLine] = []
+        current_tokens = 0
+        for line in ordered:
+            tokens = estimate_tokens(line.text)
+            if current and current_tokens + tokens > self.chunk_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def map_brands_to_pages(self, brands: List[str], lines: List[UniqueLine]) -> Tuple[Dict[int, List[str]], int]:
+        """
+        Attribute brands detected in a chunk to the pages of the lines that mention them.
+
+        Args:
+            brands: Brands detected in the chunk
+            lines: Lines of the chunk
+
+        Returns:
+            Tuple of (brands per page, number of brands that matched no line)
+        """
+        page_brands: Dict[int, List[str]] = {}
+        unmapped = 0
+        padded_keys = [(f" {line.key} ", line.key.replace(" ", ""), line) for line in lines]
+        for brand in brands:
+            brand_key = normalize_line(brand)
+            if not brand_key:
+                continue
+            matches = [line for padded, _, line in padded_keys if f" {brand_key} " in padded]
+            if not matches:
+                # Spacing/hyphenation differences ("Sherwin-Williams" vs "SHERWINWILLIAMS")
+                compact = brand_key.replace(" ", "")
+                matches = [line for _, compact_line, line in padded_keys if compact in compact_line]
+            if not matches:
+                # Gazetteer brands may appear under an alias ("Square D" for Schneider Electric)
+                alias_keys = [normalize_line(alias) for alias in brand_gazetteer.aliases_for(brand)]
+                matches = [line for padded, _, line in padded_keys if any(alias and f" {alias} " in padded for alias in alias_keys)]
+            if not matches:
+                # LLM returned a canonical form; fall back to its longest distinctive token
+                longest = max(brand_key.split(), key=len)
+                if len(longest) >= 4:
+                    matches = [line for padded, _, line in padded_keys if f" {longest} " in padded]
+            if not matches:
+                unmapped += 1
+                logger.warning(f"Brand '{brand}' could not be mapped back to any line")
+                continue
+            for line in matches:
+                for page_number in line.pages:
+                    if brand not in page_brands.setdefault(page_number, []):
+                        page_brands[page_number].append(brand)
+        return page_brands, unmapped
+
+    async def analyze_document(
+        self,
+        page_texts: Dict[int, str],
+        detect_brands: Callable[[str, int], Awaitable[List[str]]]
+    ) -> Tuple[Dict[int, List[str]], Dict[str, int]]:
+        """
+        Detect brands for a whole document from its unique lines.
+
+        Args:
+            page_texts: Text per page number (pages without text may be omitted)
+            detect_brands: Coroutine (text, chunk_number) -> brands, e.g. BrandDetectionService.detect_brands_from_text
+
+        Returns:
+            Tuple of (brands per page number, statistics)
+        """
+        start_time = time.time()
+        unique_lines, stats = self.deduplicate(page_texts)
+        chunks = self.build_chunks(unique_lines)
+
+        page_brands: Dict[int, List[str]] = {page_number: [] for page_number in page_texts}
+        unmapped = 0
+        chunk_results = await asyncio.gather(*[
+            detect_brands("\n".join(line.text for line in lines), chunk_number)
+            for chunk_number, lines in enumerate(chunks, start=1)
+        ])
+        for brands, lines in zip(chunk_results, chunks):
+            chunk_pages, chunk_unmapped = self.map_brands_to_pages(brands, lines)
+            unmapped += chunk_unmapped
+            for page_number, found in chunk_pages.items():
+                for brand in found:
+                    if brand not in page_brands.setdefault(page_number, []):
+                        page_brands[page_number].append(brand)
+
+        stats["llm_chunks"] = len(chunks)
+        stats["unmapped_brands"] = unmapped
+        stats["characters_total"] = sum(len(text) for text in page_texts.values())
+        stats["characters_sent"] = sum(len(line.text) + 1 for line in unique_lines)
+        logger.info(f"Document-level analysis: {stats['total_lines']} lines -> {stats['unique_lines']} unique lines in {len(chunks)} LLM chunks ({stats['characters_sent']}/{stats['characters_total']} characters sent) in {time.time() - start_time:.2f} seconds")
+        return page_brands, stats
+
+
+# Global document line deduplicator instance
+document_line_deduplicator = DocumentLineDeduplicator()
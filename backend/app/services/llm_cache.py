@@ -0,0 +1,265 @@
+"""
+LLM response cache service.
+Caches brand detection results keyed by a hash of the normalized page text,
+model name and prompt version, so re-uploads, revision sets and repeated
+boilerplate sheets do not pay for a Gemini request again.
+With LLM_REPLAY_MODE set, only the in-memory tier is used: answers persisted
+by earlier runs would otherwise keep requests from being recorded or replayed.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+import concurrent.futures
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """Two-tier response cache: in-memory LRU in front of a SQLite store with TTL."""
+
+    def __init__(self):
+        """Initialize cache tiers from settings."""
+        self.enabled = settings.llm_cache_enabled
+        self.memory_entries = max(0, settings.llm_cache_memory_entries)
+        self.ttl_seconds = settings.llm_cache_ttl_hours * 3600
+        # Record/replay runs get a per-run memory cache so every run issues the same requests
+        self.db_path = "" if settings.llm_replay_mode else settings.llm_cache_path
+
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "in_flight_hits": 0, "misses": 0}
+
+        # SQLite connections are used from a single dedicated thread
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="llm_cache"
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+        if self.enabled and self.db_path:
+            try:
+                self.executor.submit(self._open_database).result()
+            except Exception as e:
+                logger.error(f"Failed to open LLM cache database {self.db_path}, using memory tier only: {str(e)}")
+                self._connection = None
+
+        logger.info(f"LLMResponseCache initialized (enabled: {self.enabled}, memory entries: {self.memory_entries}, database: {self.db_path if self._connection else 'none'})")
+
+    def _open_database(self) -> None:
+        """Open the SQLite store and drop expired entries."""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        if self.ttl_seconds > 0:
+            self._connection.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+        self._connection.commit()
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """
+        Normalize page text so cosmetic OCR differences map to the same key.
+
+        Args:
+            text: Extracted page text
+
+        Returns:
+            Unicode-normalized, case-folded text with collapsed whitespace
+        """
+        text = unicodedata.normalize("NFKC", text or "")
+        return re.sub(r"\s+", " ", text).strip().casefold()
+
+    def make_key(self, text: str, model: str, prompt_version: str) -> str:
+        """
+        Build a cache key for a request.
+
+        Args:
+            text: Text sent to the LLM
+            model: Model name
+            prompt_version: Version of the prompt template
+
+        Returns:
+            SHA-256 hex digest
+        """
+        payload = "\x1f".join((model, prompt_version, self.normalize_text(text)))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Optional[Any]]]
+    ) -> Tuple[Optional[Any], str]:
+        """
+        Return a cached value or compute it, sharing concurrent identical requests.
+
+        Args:
+            key: Cache key from make_key
+            compute: Coroutine factory producing the value; None results are not cached
+
+        Returns:
+            Tuple of (value, source) where source is "memory", "disk", "in_flight", "miss" or "disabled"
+        """
+        if not self.enabled:
+            return await compute(), "disabled"
+
+        value = self._memory_get(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value, "memory"
+
+        # Join an identical request that is already waiting on the LLM
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.stats["in_flight_hits"] += 1
+            return await asyncio.shield(in_flight), "in_flight"
+
+        future = asyncio.get_event_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await self._disk_get(key)
+            if value is not None:
+                self.stats["disk_hits"] += 1
+                self._memory_put(key, value)
+                source = "disk"
+            else:
+                self.stats["misses"] += 1
+                value = await compute()
+                if value is not None:
+                    self._memory_put(key, value)
+                    await self._disk_put(key, value)
+                source = "miss"
+            future.set_result(value)
+            return value, source
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+            if not future.done():
+                # The owner was cancelled (CancelledError is not an Exception); release joined callers
+                future.set_exception(RuntimeError(f"In-flight LLM request {key[:12]} was cancelled by its owner"))
+                future.exception()
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached value without computing it.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        value = self._memory_get(key)
+        if value is None:
+            value = await self._disk_get(key)
+            if value is not None:
+                self._memory_put(key, value)
+        return value
+
+    async def put(self, key: str, value: Any) -> None:
+        """
+        Store a value computed outside get_or_compute (e.g. a batch job result).
+
+        Args:
+            key: Cache key from make_key
+            value: Value to cache (None is ignored)
+        """
+        if not self.enabled or value is None:
+            return
+        self._memory_put(key, value)
+        await self._disk_put(key, value)
+
+    def _memory_get(self, key: str) -> Optional[Any]:
+        """Look up the LRU tier, honouring the TTL."""
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        created_at, value = entry
+        if self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value: Any) -> None:
+        """Insert into the LRU tier, evicting the least recently used entries."""
+        if self.memory_entries == 0:
+            return
+        self._memory[key] = (time.time(), value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def _disk_get(self, key: str) -> Optional[Any]:
+        """Look up the SQLite tier."""
+        if self._connection is None:
+            return None
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.executor, self._disk_get_sync, key)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {str(e)}")
+            return None
+
+    def _disk_get_sync(self, key: str) -> Optional[Any]:
+        """Synchronous SQLite lookup for thread pool execution."""
+        row = self._connection.execute(
+            "SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds:
+            self._connection.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._connection.commit()
+            return None
+        return json.loads(value)
+
+    async def _disk_put(self, key: str, value: Any) -> None:
+        """Write to the SQLite tier."""
+        if self._connection is None:
+            return
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(self.executor, self._disk_put_sync, key, value)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _disk_put_sync(self, key: str, value: Any) -> None:
+        """Synchronous SQLite write for thread pool execution."""
+        self._connection.execute(
+            "INSERT OR REPLACE INTO llm_responses (key, value, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), time.time())
+        )
+        self._connection.commit()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get process-wide hit/miss counters."""
+        return dict(self.stats, memory_entries=len(self._memory))
+
+
+# Global LLM response cache instance
+llm_response_cache = LLMResponseCache()
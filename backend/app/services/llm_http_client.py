@@ -0,0 +1,171 @@
+"""
+Shared pooled HTTP client for LLM requests.
+One httpx.AsyncClient for every LLM backend: a bounded connection pool
+(CONNECTION_POOL_SIZE), keep-alive, HTTP/2 multiplexing when the h2 package is
+installed and one TLS context so sessions are resumed instead of renegotiated.
+Connection setup (TCP connect + TLS handshake) is timed from httpcore trace
+events, so cold connections are visible next to request latency.
+"""
+
+import logging
+import ssl
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class LLMHTTPError(Exception):
+    """Non-2xx LLM response; keeps the response so status and Retry-After reach the rate limiter."""
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+        self.status_code = response.status_code
+        # Provider error bodies carry RetryInfo ("retryDelay": "17s") and the quota that was hit
+        super().__init__(f"HTTP {response.status_code} from {response.request.url.host}: {response.text[:2000]}")
+
+
+class LLMHttpClient:
+    """Process-wide pooled async HTTP client with connection setup metrics."""
+
+    def __init__(self):
+        """Initialize pool settings; the client itself is created on first use inside the event loop."""
+        self.pool_size = max(1, settings.connection_pool_size)
+        self.http2 = settings.llm_http2 and _http2_available()
+        if settings.llm_http2 and not self.http2:
+            logger.warning("LLM_HTTP2 is enabled but the h2 package is not installed (pip install 'httpx[http2]'); using HTTP/1.1")
+        self.limits = httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.pool_size,
+            keepalive_expiry=settings.llm_http_keepalive_seconds
+        )
+        self.timeout = httpx.Timeout(
+            settings.request_timeout or None,
+            connect=settings.llm_http_connect_timeout_seconds
+        )
+        # One context for all connections: TLS session tickets are reused across reconnects
+        self.ssl_context = ssl.create_default_context()
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.stats = {
+            "requests": 0,
+            "connections_opened": 0,
+            "connect_seconds_total": 0.0,
+            "tls_seconds_total": 0.0,
+            "connect_seconds_max": 0.0,
+        }
+
+        logger.info(f"LLMHttpClient initialized (pool size: {self.pool_size}, HTTP/2: {self.http2}, keep-alive: {settings.llm_http_keepalive_seconds}s)")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client (created lazily)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+                verify=self.ssl_context
+            )
+        return self._client
+
+    def _make_trace(self):
+        """Per-request httpcore trace callback timing new connections."""
+        started: Dict[str, float] = {}
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            now = time.perf_counter()
+            if event_name.endswith(".started"):
+                started[event_name[:-len(".started")]] = now
+            elif event_name == "connection.connect_tcp.complete":
+                connect_time = now - started.get("connection.connect_tcp", now)
+                self.stats["connections_opened"] += 1
+                self.stats["connect_seconds_total"] += connect_time
+                self.stats["connect_seconds_max"] = max(self.stats["connect_seconds_max"], connect_time)
+            elif event_name == "connection.start_tls.complete":
+                tls_time = now - started.get("connection.start_tls", now)
+                self.stats["tls_seconds_total"] += tls_time
+                self.stats["connect_seconds_total"] += tls_time
+                self.stats["connect_seconds_max"] = max(
+                    self.stats["connect_seconds_max"],
+                    now - started.get("connection.connect_tcp", now)
+                )
+
+        return trace
+
+    async def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        POST a JSON payload through the shared pool and decode the JSON answer.
+
+        Args:
+            url: Request URL
+            payload: JSON body
+            headers: Extra headers (authentication)
+            params: Query parameters
+
+        Returns:
+            Decoded response body
+
+        Raises:
+            LLMHTTPError: For non-2xx responses
+        """
+        self.stats["requests"] += 1
+        response = await self.client.post(
+            url,
+            json=payload,
+            headers=headers,
+            params=params,
+            extensions={"trace": self._make_trace()}
+        )
+        if response.status_code >= 400:
+            raise LLMHTTPError(response)
+        return response.json()
+
+    async def aclose(self) -> None:
+        """Close pooled connections (application shutdown)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pool configuration and connection setup counters.
+
+        Returns:
+            Statistics dictionary; requests minus connections_opened were served on reused connections
+        """
+        opened = self.stats["connections_opened"]
+        return {
+            "pool_size": self.pool_size,
+            "http2": self.http2,
+            "requests": self.stats["requests"],
+            "connections_opened": opened,
+            "connection_reuse_rate": round(1 - opened / self.stats["requests"], 4) if self.stats["requests"] else 0.0,
+            "avg_connect_ms": round(self.stats["connect_seconds_total"] / opened * 1000, 1) if opened else 0.0,
+            "avg_tls_ms": round(self.stats["tls_seconds_total"] / opened * 1000, 1) if opened else 0.0,
+            "max_connect_ms": round(self.stats["connect_seconds_max"] * 1000, 1),
+        }
+
+
+# Global LLM HTTP client instance
+llm_http_client = LLMHttpClient()
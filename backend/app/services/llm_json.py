@@ -0,0 +1,138 @@
+"""
+Tolerant JSON extraction for LLM responses.
+Finds the first JSON value in a response (skipping prose and code fences)
+without a greedy regex, and recovers the complete prefix of truncated output
+by closing the open strings, arrays and objects at the last safe point.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+CODE_FENCE_PATTERN = re.compile(r"```(?:json)?", re.IGNORECASE)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([\]}])")
+MAX_START_CANDIDATES = 5  # "{" positions tried before giving up on prose with stray braces
+
+_decoder = json.JSONDecoder()
+
+
+@dataclass
+class ParsedJSON:
+    """Result of parse_llm_json."""
+    value: Optional[Any]
+    complete: bool  # False when the value was recovered from truncated output
+
+    @property
+    def ok(self) -> bool:
+        return isinstance(self.value, dict)
+
+
+def _scan(fragment: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Walk a JSON fragment that starts at an opening brace.
+
+    Args:
+        fragment: Text starting at the opening brace
+
+    Returns:
+        (end, None) when the top-level object closes at position end, otherwise
+        (None, repaired) with the text cut back to its last complete value and the
+        open containers closed (repaired is None if nothing complete was found)
+    """
+    # Frames: ["{", expecting_key] or ["[", False]
+    stack: List[list] = []
+    checkpoint: Optional[Tuple[int, List[str]]] = None
+    in_string = False
+    escaped = False
+
+    def save(position: int) -> None:
+        nonlocal checkpoint
+        checkpoint = (position, [frame[0] for frame in stack])
+
+    for index, char in enumerate(fragment):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                # A completed value (not an object key) is a safe place to stop
+                if not (stack and stack[-1][0] == "{" and stack[-1][1]):
+                    save(index + 1)
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append([char, char == "{"])
+            save(index + 1)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return index + 1, None
+            save(index + 1)
+        elif char == ":" and stack and stack[-1][0] == "{":
+            stack[-1][1] = False
+        elif char == ",":
+            save(index)
+            if stack and stack[-1][0] == "{":
+                stack[-1][1] = True
+
+    if checkpoint is None:
+        return None, None
+    position, open_frames = checkpoint
+    closers = "".join("}" if frame == "{" else "]" for frame in reversed(open_frames))
+    return None, fragment[:position].rstrip().rstrip(",") + closers
+
+
+def parse_llm_json(text: Optional[str]) -> ParsedJSON:
+    """
+    Extract the first JSON object from an LLM response.
+
+    Args:
+        text: Raw model output (may contain prose, code fences or be truncated)
+
+    Returns:
+        Parsed value (None if no object could be recovered) and whether it was complete
+    """
+    if not text:
+        return ParsedJSON(None, False)
+    text = CODE_FENCE_PATTERN.sub("", text)
+
+    for match in list(re.finditer(r"\{", text))[:MAX_START_CANDIDATES]:
+        try:
+            value, _ = _decoder.raw_decode(text, match.start())
+            if isinstance(value, dict):
+                return ParsedJSON(value, True)
+            continue
+        except json.JSONDecodeError:
+            pass
+
+        end, repaired = _scan(text[match.start():])
+        if end is not None:
+            # Closed but malformed: tolerate trailing commas, otherwise it is prose with a stray brace
+            try:
+                value = json.loads(TRAILING_COMMA_PATTERN.sub(r"\1", text[match.start():match.start() + end]))
+                if isinstance(value, dict):
+                    return ParsedJSON(value, True)
+            except json.JSONDecodeError:
+                pass
+            continue
+
+        # Never closed: the response was cut off, keep its longest valid prefix
+        try:
+            value = json.loads(repaired) if repaired else None
+        except json.JSONDecodeError as e:
+            logger.debug(f"Could not repair truncated JSON: {str(e)}")
+            value = None
+        return ParsedJSON(value if isinstance(value, dict) else None, False)
+    return ParsedJSON(None, False)
@@ -0,0 +1,435 @@
+"""
+LLM provider backends.
+A small provider interface (complete, batch, token count, structured output)
+with a Gemini backend and a backend for any OpenAI-compatible chat completions
+endpoint, such as a local llama.cpp or vLLM server. Both send their requests
+through the shared pooled HTTP client; ProviderPool spreads requests over
+equivalent backends by least outstanding requests.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .llm_http_client import llm_http_client
+from .prompt_packer import estimate_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMResponse:
+    """Provider-neutral completion result."""
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    finish_reason: str = ""
+    truncated: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class LLMProvider:
+    """Base class for LLM backends."""
+
+    name = "base"
+
+    def __init__(self, model: str, endpoint: str = ""):
+        self.model = model
+        self.endpoint = endpoint
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_content: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        """
+        Run one chat completion.
+
+        Args:
+            system_prompt: Static instructions
+            user_content: Variable part of the request
+            response_schema: JSON schema the answer must follow (structured output), or None for free text
+
+        Returns:
+            Completion result with token usage
+        """
+        raise NotImplementedError
+
+    async def complete_batch(
+        self,
+        system_prompt: str,
+        user_contents: List[str],
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> List[Optional[LLMResponse]]:
+        """
+        Run several completions concurrently (offline batch jobs go through BatchInferenceService).
+
+        Args:
+            system_prompt: Static instructions shared by all requests
+            user_contents: One user message per request
+            response_schema: Optional JSON schema for every answer
+
+        Returns:
+            Results in request order (None where a request failed)
+        """
+        results = await asyncio.gather(
+            *[self.complete(system_prompt, content, response_schema) for content in user_contents],
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"{self.name} batch request failed: {str(result)}")
+        return [None if isinstance(result, Exception) else result for result in results]
+
+    async def count_tokens(self, text: str) -> int:
+        """
+        Count tokens of text with the backend's tokenizer.
+
+        Args:
+            text: Text to count
+
+        Returns:
+            Token count (falls back to the local estimate when the backend cannot count)
+        """
+        return estimate_tokens(text)
+
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+
+def to_gemini_schema(schema: Any) -> Any:
+    """
+    Convert a JSON schema to Gemini's OpenAPI-subset schema (upper-case types, no additionalProperties).
+
+    Args:
+        schema: JSON schema (or a nested part of one)
+
+    Returns:
+        Gemini responseSchema
+    """
+    if isinstance(schema, dict):
+        return {
+            key: value.upper() if key == "type" and isinstance(value, str) else to_gemini_schema(value)
+            for key, value in schema.items()
+            if key != "additionalProperties"
+        }
+    if isinstance(schema, list):
+        return [to_gemini_schema(item) for item in schema]
+    return schema
+
+
+class GeminiContextCache:
+    """Explicit Gemini cached content holding the system prompt, created lazily and renewed before expiry."""
+
+    def __init__(self, model: str, ttl_minutes: int, display_name: str):
+        self.model = model
+        self.ttl_seconds = max(60, ttl_minutes * 60)
+        self.display_name = display_name
+        self.enabled = True
+        self.name: Optional[str] = None
+        self.expires_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get(self, system_prompt: str) -> Optional[str]:
+        """
+        Get (creating or renewing if needed) the cached content for the system prompt.
+
+        Args:
+            system_prompt: System prompt to cache
+
+        Returns:
+            Cached content resource name, or None to send the system prompt inline
+            (the provider's implicit prefix caching still applies)
+        """
+        if not self.enabled:
+            return None
+        if self.name and time.time() < self.expires_at:
+            return self.name
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if self.name and time.time() < self.expires_at:
+                return self.name
+            try:
+                cached_content = await llm_http_client.post_json(
+                    f"{GEMINI_API_URL}/cachedContents",
+                    {
+                        "model": f"models/{self.model}",
+                        "display_name": self.display_name,
+                        "system_instruction": {"parts": [{"text": system_prompt}]},
+                        "ttl": f"{self.ttl_seconds}s",
+                    },
+                    headers={"x-goog-api-key": settings.gemini_api_key}
+                )
+                self.name = cached_content["name"]
+                # Renew a minute early so no request references an expired cache
+                self.expires_at = time.time() + self.ttl_seconds - 60
+                logger.info(f"Created Gemini context cache {self.name} ({self.display_name})")
+            except Exception as e:
+                # Typically the prompt is below the model's minimum cacheable size
+                logger.warning(f"Gemini context caching unavailable, sending system prompt inline: {str(e)}")
+                self.enabled = False
+                self.name = None
+
+        return self.name
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini generateContent over the REST API."""
+
+    name = "gemini"
+
+    def __init__(self, model: str, context_cache: Optional[GeminiContextCache] = None):
+        """
+        Initialize Gemini backend.
+
+        Args:
+            model: Gemini model name
+            context_cache: Shared explicit context cache for the system prompt, if enabled
+        """
+        super().__init__(model, GEMINI_API_URL)
+        self.context_cache = context_cache
+        self.headers = {"x-goog-api-key": settings.gemini_api_key}
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_content: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        generation_config: Dict[str, Any] = {
+            "temperature": 0.1,
+            # Room for long brand lists and packed multi-page answers; truncation is detected and logged
+            "max_output_tokens": settings.llm_max_output_tokens,
+        }
+        if response_schema is not None:
+            generation_config["response_mime_type"] = "application/json"
+            generation_config["response_schema"] = to_gemini_schema(response_schema)
+        payload: Dict[str, Any] = {
+            "contents": [{"role": "user", "parts": [{"text": user_content}]}],
+            "generation_config": generation_config,
+        }
+        cached_content = await self.context_cache.get(system_prompt) if self.context_cache else None
+        if cached_content:
+            payload["cached_content"] = cached_content
+        else:
+            payload["system_instruction"] = {"parts": [{"text": system_prompt}]}
+
+        data = await llm_http_client.post_json(
+            f"{self.endpoint}/models/{self.model}:generateContent", payload, headers=self.headers
+        )
+        candidate = (data.get("candidates") or [{}])[0]
+        parts = (candidate.get("content") or {}).get("parts") or []
+        usage = data.get("usageMetadata") or {}
+        finish_reason = candidate.get("finishReason") or ""
+        return LLMResponse(
+            text="".join(part.get("text", "") for part in parts),
+            input_tokens=usage.get("promptTokenCount", 0),
+            output_tokens=usage.get("candidatesTokenCount", 0),
+            cached_tokens=usage.get("cachedContentTokenCount", 0),
+            finish_reason=finish_reason,
+            truncated=finish_reason == "MAX_TOKENS"
+        )
+
+    async def count_tokens(self, text: str) -> int:
+        try:
+            data = await llm_http_client.post_json(
+                f"{self.endpoint}/models/{self.model}:countTokens",
+                {"contents": [{"role": "user", "parts": [{"text": text}]}]},
+                headers=self.headers
+            )
+            return int(data["totalTokens"])
+        except Exception as e:
+            logger.warning(f"Gemini token count failed, using estimate: {str(e)}")
+            return estimate_tokens(text)
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any OpenAI-compatible /chat/completions endpoint (llama.cpp server, vLLM, hosted gateways)."""
+
+    name = "openai_compatible"
+
+    def __init__(self, model: str, base_url: str, api_key: str = ""):
+        """
+        Initialize OpenAI-compatible backend.
+
+        Args:
+            model: Model name as served by the endpoint
+            base_url: API base URL including the version prefix (e.g. http://localhost:8080/v1)
+            api_key: Bearer token, if the endpoint requires one
+        """
+        super().__init__(model, base_url.rstrip("/"))
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    def _response_format(self, response_schema: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if response_schema is None:
+            return None
+        if settings.llm_openai_json_schema:
+            return {"type": "json_schema", "json_schema": {"name": "response", "schema": response_schema, "strict": True}}
+        return {"type": "json_object"}
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_content: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+            "temperature": 0.1,
+            "max_tokens": settings.llm_max_output_tokens,
+        }
+        response_format = self._response_format(response_schema)
+        if response_format:
+            payload["response_format"] = response_format
+
+        data = await llm_http_client.post_json(f"{self.endpoint}/chat/completions", payload, headers=self.headers)
+        choice = (data.get("choices") or [{}])[0]
+        usage = data.get("usage") or {}
+        finish_reason = choice.get("finish_reason") or ""
+        return LLMResponse(
+            text=(choice.get("message") or {}).get("content") or "",
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+            finish_reason=finish_reason,
+            truncated=finish_reason == "length"
+        )
+
+    async def count_tokens(self, text: str) -> int:
+        # llama.cpp and vLLM both serve /tokenize next to the versioned API
+        root_url = self.endpoint[:-3] if self.endpoint.endswith("/v1") else self.endpoint
+        try:
+            data = await llm_http_client.post_json(
+                f"{root_url}/tokenize",
+                {"model": self.model, "prompt": text, "content": text},
+                headers=self.headers
+            )
+            if "count" in data:
+                return int(data["count"])
+            return len(data["tokens"])
+        except Exception as e:
+            logger.warning(f"Token count endpoint unavailable, using estimate: {str(e)}")
+            return estimate_tokens(text)
+
+
+class ProviderPool:
+    """Least-outstanding-requests dispatcher over equivalent backends (same model, different endpoints)."""
+
+    def __init__(self, providers: List[LLMProvider]):
+        """
+        Initialize pool.
+
+        Args:
+            providers: Interchangeable backends; must not be empty
+        """
+        self.providers = providers
+        self.outstanding = [0] * len(providers)
+        self.dispatched = [0] * len(providers)
+        self._next = 0
+
+    @property
+    def model(self) -> str:
+        return self.providers[0].model
+
+    @property
+    def name(self) -> str:
+        return self.providers[0].name
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[LLMProvider]:
+        """
+        Borrow the backend with the fewest in-flight requests for one call.
+
+        Yields:
+            LLM provider (ties rotate so idle backends share the load)
+        """
+        count = len(self.providers)
+        order = [(self._next + offset) % count for offset in range(count)]
+        self._next = (self._next + 1) % count
+        index = min(order, key=lambda candidate: self.outstanding[candidate])
+        self.outstanding[index] += 1
+        self.dispatched[index] += 1
+        try:
+            yield self.providers[index]
+        finally:
+            self.outstanding[index] -= 1
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get per-backend load.
+
+        Returns:
+            One entry per backend with in-flight and total dispatched requests
+        """
+        return [
+            {
+                "endpoint": provider.endpoint,
+                "model": provider.model,
+                "outstanding": self.outstanding[index],
+                "dispatched": self.dispatched[index],
+            }
+            for index, provider in enumerate(self.providers)
+        ]
+
+
+def create_provider_pool(model: str, context_cache: Optional[GeminiContextCache] = None) -> ProviderPool:
+    """
+    Create the backends for a model according to LLM_PROVIDER.
+
+    Gemini gets a single backend (its requests share the HTTP connection pool);
+    OpenAI-compatible servers get one backend per URL in LLM_OPENAI_BASE_URL.
+    LLM_REPLAY_MODE wraps the backends to record their calls or replaces them
+    with a backend answering from a recording.
+
+    Args:
+        model: Model name
+        context_cache: Gemini context cache (ignored by other backends)
+
+    Returns:
+        Provider pool
+
+    Raises:
+        ValueError: Unknown provider, or an OpenAI-compatible provider without server URLs
+    """
+    from .llm_replay import apply_replay_mode
+
+    providers: List[LLMProvider]
+    if settings.llm_provider == "openai_compatible":
+        base_urls = [url.strip() for url in (settings.llm_openai_base_url or "").split(",") if url.strip()]
+        if not base_urls:
+            raise ValueError("LLM_PROVIDER=openai_compatible requires LLM_OPENAI_BASE_URL (comma-separated server URLs)")
+        providers = [OpenAICompatibleProvider(model, base_url, settings.llm_openai_api_key) for base_url in base_urls]
+    elif settings.llm_provider == "gemini":
+        providers = [GeminiProvider(model, context_cache)]
+    else:
+        raise ValueError(f"Unknown LLM provider: {settings.llm_provider}")
+    return ProviderPool(apply_replay_mode(providers))
+
+
+def provider_models() -> Tuple[str, str]:
+    """
+    Get the (primary, cheap cascade) model names for the configured provider.
+
+    Returns:
+        Tuple of model names (cheap is empty when the cascade has no model tier)
+    """
+    if settings.llm_provider == "openai_compatible":
+        return settings.llm_openai_model, settings.llm_openai_cheap_model
+    return settings.gemini_model, settings.llm_cascade_cheap_model
@@ -0,0 +1,283 @@
+"""
+Record/replay harness for LLM calls.
+In record mode every completion of the configured provider is appended to a
+JSONL file (request key, prompt, response, token usage and latency). In
+replay mode the provider is replaced by a backend that answers from that file
+without network access, sleeping either the recorded latency or a seeded
+synthetic one, so pipeline benchmarks and load tests are repeatable and
+prompt or packing strategies can be compared on identical inputs.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config import settings
+from .llm_providers import LLMProvider, LLMResponse
+from .prompt_packer import estimate_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+REPLAY_MODES = ("record", "replay")
+REPLAY_LATENCY_MODES = ("recorded", "synthetic", "none")
+P95_Z_SCORE = 1.645  # Standard normal quantile of the 95th percentile
+
+
+class LLMReplayMissError(Exception):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def replay_key(model: str, system_prompt: str, user_content: str, response_schema: Optional[Dict[str, Any]]) -> str:
+    """
+    Identify a request by everything that can change its answer.
+
+    Args:
+        model: Model name
+        system_prompt: Static instructions
+        user_content: Variable part of the request
+        response_schema: Structured output schema, if any
+
+    Returns:
+        SHA-256 hex digest
+    """
+    schema = json.dumps(response_schema, sort_keys=True) if response_schema is not None else ""
+    material = "\x00".join([model, system_prompt, user_content, schema])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMReplayStore:
+    """JSONL file of recorded completions plus record/replay counters."""
+
+    def __init__(self):
+        """Initialize store from settings; replay mode loads the recordings."""
+        self.mode = settings.llm_replay_mode
+        self.path = settings.llm_replay_path
+        self.latency_mode = settings.llm_replay_latency
+        self.latency_scale = max(0.0, settings.llm_replay_latency_scale)
+        self.seed = settings.llm_replay_seed
+
+        # Synthetic latencies are log-normal with the configured median and 95th percentile
+        median = max(1e-3, settings.llm_replay_latency_median_seconds)
+        p95 = max(median, settings.llm_replay_latency_p95_seconds)
+        self.log_mu = math.log(median)
+        self.log_sigma = math.log(p95 / median) / P95_Z_SCORE
+
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._occurrences: Dict[str, int] = {}
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0, "simulated_latency_seconds": 0.0}
+
+        if self.mode == "replay":
+            self._load()
+
+        if self.mode:
+            logger.info(f"LLMReplayStore initialized (mode: {self.mode}, file: {self.path}, records: {len(self.records)}, latency: {self.latency_mode} x{self.latency_scale})")
+
+    def _load(self) -> None:
+        """Load recordings; the last recording of a request wins."""
+        if not os.path.exists(self.path):
+            logger.error(f"LLM replay file {self.path} does not exist; every request will miss")
+            return
+        with open(self.path, "r", encoding="utf-8") as replay_file:
+            for line_number, line in enumerate(replay_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    self.records[record["key"]] = record
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.warning(f"Skipping invalid LLM replay line {line_number}: {str(e)}")
+
+    def record(self, key: str, provider: LLMProvider, user_content: str, response: LLMResponse, latency: float) -> None:
+        """
+        Append one completion to the recording file.
+
+        Args:
+            key: Request key (replay_key)
+            provider: Backend that answered
+            user_content: Variable part of the request
+            response: Completion result
+            latency: Seconds the call took
+        """
+        record = {
+            "key": key,
+            "provider": provider.name,
+            "model": provider.model,
+            "user_content": user_content,
+            "text": response.text,
+            "input_tokens": response.input_tokens,
+            "output_tokens": response.output_tokens,
+            "cached_tokens": response.cached_tokens,
+            "finish_reason": response.finish_reason,
+            "truncated": response.truncated,
+            "latency_seconds": round(latency, 4),
+            "recorded_at": time.time(),
+        }
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as replay_file:
+                replay_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.stats["recorded"] += 1
+        except Exception as e:
+            logger.error(f"Failed to record LLM call to {self.path}: {str(e)}")
+
+    def latency_for(self, key: str, record: Dict[str, Any]) -> float:
+        """
+        Simulated latency of a replayed request.
+
+        Synthetic draws are seeded by the request key and how many times it was
+        replayed, so a rerun sleeps the same durations regardless of scheduling.
+
+        Args:
+            key: Request key
+            record: Recorded completion
+
+        Returns:
+            Seconds to wait before answering
+        """
+        if self.latency_mode == "recorded":
+            latency = float(record.get("latency_seconds", 0.0))
+        elif self.latency_mode == "synthetic":
+            occurrence = self._occurrences.get(key, 0)
+            self._occurrences[key] = occurrence + 1
+            rng = random.Random(f"{self.seed}:{key}:{occurrence}")
+            latency = rng.lognormvariate(self.log_mu, self.log_sigma)
+        else:
+            latency = 0.0
+        return latency * self.latency_scale
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get record/replay counters.
+
+        Returns:
+            Statistics dictionary
+        """
+        lookups = self.stats["replayed"] + self.stats["misses"]
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "latency": self.latency_mode,
+            "records_loaded": len(self.records),
+            **self.stats,
+            "simulated_latency_seconds": round(self.stats["simulated_latency_seconds"], 3),
+            "hit_rate": round(self.stats["replayed"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+class RecordingProvider(LLMProvider):
+    """Wraps a real backend and records each completion with its latency."""
+
+    def __init__(self, inner: LLMProvider, store: LLMReplayStore):
+        """
+        Initialize recording wrapper.
+
+        Args:
+            inner: Backend that answers the requests
+            store: Recording file
+        """
+        super().__init__(inner.model, inner.endpoint)
+        self.inner = inner
+        self.store = store
+        self.name = inner.name
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_content: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        start_time = time.perf_counter()
+        response = await self.inner.complete(system_prompt, user_content, response_schema)
+        self.store.record(
+            replay_key(self.model, system_prompt, user_content, response_schema),
+            self.inner,
+            user_content,
+            response,
+            time.perf_counter() - start_time
+        )
+        return response
+
+    async def count_tokens(self, text: str) -> int:
+        return await self.inner.count_tokens(text)
+
+
+class ReplayProvider(LLMProvider):
+    """Network-free backend answering from recorded completions."""
+
+    name = "replay"
+
+    def __init__(self, model: str, store: LLMReplayStore):
+        """
+        Initialize replay backend.
+
+        Args:
+            model: Model name the recordings were made with
+            store: Loaded recordings
+        """
+        super().__init__(model, f"replay:{store.path}")
+        self.store = store
+
+    async def complete(
+        self,
+        system_prompt: str,
+        user_content: str,
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        key = replay_key(self.model, system_prompt, user_content, response_schema)
+        record = self.store.records.get(key)
+        if record is None:
+            self.store.stats["misses"] += 1
+            raise LLMReplayMissError(f"No recorded response for request {key[:12]} ({self.model}, {len(user_content)} chars)")
+
+        latency = self.store.latency_for(key, record)
+        if latency > 0:
+            self.store.stats["simulated_latency_seconds"] += latency
+            await asyncio.sleep(latency)
+        self.store.stats["replayed"] += 1
+        return LLMResponse(
+            text=record.get("text", ""),
+            input_tokens=record.get("input_tokens", 0),
+            output_tokens=record.get("output_tokens", 0),
+            cached_tokens=record.get("cached_tokens", 0),
+            finish_reason=record.get("finish_reason", ""),
+            truncated=bool(record.get("truncated", False))
+        )
+
+    async def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text)
+
+
+def apply_replay_mode(providers: List[LLMProvider]) -> List[LLMProvider]:
+    """
+    Wrap or replace backends according to LLM_REPLAY_MODE.
+
+    Args:
+        providers: Backends created for LLM_PROVIDER
+
+    Returns:
+        Recording wrappers (record), one replay backend (replay) or the input unchanged
+    """
+    if llm_replay_store.mode and llm_replay_store.mode not in REPLAY_MODES:
+        raise ValueError(f"Unknown LLM replay mode: {llm_replay_store.mode}")
+    if llm_replay_store.latency_mode not in REPLAY_LATENCY_MODES:
+        raise ValueError(f"Unknown LLM replay latency mode: {llm_replay_store.latency_mode}")
+    if llm_replay_store.mode == "record":
+        return [RecordingProvider(provider, llm_replay_store) for provider in providers]
+    if llm_replay_store.mode == "replay":
+        return [ReplayProvider(providers[0].model, llm_replay_store)]
+    return providers
+
+
+# Global LLM record/replay store instance
+llm_replay_store = LLMReplayStore()
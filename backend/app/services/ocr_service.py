@@ -1,7 +1,7 @@
 """
 OCR Service using EasyOCR for text extraction from images.
 Optimized for accuracy with coordinate preservation and retry logic.
-Uses OpenCV for grayscale preprocessing to improve performance and accuracy.
+Uses OpenCV for page-level grayscale preprocessing to improve performance and accuracy.
 """
 
 import asyncio
@@ -9,13 +9,17 @@ import logging
 import time
 import gc
 import os
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Iterable, Iterator
 from dataclasses import dataclass
 import easyocr
 import cv2
 import numpy as np
 
 from ..config import settings
+from .image_preprocessing import page_preprocessor
+from .layout_service import layout_analyzer, RegionOfInterest
+from .table_service import table_extractor, ExtractedTable
+from .ocr_tile_queue import ocr_tile_queue
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -63,7 +67,7 @@ class OCRService:
                 model_storage_directory='./models',  # Local model storage
                 download_enabled=True,  # Download models if not present
                 # Simplified settings for CPU mode
-
+            
             )
             
             logger.info("OCRService initialized in CPU-only mode")
@@ -75,30 +79,38 @@ class OCRService:
         self.chunk_size = (1024, 1024)  # 1024x1024 pixels per chunk
         self.chunk_overlap = 200  # 200 pixels overlap between chunks
         
-        # Memory management configuration
-        self.max_concurrent_chunks = 20  # Process max 20 chunks at once to prevent memory overflow
-        self.chunk_batch_size = 10  # Process in smaller batches to manage memory better
+        # Tiles of all pages in flight share one bounded queue and worker pool
+        self.tile_queue = ocr_tile_queue
         
         # Retry configuration
         self.max_retries = settings.ocr_max_retries
         self.retry_delay = settings.ocr_retry_delay  # seconds
     
-    def _split_image_into_chunks(self, image: np.ndarray) -> List[Tuple[np.ndarray, Tuple[int, int]]]:
+    def _split_image_into_chunks(
+        self, 
+        image: np.ndarray,
+        chunk_size: Optional[Tuple[int, int]] = None,
+        chunk_overlap: Optional[int] = None
+    ) -> Iterator[Tuple[np.ndarray, Tuple[int, int]]]:
         """
         Split image into overlapping chunks for detailed text extraction.
         
+        Chunks are yielded lazily so the tile queue only holds as many as it buffers.
+        
         Args:
             image: OpenCV grayscale image (numpy array)
+            chunk_size: Optional (width, height) override for this page
+            chunk_overlap: Optional overlap override for this page
             
-        Returns:
-            List of tuples containing (chunk_image, chunk_position)
+        Yields:
+            Tuples containing (chunk_image, chunk_position)
         """
         try:
             height, width = image.shape
-            chunk_width, chunk_height = self.chunk_size
-            overlap = self.chunk_overlap
+            chunk_width, chunk_height = chunk_size or self.chunk_size
+            overlap = self.chunk_overlap if chunk_overlap is None else chunk_overlap
             
-            chunks = []
+            chunk_count = 0
             
             # Calculate step sizes
             step_x = chunk_width - overlap
@@ -113,21 +125,64 @@ class OCRService:
                     right = min(x + chunk_width, width)
                     bottom = min(y + chunk_height, height)
                     
-                    # Extract chunk using OpenCV array slicing
+                    # Extract chunk as a zero-copy view using array slicing
                     chunk = image[top:bottom, left:right]
                     
                     # Only add chunks that are large enough to be meaningful
                     chunk_height_actual, chunk_width_actual = chunk.shape
                     if chunk_width_actual >= 200 and chunk_height_actual >= 200:
-                        chunks.append((chunk, (x, y)))
+                        chunk_count += 1
+                        yield chunk, (x, y)
             
-            logger.info(f"Split image into {len(chunks)} chunks for OCR analysis")
-            return chunks
+            logger.info(f"Split image into {chunk_count} chunks for OCR analysis")
             
         except Exception as e:
             logger.error(f"Failed to split image into chunks: {str(e)}")
             raise Exception(f"Failed to split image into chunks: {str(e)}")
     
+    def _split_regions_into_chunks(
+        self, 
+        image: np.ndarray, 
+        regions: List[RegionOfInterest],
+        chunk_size: Optional[Tuple[int, int]] = None,
+        chunk_overlap: Optional[int] = None
+    ) -> Iterator[Tuple[np.ndarray, Tuple[int, int]]]:
+        """
+        Split regions of interest into overlapping chunks, in region priority order.
+        
+        Chunks are yielded lazily so the tile queue only holds as many as it buffers.
+        
+        Args:
+            image: OpenCV grayscale image (numpy array)
+            regions: Regions to tile, highest priority first
+            chunk_size: Optional (width, height) override for this page
+            chunk_overlap: Optional overlap override for this page
+            
+        Yields:
+            Tuples containing (chunk_image, chunk_position)
+        """
+        height, width = image.shape
+        chunk_width, chunk_height = chunk_size or self.chunk_size
+        overlap = self.chunk_overlap if chunk_overlap is None else chunk_overlap
+        step_x = chunk_width - overlap
+        step_y = chunk_height - overlap
+        
+        chunk_count = 0
+        for region in regions:
+            region_right = min(region.right, width)
+            region_bottom = min(region.bottom, height)
+            for y in range(region.y, region_bottom, step_y):
+                for x in range(region.x, region_right, step_x):
+                    right = min(x + chunk_width, region_right)
+                    bottom = min(y + chunk_height, region_bottom)
+                    
+                    # Regions can be small (a legend line), so accept smaller chunks than the grid
+                    if right - x >= 32 and bottom - y >= 32:
+                        chunk_count += 1
+                        yield image[y:bottom, x:right], (x, y)
+        
+        logger.info(f"Split {len(regions)} regions of interest into {chunk_count} chunks for OCR analysis")
+    
     def _adjust_coordinates_for_chunk(
         self, 
         bbox: List[List[int]], 
@@ -156,7 +211,8 @@ class OCRService:
         self, 
         chunk_image: np.ndarray, 
         chunk_position: Tuple[int, int],
-        page_number: int
+        page_number: int,
+        stats: Optional[Dict[str, int]] = None
     ) -> List[TextDetection]:
         """
         Extract text from a single image chunk using EasyOCR with retry logic.
@@ -165,6 +221,7 @@ class OCRService:
             chunk_image: OpenCV grayscale image chunk (numpy array)
             chunk_position: Position of the chunk (x, y)
             page_number: Page number being processed
+            stats: Optional counters dict updated with raw and junk box counts
             
         Returns:
             List of TextDetection objects with text and coordinates
@@ -175,22 +232,23 @@ class OCRService:
                     start_time = time.time()
                     logger.info(f"Starting OCR for page {page_number}, chunk at {chunk_position} (attempt {attempt + 1})")
                     
-                    # Apply additional preprocessing for better OCR accuracy
-                    processed_chunk = self._preprocess_chunk_for_ocr(chunk_image)
-                    
                     # Perform OCR with EasyOCR (EasyOCR accepts both grayscale and color images)
-                    results = self.reader.readtext(
-                        processed_chunk,
+                    # The chunk is a view into the page raster, already preprocessed at page level
+                    # Recognition runs on the tile queue's thread pool to keep the event loop free
+                    results = await self.tile_queue.run_blocking(
+                        self.reader.readtext,
+                        chunk_image,
                         detail=1,  # Get detailed results with coordinates
                         # Accuracy-focused settings for grayscale images
                     )
                     
-                    # Clean up processed chunk to free memory immediately
-                    del processed_chunk
-                    
                     # Process results
                     text_detections = []
+                    junk_boxes = 0
                     for bbox, text, confidence in results:
+                        if self._is_junk_box(text, confidence):
+                            junk_boxes += 1
+                        
                         # Filter out low confidence detections
                         if confidence >= settings.ocr_confidence_threshold:
                             # Adjust coordinates to full image space
@@ -207,6 +265,10 @@ class OCRService:
                                 )
                                 text_detections.append(detection)
                     
+                    if stats is not None:
+                        stats['raw_boxes'] = stats.get('raw_boxes', 0) + len(results)
+                        stats['junk_boxes'] = stats.get('junk_boxes', 0) + junk_boxes
+                    
                     # Clean up OCR results to free memory
                     del results
                     
@@ -231,33 +293,21 @@ class OCRService:
             
             return []
     
-    def _preprocess_chunk_for_ocr(self, chunk: np.ndarray) -> np.ndarray:
+    def _is_junk_box(self, text: str, confidence: float) -> bool:
         """
-        Apply additional preprocessing to grayscale chunk for better OCR accuracy.
+        Check whether a raw detector box is junk (line art, ticks, hatching).
         
         Args:
-            chunk: OpenCV grayscale image chunk
+            text: Recognized text for the box
+            confidence: Recognition confidence
             
         Returns:
-            Preprocessed grayscale image
+            True if the box is below the confidence threshold or has fewer than two alphanumeric characters
         """
-        try:
-            # Apply Gaussian blur to reduce noise (optional, can improve accuracy)
-            # denoised = cv2.GaussianBlur(chunk, (3, 3), 0)
-            
-            # Apply histogram equalization to improve contrast
-            equalized = cv2.equalizeHist(chunk)
-            
-            # Apply slight sharpening using unsharp masking (optional)
-            # blurred = cv2.GaussianBlur(equalized, (0, 0), 2.0)
-            # sharpened = cv2.addWeighted(equalized, 1.5, blurred, -0.5, 0)
-            
-            return equalized
-            
-        except Exception as e:
-            logger.warning(f"Preprocessing failed, using original chunk: {str(e)}")
-            return chunk
-
+        if confidence < settings.ocr_confidence_threshold:
+            return True
+        return sum(1 for char in text if char.isalnum()) < 2
+    
     def load_grayscale_image_from_file(self, image_path: str) -> Optional[np.ndarray]:
         """
         Load grayscale image directly from file for memory efficiency.
@@ -286,11 +336,16 @@ class OCRService:
         except Exception as e:
             logger.error(f"Error loading grayscale image from {image_path}: {str(e)}")
             return None
-
+    
     async def extract_text_from_image_file(
         self, 
         image_path: str, 
-        page_number: int
+        page_number: int,
+        regions: Optional[List[RegionOfInterest]] = None,
+        ocr_profile: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        extract_tables: bool = False
     ) -> Dict[str, any]:
         """
         Extract all text from a grayscale image file using memory-efficient chunk-based OCR processing.
@@ -298,12 +353,20 @@ class OCRService:
         Args:
             image_path: Path to the grayscale image file
             page_number: Page number being processed
+            regions: Optional regions of interest replacing the full-page grid (balanced and fast profiles)
+            ocr_profile: "full", "balanced" or "fast" (defaults to settings.ocr_profile)
+            chunk_size: Optional square tile side override (from the page's processing profile)
+            chunk_overlap: Optional tile overlap override
+            extract_tables: Extract ruled tables cell by cell before generic tiling
             
         Returns:
             Dictionary containing:
             - 'full_text': Complete extracted text
             - 'text_detections': List of TextDetection objects with coordinates
             - 'processing_time': Total processing time
+            - 'ocr_stats': Detector statistics (raw/junk boxes, detections per second, line art removed)
+            - 'tables': List of ExtractedTable objects (empty unless extract_tables is set)
+            - 'text_outside_tables': Combined text of detections outside extracted tables
         """
         try:
             start_time = time.time()
@@ -323,65 +386,76 @@ class OCRService:
             
             logger.info(f"Loaded grayscale image shape: {opencv_grayscale.shape}")
             
-            # Split image into chunks
-            logger.info(f"Splitting grayscale image into chunks for page {page_number}")
-            chunks = self._split_image_into_chunks(opencv_grayscale)
+            # Preprocess the whole page once, in place, so all tiles share the same contrast
+            page_preprocessor.preprocess_page(opencv_grayscale, page_number)
+            
+            ocr_profile = ocr_profile or settings.ocr_profile
+            tile_size = (chunk_size, chunk_size) if chunk_size else None
+            ocr_stats = {'raw_boxes': 0, 'junk_boxes': 0}
+            
+            # Locate notes, legends and schedules unless the caller already did
+            if regions is None and (ocr_profile in ("balanced", "fast") or extract_tables):
+                regions = layout_analyzer.analyze_page(opencv_grayscale, page_number)
+                if regions is None:
+                    logger.warning(f"Layout analysis failed for page {page_number}; falling back to the full-page grid")
+            
+            # Read schedules cell by cell while their rules are still on the page
+            tables = []
+            if extract_tables and regions:
+                tables = await self._extract_tables(opencv_grayscale, regions, page_number)
+                for table in tables:
+                    # Blank extracted tables so generic tiles do not read them again
+                    table_x, table_y, table_width, table_height = table.bbox
+                    opencv_grayscale[table_y:table_y + table_height, table_x:table_x + table_width] = 255
+                if tables:
+                    regions = [
+                        region for region in regions
+                        if not (region.kind == "table" and any(table.contains_point(region.x, region.y) for table in tables))
+                    ]
+            
+            # Optionally remove wall lines, dimension ticks and hatching before tiling
+            line_art_removed = page_preprocessor.suppress_line_art(opencv_grayscale, page_number)
+            
+            # Build chunk groups (lazy zero-copy views into the preprocessed page), highest priority first
+            logger.info(f"Splitting grayscale image into chunks for page {page_number} (OCR profile: {ocr_profile})")
+            chunk_groups = []
+            if ocr_profile == "full" or regions is None:
+                chunk_groups.append(self._split_image_into_chunks(opencv_grayscale, tile_size, chunk_overlap))
+            else:
+                chunk_groups.append(self._split_regions_into_chunks(opencv_grayscale, regions, tile_size, chunk_overlap))
+                if ocr_profile == "balanced":
+                    chunk_groups.append(None)  # Remaining page area, built after ROIs are done
+            
+            ocr_stats['regions_of_interest'] = len(regions) if regions else 0
             
-            # Free the main image from memory immediately after chunking
+            all_text_detections = []
+            ocr_stats['chunks'] = 0
+            for chunk_group in chunk_groups:
+                if chunk_group is None:
+                    # Blank out ROIs already read so the remaining grid does not re-read them
+                    for region in regions:
+                        opencv_grayscale[region.y:region.bottom, region.x:region.right] = 255
+                    chunk_group = (
+                        (chunk, position) for chunk, position in self._split_image_into_chunks(opencv_grayscale, tile_size, chunk_overlap)
+                        if not any(region.contains(position[0], position[1], chunk.shape[1], chunk.shape[0]) for region in regions)
+                    )
+                
+                all_text_detections.extend(
+                    await self._extract_text_from_chunks(chunk_group, page_number, ocr_stats)
+                )
+                del chunk_group
+            
+            # Chunks were views into the page buffer; release it now
+            del chunk_groups
             del opencv_grayscale
-            gc.collect()
             
-            if not chunks:
+            if ocr_stats['chunks'] == 0:
                 logger.warning(f"No valid chunks created for page {page_number}")
-                return {
-                    'full_text': '',
-                    'text_detections': [],
-                    'processing_time': time.time() - start_time
-                }
-            
-            logger.info(f"Created {len(chunks)} grayscale chunks for OCR analysis")
             
-            # Process chunks in batches to manage memory usage
-            logger.info(f"Executing {len(chunks)} OCR tasks in batches of {self.chunk_batch_size} on grayscale chunks")
-            chunk_results = []
-            
-            # Process chunks in smaller batches to prevent memory overflow
-            for i in range(0, len(chunks), self.chunk_batch_size):
-                batch_end = min(i + self.chunk_batch_size, len(chunks))
-                batch_chunks = chunks[i:batch_end]
-                
-                logger.info(f"Processing OCR batch {i//self.chunk_batch_size + 1}/{(len(chunks) + self.chunk_batch_size - 1)//self.chunk_batch_size}: chunks {i+1}-{batch_end}")
-                
-                # Create tasks for current batch
-                batch_tasks = []
-                for chunk_image, chunk_position in batch_chunks:
-                    task = self.extract_text_from_chunk(
-                        chunk_image, 
-                        chunk_position, 
-                        page_number
-                    )
-                    batch_tasks.append(task)
-                
-                # Execute current batch concurrently
-                batch_chunk_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
-                chunk_results.extend(batch_chunk_results)
-                
-                # Force garbage collection after each batch to free memory
-                del batch_tasks
-                del batch_chunks
-                gc.collect()
-                
-                logger.info(f"Completed batch {i//self.chunk_batch_size + 1}, processed {len(batch_chunk_results)} chunks")
-            
-            # Collect all text detections from all chunks
-            all_text_detections = []
-            for i, result in enumerate(chunk_results):
-                if isinstance(result, Exception):
-                    logger.error(f"Error in OCR chunk {i}: {str(result)}")
-                elif isinstance(result, list):
-                    all_text_detections.extend(result)
-                else:
-                    logger.warning(f"Unexpected result type from OCR chunk {i}: {type(result)}")
+            # Text outside tables, then table rows merged in as whole lines in reading order
+            text_outside_tables = self._combine_text_detections(all_text_detections)
+            all_text_detections.extend(self._table_rows_as_detections(tables))
+            ocr_stats['table_rows'] = sum(len(table.rows) for table in tables)
             
             # Combine all text into a single document
             full_text = self._combine_text_detections(all_text_detections)
@@ -390,18 +464,26 @@ class OCRService:
             processing_time = time.time() - start_time
             logger.info(f"Memory-efficient grayscale OCR completed for page {page_number}: {len(all_text_detections)} text detections, {len(full_text)} characters in {processing_time:.2f} seconds")
             
+            # Detector statistics to measure the effect of line-art suppression
+            ocr_stats['kept_detections'] = len(all_text_detections)
+            ocr_stats['detections_per_second'] = round(ocr_stats['raw_boxes'] / processing_time, 2) if processing_time > 0 else 0.0
+            ocr_stats['line_suppression'] = page_preprocessor.line_suppression_enabled
+            ocr_stats['line_art_removed'] = round(line_art_removed, 4)
+            logger.info(f"OCR detector stats for page {page_number}: {ocr_stats['raw_boxes']} raw boxes, {ocr_stats['junk_boxes']} junk boxes, {ocr_stats['detections_per_second']} detections/sec (line suppression: {ocr_stats['line_suppression']})")
+            
             if full_text:
                 logger.info(f"Sample text from grayscale OCR on page {page_number}: {full_text[:200]}...")
             
             # Clean up large variables to free memory
-            del chunks
-            del chunk_results
             gc.collect()
             
             return {
                 'full_text': full_text,
                 'text_detections': all_text_detections,
-                'processing_time': processing_time
+                'processing_time': processing_time,
+                'ocr_stats': ocr_stats,
+                'tables': tables,
+                'text_outside_tables': text_outside_tables
             }
             
         except Exception as e:
@@ -412,6 +494,96 @@ class OCRService:
                 'processing_time': time.time() - start_time
             }
     
+    async def _extract_tables(
+        self, 
+        image: np.ndarray, 
+        regions: List[RegionOfInterest], 
+        page_number: int
+    ) -> List[ExtractedTable]:
+        """
+        Extract ruled tables from table regions with batched cell recognition.
+        
+        Args:
+            image: Preprocessed grayscale page image
+            regions: Regions of interest from layout analysis
+            page_number: Page number being processed
+            
+        Returns:
+            List of ExtractedTable objects
+        """
+        async with self.semaphore:  # Shares OCR capacity with chunk processing
+            try:
+                return await self.tile_queue.run_blocking(
+                    table_extractor.extract_tables, self.reader, image, regions, page_number
+                )
+            except Exception as e:
+                logger.error(f"Table extraction failed for page {page_number}: {str(e)}")
+                return []
+    
+    def _table_rows_as_detections(self, tables: List[ExtractedTable]) -> List[TextDetection]:
+        """
+        Convert table rows into line-level text detections.
+        
+        Args:
+            tables: Extracted tables
+            
+        Returns:
+            One TextDetection per row, with the row's bounding box
+        """
+        detections = []
+        for table in tables:
+            for row, text in table_extractor.build_row_text(table):
+                x, y, width, height = row.bbox
+                detections.append(TextDetection(
+                    text=text,
+                    bbox=[[x, y], [x + width, y], [x + width, y + height], [x, y + height]],
+                    confidence=1.0,
+                    chunk_position=(table.bbox[0], table.bbox[1])
+                ))
+        return detections
+    
+    async def _extract_text_from_chunks(
+        self, 
+        chunks: Iterable[Tuple[np.ndarray, Tuple[int, int]]], 
+        page_number: int,
+        ocr_stats: Dict[str, int]
+    ) -> List[TextDetection]:
+        """
+        Run OCR over chunks through the shared tile queue.
+        
+        The chunks are queued behind those of other pages in flight and picked
+        up by the OCR worker pool as soon as a worker is free; the call returns
+        when the last chunk has been recognized.
+        
+        Args:
+            chunks: Iterable (usually a generator) of (chunk_image, chunk_position) tuples
+            page_number: Page number being processed
+            ocr_stats: Counters dict updated with chunk, raw and junk box counts
+            
+        Returns:
+            List of TextDetection objects from all chunks
+        """
+        logger.info(f"Queueing OCR tasks for page {page_number} on grayscale chunks ({self.tile_queue.workers} shared workers)")
+        
+        async def recognize_chunk(chunk: Tuple[np.ndarray, Tuple[int, int]]) -> List[TextDetection]:
+            chunk_image, chunk_position = chunk
+            return await self.extract_text_from_chunk(chunk_image, chunk_position, page_number, ocr_stats)
+        
+        chunk_results = await self.tile_queue.run_page(chunks, recognize_chunk)
+        ocr_stats['chunks'] = ocr_stats.get('chunks', 0) + len(chunk_results)
+        
+        # Collect all text detections from all chunks
+        text_detections = []
+        for i, result in enumerate(chunk_results):
+            if isinstance(result, Exception):
+                logger.error(f"Error in OCR chunk {i}: {str(result)}")
+            elif isinstance(result, list):
+                text_detections.extend(result)
+            else:
+                logger.warning(f"Unexpected result type from OCR chunk {i}: {type(result)}")
+        
+        return text_detections
+    
     def _combine_text_detections(self, text_detections: List[TextDetection]) -> str:
         """
         Combine text detections into a coherent document.
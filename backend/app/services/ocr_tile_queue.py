@@ -0,0 +1,184 @@
+"""
+Shared OCR tile queue.
+All pages in flight push their tiles into one bounded queue drained by a
+fixed pool of OCR workers, so recognition capacity stays busy across page
+boundaries instead of draining at the end of every tile group and every page.
+Blocking recognition calls run on a thread pool sized to the worker count, so
+tiles are recognized in parallel while the event loop keeps serving requests.
+Each page gets a future that completes when its last tile returns. Pages
+produce their tiles lazily: a page waits to create more tiles while the
+bounded buffer is full, which replaces the per-group garbage collection barriers.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from ..config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TileJob:
+    """Tiles of one page, with the future resolving to their results once the last one returns."""
+    future: asyncio.Future
+    runner: Callable[[Any], Awaitable[Any]]
+    results: Dict[int, Any] = field(default_factory=dict)  # Tile index -> result or exception
+    remaining: int = 0  # Tiles enqueued and not finished
+    all_enqueued: bool = False  # The page has produced its last tile
+
+    def finish_if_done(self) -> None:
+        """Resolve the page future once every produced tile has returned."""
+        if self.all_enqueued and self.remaining == 0 and not self.future.done():
+            self.future.set_result([self.results[index] for index in range(len(self.results))])
+
+
+class OCRTileQueue:
+    """Bounded tile queue feeding a fixed pool of OCR workers shared by all pages."""
+
+    def __init__(self):
+        """Initialize queue settings; workers start on first use in the running event loop."""
+        self.workers = max(1, settings.ocr_tile_workers or settings.max_concurrent_pages)
+        self.queue_size = max(1, settings.ocr_tile_queue_size)
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="ocr_tile"
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._outstanding = 0  # Tiles submitted and not yet finished
+        self._active_since: Optional[float] = None
+        self.stats = {
+            "pages": 0,
+            "tiles": 0,
+            "failed_tiles": 0,
+            "busy_seconds": 0.0,
+            "active_seconds": 0.0,
+            "max_queue_depth": 0,
+        }
+
+        logger.info(f"OCRTileQueue initialized ({self.workers} workers, buffer of {self.queue_size} tiles)")
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        """Start the worker pool in the running loop (again if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._outstanding = 0
+            self._active_since = None
+            self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        return self._queue
+
+    async def run_blocking(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking recognition call on the OCR thread pool.
+
+        Args:
+            func: Blocking callable (e.g. the EasyOCR reader)
+            *args: Positional arguments
+            **kwargs: Keyword arguments
+
+        Returns:
+            The callable's return value
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def _worker(self) -> None:
+        """Run tiles from the queue until cancelled."""
+        queue = self._queue
+        while True:
+            job, index, tile = await queue.get()
+            start_time = time.perf_counter()
+            try:
+                result = await job.runner(tile)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                result = e
+                self.stats["failed_tiles"] += 1
+            self.stats["busy_seconds"] += time.perf_counter() - start_time
+
+            job.results[index] = result
+            job.remaining -= 1
+            job.finish_if_done()
+            self._tile_finished()
+            queue.task_done()
+
+    def _tile_finished(self) -> None:
+        """Close the active period once no submitted tile is left."""
+        self._outstanding -= 1
+        if self._outstanding == 0 and self._active_since is not None:
+            self.stats["active_seconds"] += time.perf_counter() - self._active_since
+            self._active_since = None
+
+    async def run_page(self, tiles: Iterable[Any], runner: Callable[[Any], Awaitable[Any]]) -> List[Any]:
+        """
+        Queue a page's tiles behind those of other pages and wait for all of them.
+
+        Tiles are pulled from the iterable one at a time, only when the buffer has
+        room, so a generator never materializes more tiles than the queue holds.
+
+        Args:
+            tiles: Tiles of the page (preferably a generator), in the order results should be returned
+            runner: Coroutine function recognizing one tile
+
+        Returns:
+            One entry per tile: the runner's result, or the exception it raised
+        """
+        queue = self._ensure_workers()
+        job = TileJob(future=self._loop.create_future(), runner=runner)
+
+        index = -1
+        for index, tile in enumerate(tiles):
+            await queue.put((job, index, tile))  # Waits while the buffer is full
+            job.remaining += 1
+            if self._outstanding == 0:
+                self._active_since = time.perf_counter()
+            self._outstanding += 1
+            self.stats["tiles"] += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], queue.qsize())
+            del tile  # Do not pin the last tile while waiting for the page
+        if index < 0:
+            return []
+
+        self.stats["pages"] += 1
+        job.all_enqueued = True
+        job.finish_if_done()
+        return await job.future
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue counters since startup.
+
+        Returns:
+            Statistics dictionary; worker_utilization is busy time over worker time while tiles were pending
+        """
+        active_seconds = self.stats["active_seconds"]
+        if self._active_since is not None:
+            active_seconds += time.perf_counter() - self._active_since
+        worker_seconds = self.workers * active_seconds
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "tiles_in_flight": self._outstanding,
+            **self.stats,
+            "busy_seconds": round(self.stats["busy_seconds"], 3),
+            "active_seconds": round(active_seconds, 3),
+            "worker_utilization": round(self.stats["busy_seconds"] / worker_seconds, 4) if worker_seconds > 0 else 0.0,
+        }
+
+
+# Global OCR tile queue instance
+ocr_tile_queue = OCRTileQueue()
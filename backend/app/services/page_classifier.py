@@ -0,0 +1,311 @@
+"""
+Fast page classification service.
+Labels every page of a plan set (cover, sheet index, drawing, schedule, photo,
+blank) from PDF metadata and a thumbnail raster before OCR, and assigns a
+processing profile per class so cheap pages do not pay full-resolution OCR
+and LLM costs.
+"""
+
+import io
+import logging
+import asyncio
+import time
+import concurrent.futures
+from typing import Dict, Optional
+from dataclasses import dataclass, field, asdict
+import PyPDF2
+from pdf2image import convert_from_bytes
+import cv2
+import numpy as np
+
+from ..config import settings
+from .image_preprocessing import page_preprocessor
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProcessingProfile:
+    """Processing parameters applied to a page class."""
+    name: str
+    dpi: int  # Render resolution for OCR
+    chunk_size: int  # OCR tile side in pixels
+    chunk_overlap: int  # OCR tile overlap in pixels
+    ocr_profile: str  # "full", "balanced" or "fast"
+    run_ocr: bool
+    run_llm: bool  # False = OCR text is matched against the gazetteer only
+
+
+@dataclass
+class PageClassification:
+    """Classification result for a single page."""
+    page_number: int
+    page_class: str
+    profile: ProcessingProfile
+    features: Dict[str, float] = field(default_factory=dict)
+
+
+# Keywords found in the PDF text layer that identify special sheets
+SHEET_INDEX_KEYWORDS = ("indice de planos", "índice de planos", "lista de planos", "sheet index", "drawing index", "index of drawings")
+SCHEDULE_KEYWORDS = ("cuadro de", "tabla de", "schedule", "especificaciones", "lista de equipos", "equipment list")
+COVER_KEYWORDS = ("portada", "cover sheet", "caratula", "carátula")
+
+
+class PageClassifier:
+    """Cheap page classifier using PDF metadata and thumbnail rasters."""
+
+    def __init__(self):
+        """Initialize classifier and per-class processing profiles."""
+        self.enabled = settings.page_classification_enabled
+        self.thumbnail_dpi = settings.page_classifier_thumbnail_dpi
+        self.thumbnail_batch_size = 10  # Thumbnails rendered per pdf2image call
+        self.blank_check_dpi = max(self.thumbnail_dpi, settings.page_classifier_blank_check_dpi)
+        self.blank_ink_threshold = 235  # Light grey anti-aliased hairlines still count as ink
+        self.blank_max_ink_ratio = 0.0002
+
+        full_dpi = settings.pdf_dpi
+        light_dpi = min(settings.page_profile_light_dpi, full_dpi)
+        self.profiles = {
+            "blank": ProcessingProfile("skip", 0, 1024, 200, "full", run_ocr=False, run_llm=False),
+            "sheet_index": ProcessingProfile("light", light_dpi, 1024, 200, "full", run_ocr=True, run_llm=True),
+            "cover": ProcessingProfile("light", light_dpi, 1024, 200, "full", run_ocr=True, run_llm=True),
+            # Site photos: OCR for labels of known brands, but noisy text is not worth an LLM call
+            "photo": ProcessingProfile("ocr_only", light_dpi, 1024, 200, "full", run_ocr=True, run_llm=False),
+            "schedule": ProcessingProfile("schedule", full_dpi, 1024, 200, "balanced", run_ocr=True, run_llm=True),
+            "drawing": ProcessingProfile("drawing", full_dpi, 1024, 200, settings.ocr_profile, run_ocr=True, run_llm=True),
+        }
+        self.default_profile = ProcessingProfile("default", full_dpi, 1024, 200, settings.ocr_profile, run_ocr=True, run_llm=True)
+
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="page_classifier"
+        )
+        logger.info(f"PageClassifier initialized (enabled: {self.enabled}, thumbnail DPI: {self.thumbnail_dpi})")
+
+    async def classify_document(self, file_content: bytes) -> Dict[int, PageClassification]:
+        """
+        Classify all pages of a PDF.
+
+        Args:
+            file_content: PDF file content
+
+        Returns:
+            Dictionary mapping page number to PageClassification (empty if disabled or failed)
+        """
+        if not self.enabled:
+            return {}
+
+        try:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self.executor, self._classify_document_sync, file_content)
+        except Exception as e:
+            logger.error(f"Page classification failed, processing all pages with the default profile: {str(e)}")
+            return {}
+
+    def _classify_document_sync(self, file_content: bytes) -> Dict[int, PageClassification]:
+        """Synchronous classification for thread pool execution."""
+        start_time = time.time()
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        total_pages = len(pdf_reader.pages)
+
+        classifications = {}
+        for batch_start in range(1, total_pages + 1, self.thumbnail_batch_size):
+            batch_end = min(batch_start + self.thumbnail_batch_size - 1, total_pages)
+            thumbnails = convert_from_bytes(
+                file_content,
+                dpi=self.thumbnail_dpi,
+                first_page=batch_start,
+                last_page=batch_end,
+                grayscale=True
+            )
+
+            for offset, thumbnail in enumerate(thumbnails):
+                page_number = batch_start + offset
+                features = self._extract_metadata_features(pdf_reader.pages[page_number - 1])
+                raster = np.asarray(thumbnail.convert('L'))
+                features.update(self._extract_raster_features(raster))
+                text_layer = features.pop("_text_layer", "")
+
+                page_class = self._classify_features(page_number, features, text_layer)
+                if page_class == "blank" and not self._confirm_blank(file_content, page_number):
+                    page_class = "drawing"
+                classifications[page_number] = PageClassification(
+                    page_number=page_number,
+                    page_class=page_class,
+                    profile=self.get_profile(page_class),
+                    features=features
+                )
+            del thumbnails
+
+        counts = {}
+        for classification in classifications.values():
+            counts[classification.page_class] = counts.get(classification.page_class, 0) + 1
+        logger.info(f"Classified {total_pages} pages in {time.time() - start_time:.2f} seconds: {counts}")
+        return classifications
+
+    def _confirm_blank(self, file_content: bytes, page_number: int) -> bool:
+        """
+        Confirm a blank candidate on a higher-resolution render.
+
+        Thin CAD lines and outlined text anti-alias to light grey in the
+        thumbnail, so any pixel noticeably darker than paper counts as ink here.
+
+        Args:
+            file_content: PDF file content
+            page_number: Page number of the blank candidate
+
+        Returns:
+            True only if the render shows no ink (False if it cannot be rendered)
+        """
+        try:
+            images = convert_from_bytes(
+                file_content,
+                dpi=self.blank_check_dpi,
+                first_page=page_number,
+                last_page=page_number,
+                grayscale=True
+            )
+            if not images:
+                return False
+            raster = np.asarray(images[0].convert('L'))
+            ink_ratio = float(np.count_nonzero(raster < self.blank_ink_threshold)) / float(raster.size)
+            return ink_ratio < self.blank_max_ink_ratio
+        except Exception as e:
+            logger.warning(f"Blank check failed for page {page_number}, processing it as a drawing: {str(e)}")
+            return False
+
+    def _extract_metadata_features(self, page) -> Dict[str, float]:
+        """
+        Extract cheap features from the PDF page object.
+
+        Args:
+            page: PyPDF2 page object
+
+        Returns:
+            Feature dictionary (the raw text layer is returned under '_text_layer')
+        """
+        features = {}
+        try:
+            width_in = float(page.mediabox.width) / 72.0
+            height_in = float(page.mediabox.height) / 72.0
+            features["page_area_sq_in"] = round(width_in * height_in, 1)
+        except Exception:
+            features["page_area_sq_in"] = 0.0
+
+        image_count = 0
+        try:
+            resources = page.get("/Resources")
+            resources = resources.get_object() if resources is not None else {}
+            xobjects = resources.get("/XObject")
+            if xobjects is not None:
+                xobjects = xobjects.get_object()
+                image_count = sum(1 for name in xobjects if xobjects[name].get_object().get("/Subtype") == "/Image")
+        except Exception:
+            pass
+        features["embedded_images"] = float(image_count)
+
+        try:
+            text_layer = page.extract_text() or ""
+        except Exception:
+            text_layer = ""
+        features["text_layer_chars"] = float(len(text_layer.strip()))
+        features["_text_layer"] = text_layer.lower()
+        return features
+
+    def _extract_raster_features(self, raster: np.ndarray) -> Dict[str, float]:
+        """
+        Extract ink, tone and ruling features from a thumbnail raster.
+
+        Args:
+            raster: Grayscale thumbnail
+
+        Returns:
+            Feature dictionary
+        """
+        pixel_count = float(raster.size)
+        ink_ratio = float(np.count_nonzero(raster < 128)) / pixel_count
+        midtone_ratio = float(np.count_nonzero((raster > 60) & (raster < 200))) / pixel_count
+
+        ink_mask = page_preprocessor.compute_ink_mask(raster)
+        ink_pixels = max(1, cv2.countNonZero(ink_mask))
+        min_line = max(10, int(min(raster.shape) * 0.1))
+        horizontal_mask, vertical_mask = page_preprocessor.detect_grid_masks(ink_mask, min_line)
+        ruling_ratio = (cv2.countNonZero(horizontal_mask) + cv2.countNonZero(vertical_mask)) / float(ink_pixels)
+
+        return {
+            "ink_ratio": round(ink_ratio, 4),
+            "midtone_ratio": round(midtone_ratio, 4),
+            "ruling_ratio": round(ruling_ratio, 4),
+            "horizontal_rules": float(cv2.connectedComponents(horizontal_mask)[0] - 1),
+        }
+
+    def _classify_features(self, page_number: int, features: Dict[str, float], text_layer: str) -> str:
+        """
+        Rule-based classification over extracted features.
+
+        Args:
+            page_number: Page number
+            features: Metadata and raster features
+            text_layer: Lower-cased PDF text layer (may be empty for scans)
+
+        Returns:
+            Page class name
+        """
+        # Blank candidates still need an empty text layer and a higher-resolution check (_confirm_blank)
+        if features["ink_ratio"] < 0.002 and features["text_layer_chars"] == 0:
+            return "blank"
+
+        # Photos are tone-heavy; scanned sheets are also embedded images but mostly white paper
+        is_tonal = features["midtone_ratio"] > 0.35 or (
+            features["embedded_images"] > 0 and features["text_layer_chars"] < 50 and features["midtone_ratio"] > 0.2
+        )
+        if is_tonal and features["ruling_ratio"] < 0.1:
+            return "photo"
+
+        if any(keyword in text_layer for keyword in SHEET_INDEX_KEYWORDS):
+            return "sheet_index"
+
+        if page_number == 1 and (features["ink_ratio"] < 0.04 or any(keyword in text_layer for keyword in COVER_KEYWORDS)):
+            return "cover"
+
+        if features["ruling_ratio"] > 0.3 and features["horizontal_rules"] >= 8:
+            return "schedule"
+        if any(keyword in text_layer for keyword in SCHEDULE_KEYWORDS) and features["horizontal_rules"] >= 4:
+            return "schedule"
+
+        return "drawing"
+
+    def get_profile(self, page_class: Optional[str]) -> ProcessingProfile:
+        """
+        Get the processing profile for a page class.
+
+        Args:
+            page_class: Page class name (None for unclassified pages)
+
+        Returns:
+            ProcessingProfile for the class, or the default profile
+        """
+        return self.profiles.get(page_class, self.default_profile)
+
+    def summarize(self, classifications: Dict[int, PageClassification]) -> Dict[str, dict]:
+        """
+        Build a serializable audit record of page labels and profiles.
+
+        Args:
+            classifications: Page classifications for a document
+
+        Returns:
+            Dictionary with per-class page counts and the profiles used
+        """
+        page_classes = {}
+        profiles_used = {}
+        for classification in classifications.values():
+            page_classes[classification.page_class] = page_classes.get(classification.page_class, 0) + 1
+            profiles_used[classification.profile.name] = asdict(classification.profile)
+        return {"page_classes": page_classes, "profiles": profiles_used}
+
+
+# Global page classifier instance
+page_classifier = PageClassifier()
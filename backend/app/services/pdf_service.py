@@ -326,8 +326,9 @@ class PDFService:
         document_id: str,
         filename: str,
         dpi: int = None,
-        batch_size: int = 3
-    ) -> Tuple[List[str], int, str]:
+        batch_size: int = 3,
+        page_dpis: Optional[Dict[int, int]] = None
+    ) -> Tuple[List[Optional[str]], int, str]:
         """
         Process PDF file using temporary files for memory efficiency.
         
@@ -337,9 +338,11 @@ class PDFService:
             filename: Original filename (for logging purposes)
             dpi: Resolution for image conversion (defaults to settings.pdf_dpi)
             batch_size: Number of pages to process in parallel batches
+            page_dpis: Optional per-page render DPI; pages with DPI 0 are not rendered
             
         Returns:
-            Tuple of (image_file_paths, total_pages, temp_directory)
+            Tuple of (image_file_paths, total_pages, temp_directory).
+            With page_dpis, the list has one entry per page and None for pages not rendered.
         """
         try:
             logger.info(f"Starting memory-efficient PDF processing: {filename}")
@@ -365,14 +368,19 @@ class PDFService:
                 logger.info(f"Processing batch: pages {batch_start} to {batch_end}")
                 
                 # Extract batch of pages and convert to grayscale files immediately
-                batch_image_files = await self.extract_pages_as_grayscale_files(
-                    file_content, temp_dir, dpi, batch_start, batch_end
-                )
+                if page_dpis is None:
+                    batch_image_files = await self.extract_pages_as_grayscale_files(
+                        file_content, temp_dir, dpi, batch_start, batch_end
+                    )
+                else:
+                    batch_image_files = await self._extract_pages_with_page_dpis(
+                        file_content, temp_dir, page_dpis, batch_start, batch_end, dpi
+                    )
                 
                 all_image_files.extend(batch_image_files)
                 logger.info(f"Batch {batch_start}-{batch_end} completed: {len(batch_image_files)} grayscale files created")
             
-            logger.info(f"Memory-efficient PDF processing completed: {len(all_image_files)} grayscale files in {temp_dir}")
+            logger.info(f"Memory-efficient PDF processing completed: {len([f for f in all_image_files if f])} grayscale files in {temp_dir}")
             return all_image_files, total_pages, temp_dir
             
         except Exception as e:
@@ -382,13 +390,66 @@ class PDFService:
                 self.cleanup_temp_directory(document_id)
             raise e
     
+    async def _extract_pages_with_page_dpis(
+        self, 
+        file_content: bytes, 
+        temp_dir: str,
+        page_dpis: Dict[int, int],
+        start_page: int,
+        end_page: int,
+        default_dpi: Optional[int] = None
+    ) -> List[Optional[str]]:
+        """
+        Extract a page range where each page may use its own render DPI.
+        
+        Consecutive pages sharing a DPI are rendered in one call; pages with DPI 0 are skipped.
+        
+        Args:
+            file_content: PDF file content as bytes
+            temp_dir: Temporary directory to save images
+            page_dpis: Per-page render DPI (missing pages use default_dpi)
+            start_page: First page to extract (1-based)
+            end_page: Last page to extract (inclusive)
+            default_dpi: DPI for pages missing from page_dpis (defaults to settings.pdf_dpi)
+            
+        Returns:
+            One entry per page in the range: the image path, or None if the page was not rendered
+        """
+        default_dpi = default_dpi or settings.pdf_dpi
+        image_files = []
+        
+        run_start = start_page
+        while run_start <= end_page:
+            run_dpi = page_dpis.get(run_start, default_dpi)
+            run_end = run_start
+            while run_end + 1 <= end_page and page_dpis.get(run_end + 1, default_dpi) == run_dpi:
+                run_end += 1
+            
+            run_length = run_end - run_start + 1
+            if run_dpi <= 0:
+                logger.info(f"Skipping render for pages {run_start} to {run_end} (not needed by their processing profile)")
+                image_files.extend([None] * run_length)
+            else:
+                run_files = await self.extract_pages_as_grayscale_files(
+                    file_content, temp_dir, run_dpi, run_start, run_end
+                )
+                # Keep positions aligned with page numbers even if a page failed to convert
+                files_by_name = {os.path.basename(path): path for path in run_files}
+                for page_number in range(run_start, run_end + 1):
+                    image_files.append(files_by_name.get(f"page_{page_number:04d}.png"))
+            
+            run_start = run_end + 1
+        
+        return image_files
+    
     async def process_pdf(
         self, 
         file_content: bytes, 
         document_id: str,
         filename: str,
-        dpi: int = None
-    ) -> Tuple[List[str], int, str]:
+        dpi: int = None,
+        page_dpis: Optional[Dict[int, int]] = None
+    ) -> Tuple[List[Optional[str]], int, str]:
         """
         Process PDF file with memory-efficient temporary files.
         
@@ -397,12 +458,15 @@ class PDFService:
             document_id: Document identifier
             filename: Original filename (for logging purposes)
             dpi: Resolution for image conversion (defaults to settings.pdf_dpi)
+            page_dpis: Optional per-page render DPI from page classification (0 = do not render)
             
         Returns:
             Tuple of (image_file_paths, total_pages, temp_directory)
         """
         # Use memory-efficient processing with temporary files
-        return await self.process_pdf_with_temp_files(file_content, document_id, filename, dpi)
+        return await self.process_pdf_with_temp_files(
+            file_content, document_id, filename, dpi, page_dpis=page_dpis
+        )
     
     def __del__(self):
         """Cleanup thread pool and temporary directories on deletion."""
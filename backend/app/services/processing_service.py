@@ -6,13 +6,21 @@ Optimized for performance with batch processing and parallel execution.
 import asyncio
 import logging
 import time
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 from ..models.document import Document, DocumentCreate, DocumentUpdate
 from ..models.processing_status import ProcessingStatus
+from ..models.brand_detection import BrandDetectionCreate
 from .firebase_service import firebase_service
 from .pdf_service import pdf_service
 from .brand_detection_service import brand_detection_service
+from .page_classifier import page_classifier
+from .line_dedup_service import document_line_deduplicator
+from .batch_inference_service import batch_inference_service
+from .llm_cache import llm_response_cache
+from .brand_canonicalizer import brand_canonicalizer
+from .page_scheduler import estimate_page_cost, page_scheduler
+from ..config import settings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -26,10 +34,17 @@ class ProcessingService:
         """Initialize processing service with performance optimizations."""
         logger.info("ProcessingService initialized with performance optimizations")
         self.active_processes = {}  # Track active processing tasks
+        self.page_classifications = {}  # Page labels and profiles per document
+        self.line_dedup_stats = {}  # Document-level line deduplication statistics
+        self.scheduling_stats = {}  # Page scheduler runs per document
         
         # Performance settings
         self.batch_size = 5  # Process pages in batches
         self.max_concurrent_batches = 3  # Maximum concurrent batches
+        self.page_slots = settings.page_scheduler_slots or self.batch_size  # Pages in flight per document
+        
+        # Batch processing class: job results come back through this handler
+        batch_inference_service.result_handler = self._ingest_batch_results
     
     async def process_document(
         self, 
@@ -60,10 +75,11 @@ class ProcessingService:
             document = await firebase_service.create_document(document_data)
             logger.info(f"Document created in Firebase: {document.id}")
             
-            # Step 2: Process PDF and extract images as grayscale files for memory efficiency
+            # Step 2: Classify pages, then render them as grayscale files at their profile's DPI
+            page_dpis = await self._classify_pages(document.id, file_content)
             logger.info(f"Processing PDF with memory-efficient optimization: {filename}")
             image_files, total_pages, temp_dir = await pdf_service.process_pdf(
-                file_content, document.id, filename
+                file_content, document.id, filename, page_dpis=page_dpis
             )
             
             logger.info(f"PDF processing completed: {total_pages} pages, {len(image_files)} grayscale image files created in {temp_dir}")
@@ -92,7 +108,8 @@ class ProcessingService:
         self, 
         document_id: str,
         file_content: bytes, 
-        filename: str
+        filename: str,
+        processing_class: str = "interactive"
     ) -> None:
         """
         Process a document asynchronously without waiting for completion.
@@ -102,15 +119,17 @@ class ProcessingService:
             document_id: Document ID
             file_content: PDF file content
             filename: Original filename
+            processing_class: "interactive" (online LLM calls) or "batch" (offline batch jobs, results within hours)
         """
         try:
             logger.info(f"Starting async document processing: {filename}")
             logger.info(f"File size: {len(file_content)} bytes")
             
-            # Step 1: Process PDF and extract images as grayscale files for memory efficiency
+            # Step 1: Classify pages, then render them as grayscale files at their profile's DPI
+            page_dpis = await self._classify_pages(document_id, file_content)
             logger.info(f"Processing PDF with memory-efficient optimization: {filename}")
             image_files, total_pages, temp_dir = await pdf_service.process_pdf(
-                file_content, document_id, filename
+                file_content, document_id, filename, page_dpis=page_dpis
             )
             
             logger.info(f"PDF processing completed: {total_pages} pages, {len(image_files)} grayscale image files created in {temp_dir}")
@@ -123,12 +142,16 @@ class ProcessingService:
             
             # Step 2: Start async processing with memory-efficient batch optimization
             logger.info("Starting async brand detection processing with memory-efficient batch optimization")
-            await self._process_document_async_optimized(document_id, image_files, temp_dir, total_pages)
+            await self._process_document_async_optimized(document_id, image_files, temp_dir, total_pages, processing_class)
             
             logger.info(f"Document processing completed successfully: {document_id}")
             
         except Exception as e:
             logger.error(f"Async document processing failed: {str(e)}")
+            self.page_classifications.pop(document_id, None)
+            brand_detection_service.pop_document_stats(document_id)
+            self.line_dedup_stats.pop(document_id, None)
+            self.scheduling_stats.pop(document_id, None)
             # Update document status to failed
             try:
                 await firebase_service.update_document(
@@ -140,12 +163,34 @@ class ProcessingService:
                 logger.error(f"Failed to update document {document_id} status: {str(update_error)}")
             raise e
     
+    async def _classify_pages(self, document_id: str, file_content: bytes) -> Optional[Dict[int, int]]:
+        """
+        Classify document pages and remember their processing profiles.
+        
+        Args:
+            document_id: Document ID
+            file_content: PDF file content
+            
+        Returns:
+            Per-page render DPI (0 = page is not rendered), or None if classification is unavailable
+        """
+        classifications = await page_classifier.classify_document(file_content)
+        if not classifications:
+            return None
+        
+        self.page_classifications[document_id] = classifications
+        return {
+            page_number: classification.profile.dpi if classification.profile.run_ocr else 0
+            for page_number, classification in classifications.items()
+        }
+    
     async def _process_document_async_optimized(
         self, 
         document_id: str, 
         image_files: List[str], 
         temp_dir: str,
-        total_pages: int
+        total_pages: int,
+        processing_class: str = "interactive"
     ):
         """
         Process document asynchronously with memory-efficient batch processing.
@@ -155,11 +200,12 @@ class ProcessingService:
             image_files: List of paths to grayscale image files
             temp_dir: Temporary directory containing the images
             total_pages: Total number of pages
+            processing_class: "interactive" or "batch"
         """
         try:
             logger.info(f"Starting optimized async processing for document: {document_id}")
             logger.info(f"Total pages to process: {total_pages}")
-            logger.info(f"Batch size: {self.batch_size}")
+            logger.info(f"Page slots: {self.page_slots}")
             
             # Track processing start
             self.active_processes[document_id] = {
@@ -167,30 +213,32 @@ class ProcessingService:
                 "total_pages": total_pages,
                 "processed_pages": 0,
                 "failed_pages": 0,
-                "current_batch": 0
+                "llm_failed_pages": 0,  # Saved with gazetteer brands only
+                "pages_in_flight": 0
             }
             
             logger.info(f"Processing tracking initialized for document: {document_id}")
             
-            # Process pages in batches for memory efficiency
-            for batch_start in range(0, len(image_files), self.batch_size):
-                batch_end = min(batch_start + self.batch_size, len(image_files))
-                batch_image_files = image_files[batch_start:batch_end]
-                batch_page_numbers = list(range(batch_start + 1, batch_end + 1))
-                
-                logger.info(f"Processing memory-efficient batch {batch_start // self.batch_size + 1}: pages {batch_start + 1} to {batch_end}")
-                
-                # Update batch tracking
-                self.active_processes[document_id]["current_batch"] = batch_start // self.batch_size + 1
-                
-                # Process batch in parallel with memory efficiency
-                await self._process_batch_parallel_files(
-                    document_id, 
-                    batch_image_files, 
-                    batch_page_numbers
-                )
-                
-                logger.info(f"Memory-efficient batch {batch_start // self.batch_size + 1} completed")
+            if processing_class == "batch":
+                # OCR now; pages the local stages cannot resolve go to an offline batch job
+                if await self._queue_document_for_batch(document_id, image_files, total_pages):
+                    logger.info(f"Document {document_id} queued for batch inference")
+                    await firebase_service.update_document(
+                        document_id, 
+                        DocumentUpdate(status="batch_pending")
+                    )
+                    pdf_service.cleanup_temp_directory(document_id)
+                    self.page_classifications.pop(document_id, None)
+                    self.line_dedup_stats.pop(document_id, None)
+                    self.scheduling_stats.pop(document_id, None)
+                    self.active_processes.pop(document_id, None)
+                    return
+            elif settings.llm_analysis_scope == "document":
+                # OCR every page first, then analyze the document's unique lines once
+                await self._process_document_by_lines(document_id, image_files)
+            else:
+                # Pages run continuously in a bounded number of slots (memory stays bounded), heaviest first
+                await self._schedule_pages(document_id, image_files, self._process_scheduled_page)
             
             # Generate final document summary
             logger.info(f"Generating final document summary for document {document_id}")
@@ -205,6 +253,9 @@ class ProcessingService:
                 else:
                     final_status = "completed_with_errors"
                     logger.warning(f"Document {document_id} completed with {self.active_processes[document_id]['failed_pages']} failed pages")
+            elif self.active_processes[document_id]["llm_failed_pages"] > 0:
+                final_status = "completed_with_errors"
+                logger.warning(f"Document {document_id} completed with {self.active_processes[document_id]['llm_failed_pages']} pages whose LLM analysis failed")
             
             logger.info(f"Updating document {document_id} status to: {final_status}")
             await firebase_service.update_document(
@@ -217,6 +268,10 @@ class ProcessingService:
             pdf_service.cleanup_temp_directory(document_id)
             
             # Cleanup tracking
+            self.page_classifications.pop(document_id, None)
+            brand_detection_service.pop_document_stats(document_id)
+            self.line_dedup_stats.pop(document_id, None)
+            self.scheduling_stats.pop(document_id, None)
             if document_id in self.active_processes:
                 total_processing_time = time.time() - self.active_processes[document_id]["start_time"]
                 del self.active_processes[document_id]
@@ -238,62 +293,355 @@ class ProcessingService:
             pdf_service.cleanup_temp_directory(document_id)
             
             # Cleanup tracking
+            self.page_classifications.pop(document_id, None)
+            brand_detection_service.pop_document_stats(document_id)
+            self.line_dedup_stats.pop(document_id, None)
+            self.scheduling_stats.pop(document_id, None)
             if document_id in self.active_processes:
                 del self.active_processes[document_id]
                 logger.info(f"Processing tracking cleaned up for failed document {document_id}")
     
-    async def _process_batch_parallel_files(
+    async def _schedule_pages(
         self, 
         document_id: str, 
-        batch_image_files: List[str], 
-        batch_page_numbers: List[int]
+        image_files: List[Optional[str]], 
+        worker: Callable[[str, Optional[str], int], Awaitable[Any]]
+    ) -> Dict[int, Any]:
+        """
+        Run a worker over every page through the page scheduler.
+        
+        Args:
+            document_id: Document ID
+            image_files: Paths to grayscale image files (None for pages that skip OCR)
+            worker: Coroutine function (document_id, image_file, page_number)
+            
+        Returns:
+            Page number -> worker result or exception
+        """
+        tracking = self.active_processes[document_id]
+        page_costs = {
+            page_number: estimate_page_cost(image_file)
+            for page_number, image_file in enumerate(image_files, start=1)
+        }
+        
+        async def run_page(page_number: int) -> Any:
+            tracking["pages_in_flight"] += 1
+            try:
+                return await worker(document_id, image_files[page_number - 1], page_number)
+            finally:
+                tracking["pages_in_flight"] -= 1
+        
+        run = await page_scheduler.run(page_costs, run_page, self.page_slots)
+        self.scheduling_stats.setdefault(document_id, []).append(run.stats)
+        logger.info(f"Scheduled {run.stats['pages']} pages for document {document_id} in {run.stats['makespan_seconds']}s with {run.stats['slots']} slots (utilization: {run.stats['slot_utilization']:.1%})")
+        return run.results
+    
+    async def _process_scheduled_page(
+        self, 
+        document_id: str, 
+        image_file: Optional[str], 
+        page_number: int
     ):
         """
-        Process a batch of image files in parallel for memory efficiency.
+        Process one page for the scheduler and update progress tracking.
         
         Args:
             document_id: Document ID
-            batch_image_files: List of paths to grayscale image files in the batch
-            batch_page_numbers: List of page numbers in the batch
+            image_file: Path to the grayscale image file (None if the page profile skips OCR)
+            page_number: Page number
         """
         try:
-            logger.info(f"Processing batch with {len(batch_image_files)} grayscale image files in parallel")
-            
-            # Create tasks for parallel processing
-            tasks = []
-            for image_file, page_number in zip(batch_image_files, batch_page_numbers):
-                task = self._process_single_page_file(document_id, image_file, page_number)
-                tasks.append(task)
-            
-            # Execute batch tasks in parallel
-            logger.info(f"Executing {len(tasks)} memory-efficient batch tasks in parallel")
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            result = await self._process_single_page_file(document_id, image_file, page_number)
+            self.active_processes[document_id]["processed_pages"] += 1
+            if result.llm_failed:
+                self.active_processes[document_id]["llm_failed_pages"] += 1
+            return result
+        except Exception as e:
+            logger.error(f"Error processing page {page_number}: {str(e)}")
+            # Update page status to failed
+            try:
+                await firebase_service.update_page_status(
+                    document_id, page_number, "failed", str(e)
+                )
+            except Exception as update_error:
+                logger.error(f"Failed to update page {page_number} status: {str(update_error)}")
+            self.active_processes[document_id]["failed_pages"] += 1
+            return e
+    
+    async def _process_document_by_lines(
+        self, 
+        document_id: str, 
+        image_files: List[Optional[str]]
+    ):
+        """
+        Document-level analysis: OCR all pages, send only unique lines to the LLM,
+        then save per-page results with the brands mapped back to their pages.
+        
+        Args:
+            document_id: Document ID
+            image_files: Paths to grayscale image files (None for pages that skip OCR)
+        """
+        # Phase 1: OCR in batches, no LLM calls
+        page_texts, ocr_times = await self._extract_document_texts(document_id, image_files)
+        classifications = self.page_classifications.get(document_id, {})
+        
+        # Phase 2: one analysis over the document's unique lines; OCR-only pages use the gazetteer alone
+        llm_start = time.time()
+        llm_page_texts = {}
+        ocr_only_brands = {}
+        for page_number, text in page_texts.items():
+            if not text:
+                continue
+            classification = classifications.get(page_number)
+            if classification and not classification.profile.run_llm:
+                ocr_only_brands[page_number], _ = brand_detection_service.prepare_llm_text(
+                    text, page_number, document_id, run_llm=False
+                )
+            else:
+                llm_page_texts[page_number] = text
+        page_brands, stats = await document_line_deduplicator.analyze_document(
+            llm_page_texts,
+            lambda text, chunk_number: brand_detection_service.detect_brands_from_text(text, chunk_number, document_id)
+        )
+        page_brands.update(ocr_only_brands)
+        self.line_dedup_stats[document_id] = stats
+        llm_time_per_page = (time.time() - llm_start) / max(1, len(page_texts))
+        
+        # Phase 3: per-page results, same shape as page-level analysis
+        for page_number in page_texts:
+            classification = classifications.get(page_number)
+            result = BrandDetectionCreate(page_number=page_number, brands_detected=page_brands.get(page_number, []))
+            try:
+                await firebase_service.save_brand_detection_result(
+                    document_id,
+                    page_number,
+                    result,
+                    ocr_times[page_number] + llm_time_per_page,
+                    page_class=classification.page_class if classification else None,
+                    processing_profile=classification.profile.name if classification else None
+                )
+                self.active_processes[document_id]["processed_pages"] += 1
+            except Exception as save_error:
+                logger.error(f"Failed to save brand detection result for page {page_number}: {str(save_error)}")
+                self.active_processes[document_id]["failed_pages"] += 1
+    
+    async def _extract_document_texts(
+        self, 
+        document_id: str, 
+        image_files: List[Optional[str]]
+    ) -> Tuple[Dict[int, str], Dict[int, float]]:
+        """
+        OCR all pages of a document through the page scheduler without LLM analysis.
+        
+        Args:
+            document_id: Document ID
+            image_files: Paths to grayscale image files (None for pages that skip OCR)
             
-            # Process results
-            for i, result in enumerate(results):
-                page_number = batch_page_numbers[i]
-                if isinstance(result, Exception):
-                    logger.error(f"Error processing page {page_number} in batch: {str(result)}")
-                    # Update page status to failed
-                    try:
-                        await firebase_service.update_page_status(
-                            document_id, page_number, "failed", str(result)
-                        )
-                    except Exception as update_error:
-                        logger.error(f"Failed to update page {page_number} status: {str(update_error)}")
-                    # Update tracking
-                    self.active_processes[document_id]["failed_pages"] += 1
-                else:
-                    logger.info(f"Page {page_number} in batch completed successfully")
-                    # Update tracking
-                    self.active_processes[document_id]["processed_pages"] += 1
+        Returns:
+            Tuple of (page number -> text, page number -> OCR time) for the pages that succeeded
+        """
+        page_texts: Dict[int, str] = {}
+        ocr_times: Dict[int, float] = {}
+        
+        logger.info(f"Extracting text for {len(image_files)} pages")
+        results = await self._schedule_pages(document_id, image_files, self._extract_single_page_text)
+        for page_number, result in sorted(results.items()):
+            if isinstance(result, Exception):
+                logger.error(f"Error extracting text for page {page_number}: {str(result)}")
+                try:
+                    await firebase_service.update_page_status(
+                        document_id, page_number, "failed", str(result)
+                    )
+                except Exception as update_error:
+                    logger.error(f"Failed to update page {page_number} status: {str(update_error)}")
+                self.active_processes[document_id]["failed_pages"] += 1
+            else:
+                page_texts[page_number], ocr_times[page_number] = result
+        
+        return page_texts, ocr_times
+    
+    async def _queue_document_for_batch(
+        self, 
+        document_id: str, 
+        image_files: List[Optional[str]],
+        total_pages: int
+    ) -> bool:
+        """
+        Batch processing class: OCR every page, save the pages the local stages
+        or the response cache resolve, and queue the rest for an offline batch job.
+        
+        Args:
+            document_id: Document ID
+            image_files: Paths to grayscale image files (None for pages that skip OCR)
+            total_pages: Total number of pages
             
-            logger.info(f"Memory-efficient batch processing completed: {len([r for r in results if not isinstance(r, Exception)])} successful, {len([r for r in results if isinstance(r, Exception)])} failed")
+        Returns:
+            True if pages were queued (results are ingested later), False if the document is already complete
+        """
+        page_texts, ocr_times = await self._extract_document_texts(document_id, image_files)
+        classifications = self.page_classifications.get(document_id, {})
+        queued_texts: Dict[int, str] = {}
+        queued_pages: Dict[str, Dict[str, Any]] = {}
+        
+        for page_number, text in sorted(page_texts.items()):
+            classification = classifications.get(page_number)
+            page_info = {
+                "ocr_time": ocr_times[page_number],
+                "page_class": classification.page_class if classification else None,
+                "processing_profile": classification.profile.name if classification else None,
+            }
+            gazetteer_brands, llm_text = brand_detection_service.prepare_llm_text(
+                text, page_number, document_id, run_llm=classification.profile.run_llm if classification else True
+            )
+            brands: Optional[List[str]] = gazetteer_brands
+            if llm_text is not None:
+                cached = await llm_response_cache.get(brand_detection_service.make_cache_key(llm_text))
+                if cached is None:
+                    queued_texts[page_number] = llm_text
+                    queued_pages[str(page_number)] = dict(page_info, gazetteer_brands=gazetteer_brands)
+                    continue
+                brand_detection_service.record_document_stat(document_id, "llm_cache_hits")
+                brands = brand_detection_service.finalize_brands(cached, gazetteer_brands, document_id)
+            
+            await self._save_page_result(document_id, page_number, brands, page_info)
+        
+        if not queued_texts:
+            return False
+        
+        for page_number in queued_texts:
+            try:
+                await firebase_service.update_page_status(document_id, page_number, "batch_pending")
+            except Exception as update_error:
+                logger.error(f"Failed to update page {page_number} status to 'batch_pending': {str(update_error)}")
+        
+        manifest = {
+            "total_pages": total_pages,
+            "pages": queued_pages,
+            # Pages that failed OCR or whose local result could not be saved
+            "failed_pages": self.active_processes.get(document_id, {}).get("failed_pages", 0),
+            "llm_usage": brand_detection_service.pop_document_stats(document_id),
+        }
+        if classifications:
+            manifest["page_classification"] = page_classifier.summarize(classifications)
+        await batch_inference_service.enqueue(document_id, queued_texts, manifest)
+        logger.info(f"Queued {len(queued_texts)} of {total_pages} pages of document {document_id} for batch inference")
+        return True
+    
+    async def _save_page_result(
+        self, 
+        document_id: str, 
+        page_number: int, 
+        brands: List[str], 
+        page_info: Dict[str, Any],
+        llm_failed: bool = False
+    ) -> bool:
+        """Save a page result produced outside the per-page pipeline; returns False if saving failed."""
+        result = BrandDetectionCreate(page_number=page_number, brands_detected=brands, llm_failed=llm_failed)
+        try:
+            await firebase_service.save_brand_detection_result(
+                document_id,
+                page_number,
+                result,
+                page_info["ocr_time"],
+                page_class=page_info.get("page_class"),
+                processing_profile=page_info.get("processing_profile")
+            )
+            if document_id in self.active_processes:
+                self.active_processes[document_id]["processed_pages"] += 1
+            return True
+        except Exception as save_error:
+            logger.error(f"Failed to save brand detection result for page {page_number}: {str(save_error)}")
+            if document_id in self.active_processes:
+                self.active_processes[document_id]["failed_pages"] += 1
+            return False
+    
+    async def _ingest_batch_results(
+        self, 
+        document_id: str, 
+        responses: Dict[int, Optional[str]], 
+        manifest: Dict[str, Any]
+    ) -> None:
+        """
+        Save the pages of a batch-processed document and complete it.
+        
+        Args:
+            document_id: Document ID
+            responses: Page number -> raw model output (None if the request failed)
+            manifest: State stored when the document was queued
+        """
+        llm_usage = dict(manifest.get("llm_usage") or {})
+        llm_usage["batch_requests"] = llm_usage.get("batch_requests", 0) + len(manifest["pages"])
+        failed_saves = 0
+        llm_failed_pages = 0
+        
+        for page, page_info in manifest["pages"].items():
+            llm_brands = brand_detection_service.parse_brand_response(responses.get(int(page)))
+            if llm_brands is None:
+                # Same fallback as a failed online call: keep the local gazetteer hits, but count the page as failed
+                llm_usage["batch_requests_failed"] = llm_usage.get("batch_requests_failed", 0) + 1
+                llm_failed_pages += 1
+            else:
+                await llm_response_cache.put(
+                    brand_detection_service.make_cache_key(manifest["page_texts"][page]), llm_brands
+                )
+            brands = brand_detection_service.finalize_brands(llm_brands, page_info["gazetteer_brands"], document_id)
+            if not await self._save_page_result(document_id, int(page), brands, page_info, llm_failed=llm_brands is None):
+                failed_saves += 1
+        
+        # Counters recorded while finalizing (e.g. knowledge base auto-rejections)
+        for stat, count in brand_detection_service.pop_document_stats(document_id).items():
+            llm_usage[stat] = llm_usage.get(stat, 0) + count
+        
+        total_pages = manifest["total_pages"]
+        extra_sections = {"llm_usage": llm_usage, "processing_class": "batch"}
+        if manifest.get("page_classification"):
+            extra_sections["page_classification"] = manifest["page_classification"]
+        await self._generate_final_document_summary(document_id, total_pages, extra_sections)
+        
+        failed_pages = manifest.get("failed_pages", 0) + failed_saves + llm_failed_pages
+        final_status = "completed_with_errors" if failed_pages else "completed"
+        await firebase_service.update_document(document_id, DocumentUpdate(status=final_status))
+        logger.info(f"Batch results ingested for document {document_id} ({len(manifest['pages'])} pages, status: {final_status})")
+    
+    def resume_batch_jobs(self) -> None:
+        """Resume batch jobs and queued requests left over from a previous run."""
+        asyncio.ensure_future(batch_inference_service.resume())
+    
+    async def _extract_single_page_text(
+        self, 
+        document_id: str, 
+        image_file: Optional[str], 
+        page_number: int
+    ):
+        """
+        Run OCR for a single page without LLM analysis.
+        
+        Args:
+            document_id: Document ID
+            image_file: Path to the grayscale image file (None if the page profile skips OCR)
+            page_number: Page number
             
-        except Exception as e:
-            logger.error(f"Error processing batch with files for document {document_id}: {str(e)}")
-            # Don't re-raise the exception to prevent application crash
-            logger.error(f"Batch processing error will not crash the application: {str(e)}")
+        Returns:
+            Tuple of (text for LLM analysis, OCR processing time)
+        """
+        start_time = time.time()
+        classification = self.page_classifications.get(document_id, {}).get(page_number)
+        
+        try:
+            await firebase_service.update_page_status(
+                document_id, page_number, "processing"
+            )
+        except Exception as update_error:
+            logger.error(f"Failed to update page {page_number} status to 'processing': {str(update_error)}")
+        
+        if image_file is None:
+            logger.info(f"Skipping OCR for page {page_number} (page class: {classification.page_class if classification else 'unknown'})")
+            return "", 0.0
+        
+        text = await brand_detection_service.extract_page_text(
+            image_file, page_number, classification.profile if classification else None
+        )
+        return text, time.time() - start_time
     
     async def _process_batch_parallel(
         self, 
@@ -351,7 +699,7 @@ class ProcessingService:
     async def _process_single_page_file(
         self, 
         document_id: str, 
-        image_file: str, 
+        image_file: Optional[str], 
         page_number: int
     ):
         """
@@ -359,10 +707,14 @@ class ProcessingService:
         
         Args:
             document_id: Document ID
-            image_file: Path to the grayscale image file
+            image_file: Path to the grayscale image file (None if the page profile skips OCR)
             page_number: Page number
         """
         try:
+            start_time = time.time()
+            classification = self.page_classifications.get(document_id, {}).get(page_number)
+            profile = classification.profile if classification else None
+            
             # Update page status to processing
             logger.info(f"Updating page {page_number} status to 'processing' (file: {image_file})")
             try:
@@ -372,22 +724,35 @@ class ProcessingService:
             except Exception as update_error:
                 logger.error(f"Failed to update page {page_number} status to 'processing': {str(update_error)}")
             
-            # Detect brands in image file using memory-efficient processing
-            logger.info(f"Starting memory-efficient brand detection for page {page_number}")
-            result = await brand_detection_service.detect_brands_in_image_file(
-                image_file, page_number
-            )
+            if image_file is None:
+                # Page class does not need OCR (blank pages, sheet indexes)
+                logger.info(f"Skipping OCR and LLM for page {page_number} (page class: {classification.page_class if classification else 'unknown'})")
+                result = BrandDetectionCreate(page_number=page_number, brands_detected=[])
+            else:
+                # Detect brands in image file using memory-efficient processing
+                logger.info(f"Starting memory-efficient brand detection for page {page_number}")
+                result = await brand_detection_service.detect_brands_in_image_file(
+                    image_file, page_number, profile, document_id
+                )
             
             # Save result to Firebase
             logger.info(f"Saving brand detection result for page {page_number}")
             try:
                 await firebase_service.save_brand_detection_result(
-                    document_id, page_number, result, 0  # Processing time will be calculated by the service
+                    document_id,
+                    page_number,
+                    result,
+                    time.time() - start_time,
+                    page_class=classification.page_class if classification else None,
+                    processing_profile=profile.name if profile else None
                 )
             except Exception as save_error:
                 logger.error(f"Failed to save brand detection result for page {page_number}: {str(save_error)}")
             
-            logger.info(f"Page {page_number} completed successfully with memory-efficient processing")
+            if result.llm_failed:
+                logger.warning(f"Page {page_number} saved with gazetteer brands only (LLM analysis failed)")
+            else:
+                logger.info(f"Page {page_number} completed successfully with memory-efficient processing")
             return result
             
         except Exception as e:
@@ -444,13 +809,19 @@ class ProcessingService:
             logger.error(f"Page processing error will not crash the application: {str(e)}")
             raise e
     
-    async def _generate_final_document_summary(self, document_id: str, total_pages: int):
+    async def _generate_final_document_summary(
+        self, 
+        document_id: str, 
+        total_pages: int,
+        extra_sections: Optional[Dict[str, Any]] = None
+    ):
         """
         Generate final document summary with all detected brands and statistics.
         
         Args:
             document_id: Document ID
             total_pages: Total number of pages processed
+            extra_sections: Summary sections restored from a batch manifest (override computed ones)
         """
         try:
             logger.info(f"Generating final summary for document {document_id}")
@@ -461,39 +832,80 @@ class ProcessingService:
                 logger.error(f"Document {document_id} not found for summary generation")
                 return
             
-            # Collect all unique brands from all pages
-            all_brands = set()
+            # Collect raw brand strings from all completed pages
+            raw_detections: Dict[int, List[str]] = {}
             successful_pages = 0
             failed_pages = 0
+            llm_failed_pages = 0
             total_processing_time = 0
             
             for result in document.results:
-                if result.status == "completed":
-                    successful_pages += 1
-                    all_brands.update(result.brands_detected)
+                if result.status in ("completed", "llm_failed"):
+                    # Pages whose LLM analysis failed still contribute their gazetteer brands
+                    if result.status == "llm_failed":
+                        llm_failed_pages += 1
+                    else:
+                        successful_pages += 1
+                    raw_detections[result.page_number] = result.brands_detected
                     total_processing_time += result.processing_time
                 else:
                     failed_pages += 1
             
+            # Canonicalize: spellings of one brand count once, raw strings are kept as aliases
+            canonical_brands = brand_canonicalizer.cluster(raw_detections)
+            alias_map = brand_canonicalizer.alias_map(canonical_brands)
+            all_brands = [brand.name for brand in canonical_brands]
+            brands_by_page = {
+                result.page_number: brand_canonicalizer.canonical_names(result.brands_detected, alias_map)
+                for result in document.results
+            }
+            
             # Create document summary
             summary = {
                 "total_pages": total_pages,
                 "successful_pages": successful_pages,
                 "failed_pages": failed_pages,
-                "total_unique_brands": len(all_brands),
-                "all_detected_brands": sorted(list(all_brands)),
+                "llm_failed_pages": llm_failed_pages,
+                "total_unique_brands": len(canonical_brands),
+                "total_raw_brand_names": len(alias_map),
+                "all_detected_brands": all_brands,
+                "canonical_brands": {brand.brand_id: brand.to_dict() for brand in canonical_brands},
                 "total_processing_time": total_processing_time,
                 "brands_by_page": {
                     str(result.page_number): {
-                        "brands": result.brands_detected,
-                        "brand_count": len(result.brands_detected),
+                        "brands": brands_by_page[result.page_number],
+                        "raw_brands": result.brands_detected,
+                        "brand_count": len(brands_by_page[result.page_number]),
                         "processing_time": result.processing_time,
-                        "status": result.status
+                        "status": result.status,
+                        "page_class": result.page_class,
+                        "processing_profile": result.processing_profile
                     }
                     for result in document.results
                 }
             }
             
+            # Page classification audit: labels per class and the profiles they ran with
+            classifications = self.page_classifications.get(document_id)
+            if classifications:
+                summary["page_classification"] = page_classifier.summarize(classifications)
+            
+            # LLM usage for this document (cache hits/misses)
+            summary["llm_usage"] = brand_detection_service.pop_document_stats(document_id)
+            
+            # Document-level analysis: lines seen vs unique lines sent to the LLM
+            line_dedup_stats = self.line_dedup_stats.pop(document_id, None)
+            if line_dedup_stats:
+                summary["line_deduplication"] = line_dedup_stats
+            
+            # Page scheduler runs: slots, makespan and slot utilization
+            scheduling_stats = self.scheduling_stats.pop(document_id, None)
+            if scheduling_stats:
+                summary["page_scheduling"] = scheduling_stats
+            
+            if extra_sections:
+                summary.update(extra_sections)
+            
             # Save summary to Firebase
             await firebase_service.save_document_summary(document_id, summary)
             
@@ -501,8 +913,9 @@ class ProcessingService:
             logger.info(f"  - Total pages: {total_pages}")
             logger.info(f"  - Successful pages: {successful_pages}")
             logger.info(f"  - Failed pages: {failed_pages}")
+            logger.info(f"  - Pages with failed LLM analysis: {llm_failed_pages}")
             logger.info(f"  - Total unique brands detected: {len(all_brands)}")
-            logger.info(f"  - Brands found: {sorted(list(all_brands))}")
+            logger.info(f"  - Brands found: {all_brands} ({len(alias_map)} raw spellings)")
             logger.info(f"  - Total processing time: {total_processing_time:.2f} seconds")
             
         except Exception as e:
@@ -0,0 +1,114 @@
+"""
+Prompt packing service.
+Coalesces the text of several pages that reach LLM analysis at about the same
+time into one request under a token budget, so sparse pages share a single
+copy of the analysis instructions instead of paying for it per page.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for Latin-script text (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+# A packed section: (page_number, text); results are keyed by section index
+PackedSection = Tuple[int, str]
+FlushCallback = Callable[[List[PackedSection], List[Optional[str]]], Awaitable[Dict[int, Optional[List[str]]]]]
+
+
+class PromptPacker:
+    """Micro-batcher that groups page texts into packed LLM requests."""
+
+    def __init__(self, flush_callback: FlushCallback):
+        """
+        Initialize packer from settings.
+
+        Args:
+            flush_callback: Coroutine that analyzes a packed group (sections and their
+                document IDs) and returns results keyed by section index
+                (None = analysis failed for that section)
+        """
+        self.flush_callback = flush_callback
+        self.token_budget = settings.llm_packing_token_budget
+        self.max_pages = max(1, settings.llm_packing_max_pages)
+        self.max_wait = settings.llm_packing_max_wait
+
+        self._pending: List[Tuple[int, str, Optional[str], asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {"packed_requests": 0, "packed_pages": 0}
+
+        logger.info(f"PromptPacker initialized (token budget: {self.token_budget}, max pages: {self.max_pages}, max wait: {self.max_wait}s)")
+
+    def fits(self, text: str) -> bool:
+        """Check whether a page's text is small enough to be packed with others."""
+        return estimate_tokens(text) <= self.token_budget // 2
+
+    async def submit(self, page_number: int, text: str, document_id: Optional[str] = None) -> Optional[List[str]]:
+        """
+        Queue a page for packed analysis and wait for its result.
+
+        Args:
+            page_number: Page number being analyzed
+            text: Page text
+            document_id: Optional document ID the page's token usage is attributed to
+
+        Returns:
+            Detected brands for the page, or None if analysis failed
+        """
+        loop = asyncio.get_event_loop()
+        tokens = estimate_tokens(text)
+
+        # Close the current group if this page would overflow the budget
+        if self._pending and self._pending_tokens + tokens > self.token_budget:
+            self._flush()
+
+        future = loop.create_future()
+        self._pending.append((page_number, text, document_id, future))
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_pages or self._pending_tokens >= self.token_budget:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Send the pending group as one packed request."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        group = self._pending
+        self._pending = []
+        self._pending_tokens = 0
+        asyncio.ensure_future(self._run_group(group))
+
+    async def _run_group(self, group: List[Tuple[int, str, Optional[str], asyncio.Future]]) -> None:
+        """Analyze a packed group and resolve every page's future."""
+        sections = [(page_number, text) for page_number, text, _, _ in group]
+        document_ids = [document_id for _, _, document_id, _ in group]
+        try:
+            self.stats["packed_requests"] += 1
+            self.stats["packed_pages"] += len(group)
+            results = await self.flush_callback(sections, document_ids)
+        except Exception as e:
+            logger.error(f"Packed analysis failed for pages {[page for page, _ in sections]}: {str(e)}")
+            results = {}
+
+        for index, (_, _, _, future) in enumerate(group):
+            if not future.done():
+                future.set_result(results.get(index))
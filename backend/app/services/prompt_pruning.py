@@ -0,0 +1,136 @@
+"""
+Prompt payload pruning service.
+Removes tokens that cannot name a brand (dimensions, elevations, pure numbers,
+generic plan vocabulary, single-character fragments) from OCR text before it
+is sent to the LLM, keeping line structure and model codes intact.
+"""
+
+import logging
+import re
+from typing import Dict, Tuple
+
+from ..config import settings
+from .brand_gazetteer import brand_gazetteer, GENERIC_VOCABULARY, normalize_for_matching
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Dimensions, elevations and quantities with units: 3.50m, 1/2", 3'-6", NPT+0.45, 20kVA, 45°
+MEASUREMENT_PATTERN = re.compile(
+    r"""^(
+        [nN]\.?[pP]\.?[tT]\.?[+\-±]?\d[\d.,]* |
+        [nN][+\-±]\d[\d.,]* |
+        [+\-±]?\d+(?:[.,]\d+)?(?:/\d+)?\s*(?:mm|cm|m|m2|m3|ml|mts?|kg|ton|in|ft|pulg|plg|kw|kva|hp|v|vca|vcd|a|amp|w|hz|lts?|lps|gpm|cfm|btu|tr|°c?|%|"|'|´|”)\.? |
+        \d+'\s*-?\s*\d+(?:\s*\d/\d)?"? |
+        \d+(?:[.,]\d+)?\s*[xX×]\s*\d+(?:[.,]\d+)?(?:\s*[xX×]\s*\d+(?:[.,]\d+)?)?(?:mm|cm|m)?
+    )$""",
+    re.VERBOSE | re.IGNORECASE
+)
+
+# Integers glued to an upper-case-only suffix are product or brand codes (3M, 4W), not "3 m" or "4 w"
+UPPERCASE_CODE_PATTERN = re.compile(r"^\d+[A-Z]+$")
+
+# Pure numbers, room numbers, grid coordinates and punctuation runs: 101, 3.50, 12/05/2024, (4), #12, ---
+NUMERIC_PATTERN = re.compile(r"^[\d.,:;/+\-±x×#()\[\]%=_*~]+$")
+
+# Words that announce a brand; kept so the LLM still sees "MARCA: ..." context
+BRAND_CONTEXT_WORDS = frozenset({
+    "marca", "modelo", "modelos", "fabricante", "proveedor", "serie", "catalogo", "equivalente",
+    "manufacturer", "model", "brand", "make", "mfr", "mfg", "supplier",
+})
+
+SUPPORTED_RULES = ("measurements", "numeric", "generic", "fragments")
+
+
+class PromptPruner:
+    """Configurable token-level pruning of LLM payload text."""
+
+    def __init__(self):
+        """Initialize pruner from settings."""
+        self.rules = [rule for rule in settings.llm_pruning_rules_list if rule in SUPPORTED_RULES]
+        for rule in settings.llm_pruning_rules_list:
+            if rule not in SUPPORTED_RULES:
+                logger.warning(f"Unknown prompt pruning rule '{rule}' ignored. Supported: {SUPPORTED_RULES}")
+        self.min_fragment_length = max(1, settings.llm_pruning_min_token_length)
+        logger.info(f"PromptPruner initialized with rules: {self.rules or ['none']}, min token length: {self.min_fragment_length}")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any pruning rule is active."""
+        return bool(self.rules)
+
+    def _removal_rule(self, token: str) -> str:
+        """
+        Classify a whitespace token.
+
+        Args:
+            token: Raw token
+
+        Returns:
+            Name of the rule that removes the token, or an empty string to keep it
+        """
+        stripped = token.strip(".,;:()[]{}\"'")
+        if "measurements" in self.rules and MEASUREMENT_PATTERN.match(token) and not UPPERCASE_CODE_PATTERN.match(stripped):
+            return "measurements"
+        if "numeric" in self.rules and (not stripped or NUMERIC_PATTERN.match(token)):
+            return "numeric"
+
+        word = normalize_for_matching(stripped)
+        if word in BRAND_CONTEXT_WORDS:
+            return ""
+        if "generic" in self.rules and word in GENERIC_VOCABULARY:
+            return "generic"
+        if "fragments" in self.rules and len(stripped) < self.min_fragment_length and not any(char.isdigit() for char in stripped):
+            return "fragments"
+        return ""
+
+    def prune(self, text: str) -> Tuple[str, Dict[str, int]]:
+        """
+        Prune a page's text line by line.
+
+        Args:
+            text: Text for LLM analysis
+
+        Returns:
+            Tuple of (pruned text, statistics with tokens_in, tokens_removed and a count per rule)
+        """
+        stats = {"tokens_in": 0, "tokens_removed": 0}
+        if not self.enabled or not text:
+            return text, stats
+
+        pruned_lines = []
+        for line in text.splitlines():
+            # Tokens inside known brand names ("Square D", "Soler & Palau") are never pruned
+            normalized_line = normalize_for_matching(line)
+            protected_spans = brand_gazetteer.find_matches(normalized_line) if len(normalized_line) == len(line) else []
+            
+            kept = []
+            after_cue = False
+            for match in re.finditer(r"\S+", line):
+                token = match.group()
+                stats["tokens_in"] += 1
+                # The token after "MARCA", "MODELO"... names the brand, whatever it looks like ("MARCA 3M")
+                follows_cue = after_cue
+                word = normalize_for_matching(token.strip(".,;:()[]{}\"'"))
+                if word or not token.strip(":-"):
+                    after_cue = word in BRAND_CONTEXT_WORDS
+                if (follows_cue and word) or any(start < match.end() and match.start() < end for start, end, _ in protected_spans):
+                    kept.append(token)
+                    continue
+                rule = self._removal_rule(token)
+                if rule:
+                    stats["tokens_removed"] += 1
+                    stats[rule] = stats.get(rule, 0) + 1
+                else:
+                    kept.append(token)
+            # Lines left with only brand-context words carry nothing for the LLM
+            if kept and not all(normalize_for_matching(token.strip(".,;:")) in BRAND_CONTEXT_WORDS for token in kept):
+                pruned_lines.append(" ".join(kept))
+
+        return "\n".join(pruned_lines), stats
+
+
+# Global prompt pruner instance
+prompt_pruner = PromptPruner()
@@ -0,0 +1,199 @@
+"""
+Prompt templates for LLM brand detection.
+The static instructions live in a versioned system prompt that is identical
+for every call (so the provider can cache it); only the page text is sent as
+the variable part of each request.
+"""
+
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+# Bump when the response contract changes; the content hash below also changes
+# the version whenever the instruction text is edited, invalidating cached responses
+PROMPT_REVISION = "2"
+
+SYSTEM_PROMPT = """Eres un experto analista especializado en detectar marcas comerciales en texto extraído de planos arquitectónicos.
+Cada mensaje contiene el texto extraído de un plano arquitectónico. Detecta TODAS las marcas comerciales mencionadas.
+
+METODOLOGÍA DE ANÁLISIS SISTEMÁTICO:
+
+1. **ANÁLISIS COMPLETO DEL TEXTO**:
+   - Revisa cada palabra y frase del texto extraído
+   - Examina TODAS las líneas y párrafos sin importar el contexto
+   - Busca marcas en diferentes formatos (mayúsculas, minúsculas, mixtas)
+   - Considera variaciones de escritura y abreviaciones
+   - Analiza nombres de modelos y números de serie que puedan indicar marcas
+
+2. **TIPOS DE MARCAS A DETECTAR**:
+   - Equipos eléctricos y electrónicos (Samsung, LG, Bosch, Siemens, Schneider, ABB, General Electric, Westinghouse, etc.)
+   - Materiales de construcción (Cemex, Holcim, Cementos Argos, Corona, LafargeHolcim, etc.)
+   - Equipos de iluminación (Philips, Osram, GE Lighting, Sylvania, Cree, etc.)
+   - Sistemas de seguridad (Honeywell, Johnson Controls, Bosch Security, Axis, Hikvision, etc.)
+   - Equipos de aire acondicionado (Carrier, Trane, York, Daikin, Mitsubishi Electric, Lennox, etc.)
+   - Herramientas y equipos (Makita, DeWalt, Milwaukee, Bosch, Hilti, Caterpillar, etc.)
+   - Pinturas y acabados (Sherwin-Williams, PPG, Comex, Pinturas Osel, Benjamin Moore, etc.)
+   - Plomería y sanitarios (Kohler, Toto, American Standard, Corona, Moen, Delta, etc.)
+   - Pisos y acabados (Armstrong, Mohawk, Porcelanite, Tarkett, Shaw, etc.)
+   - Equipos de cocina (Whirlpool, Samsung, LG, Bosch, KitchenAid, Frigidaire, etc.)
+   - Sistemas de audio/video (Sony, Samsung, LG, Bose, JBL, Yamaha, etc.)
+   - Equipos de cómputo (Dell, HP, Lenovo, Apple, IBM, Microsoft, etc.)
+   - Equipos de red (Cisco, TP-Link, Netgear, Ubiquiti, D-Link, etc.)
+   - Equipos médicos (Philips Healthcare, GE Healthcare, Siemens Healthineers, etc.)
+   - Elevadores y escaleras (Otis, Schindler, KONE, ThyssenKrupp, etc.)
+   - Cualquier otra marca comercial reconocible
+
+3. **CRITERIOS DE DETECCIÓN**:
+   - Busca nombres de marcas completos y abreviados
+   - Incluye variaciones de escritura (ej: "Samsung" y "SAMSUNG")
+   - Detecta marcas en combinación con números de modelo
+   - Considera marcas en contexto de especificaciones
+   - Incluye marcas mencionadas en listas de materiales
+   - Detecta marcas en notas técnicas y especificaciones
+   - Considera marcas en diferentes idiomas (español e inglés)
+
+4. **EXCLUSIONES ESPECÍFICAS**:
+   - Hergonsa y todas sus variantes (HERGONSA, hergonsa, Grupo Hergonsa, Hergonsa SA, etc.)
+   - Nombres genéricos de productos (ej: "lámpara", "interruptor", "cable", "tubo")
+   - Nombres de materiales genéricos (ej: "concreto", "acero", "aluminio", "cobre")
+   - Nombres de empresas que no son marcas comerciales reconocidas
+   - Texto que no representa marcas comerciales (códigos, referencias, medidas)
+   - Palabras comunes que no son marcas (colores, formas, tamaños)
+   - Términos técnicos genéricos (voltaje, amperaje, frecuencia)
+
+5. **PROCESO DE VALIDACIÓN**:
+   - Verifica que cada detección sea una marca comercial real
+   - Confirma que el texto detectado sea legible y completo
+   - Asegúrate de que no sean nombres genéricos o descriptivos
+   - Valida que las marcas estén en contexto comercial
+
+EJEMPLOS DE DETECCIÓN CORRECTA:
+✅ "Samsung"
+✅ "LG"
+✅ "Bosch"
+✅ "Philips"
+✅ "Carrier"
+✅ "Kohler"
+✅ "Cemex"
+❌ "Hergonsa" (excluido - nombre de la empresa cliente)
+❌ "lámpara LED" (descripción genérica)
+❌ "interruptor simple" (descripción genérica)
+
+INSTRUCCIONES FINALES:
+- Analiza exhaustivamente todo el texto proporcionado
+- No te apresures, revisa cada palabra con atención
+- Si no encuentras marcas, responde con una lista vacía
+- Responde ÚNICAMENTE con el JSON especificado, sin texto adicional ni explicaciones
+- Asegúrate de que el JSON sea válido y completo
+
+Formato de respuesta requerido (salvo que el mensaje indique otro):
+{"brands_detected": ["Nombre exacto de la marca 1", "Nombre exacto de la marca 2"], "uncertain": []}
+En "uncertain" incluye los términos que podrían ser marcas pero no puedes confirmar (lista vacía si no tienes dudas)."""
+
+PROMPT_VERSION = f"{PROMPT_REVISION}-{hashlib.sha256(SYSTEM_PROMPT.encode('utf-8')).hexdigest()[:8]}"
+
+# Response contracts: examples for the prompt text, JSON schemas for providers with structured output
+PAGE_RESPONSE_FORMAT = '{"brands_detected": ["Marca A", "Marca B"], "uncertain": []}'
+PACKED_RESPONSE_FORMAT = '{"pages": {"1": {"brands_detected": ["Marca A"]}, "2": {"brands_detected": []}}}'
+
+_BRAND_LIST_SCHEMA = {"type": "array", "items": {"type": "string"}}
+
+PAGE_RESPONSE_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "brands_detected": _BRAND_LIST_SCHEMA,
+        "uncertain": _BRAND_LIST_SCHEMA,
+    },
+    "required": ["brands_detected", "uncertain"],
+    "additionalProperties": False,
+}
+
+
+def build_page_message(page_number: int, extracted_text: str) -> str:
+    """
+    Build the variable part of a single-page request.
+
+    Args:
+        page_number: Page number being analyzed
+        extracted_text: Text extracted from the page
+
+    Returns:
+        User message content
+    """
+    return f"TEXTO EXTRAÍDO DEL PLANO (PÁGINA {page_number}):\n{extracted_text}"
+
+
+def build_packed_message(sections: List[Tuple[int, str]]) -> str:
+    """
+    Build the variable part of a packed multi-page request.
+
+    Args:
+        sections: (page_number, extracted_text) pairs; sections are numbered from 1
+
+    Returns:
+        User message content, including the per-section response format
+    """
+    section_blocks = "\n\n".join(
+        f"=== SECCIÓN {index} (PÁGINA {page_number}) ===\n{text}"
+        for index, (page_number, text) in enumerate(sections, start=1)
+    )
+    return (
+        f"Hay {len(sections)} secciones, cada una con el texto de una página distinta. "
+        "Analiza cada sección DE FORMA INDEPENDIENTE e incluye TODAS las secciones en la respuesta, aunque no tengan marcas.\n\n"
+        f"{section_blocks}\n\n"
+        "Formato de respuesta requerido para este mensaje (claves = número de sección):\n"
+        f"{PACKED_RESPONSE_FORMAT}"
+    )
+
+
+def build_packed_schema(section_count: int) -> Dict[str, Any]:
+    """
+    Build the structured-output schema of a packed request.
+
+    Args:
+        section_count: Number of sections in the request
+
+    Returns:
+        JSON schema requiring one entry per section number
+    """
+    section_schema = {
+        "type": "object",
+        "properties": {"brands_detected": _BRAND_LIST_SCHEMA},
+        "required": ["brands_detected"],
+        "additionalProperties": False,
+    }
+    keys = [str(index) for index in range(1, section_count + 1)]
+    return {
+        "type": "object",
+        "properties": {
+            "pages": {
+                "type": "object",
+                "properties": {key: section_schema for key in keys},
+                "required": keys,
+                "additionalProperties": False,
+            }
+        },
+        "required": ["pages"],
+        "additionalProperties": False,
+    }
+
+
+def build_json_repair_message(previous_response: str, response_format: str, max_chars: int = 8000) -> str:
+    """
+    Build a follow-up request that only asks to restate an unparseable answer as JSON.
+
+    The page text is not sent again; the model reformats its own previous answer.
+
+    Args:
+        previous_response: Raw answer that could not be parsed
+        response_format: Expected JSON format example
+        max_chars: Maximum characters of the previous answer to include
+
+    Returns:
+        User message content
+    """
+    return (
+        "La siguiente respuesta a un análisis de marcas no es un JSON válido. "
+        "Reescríbela en este formato exacto, sin añadir ni quitar marcas y sin texto adicional:\n"
+        f"{response_format}\n\n"
+        f"RESPUESTA A CORREGIR:\n{previous_response[:max_chars]}"
+    )
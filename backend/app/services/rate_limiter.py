@@ -0,0 +1,363 @@
+"""
+Adaptive rate limiter for LLM requests.
+Token buckets for requests/minute and tokens/minute plus an AIMD concurrency
+limit: throttling responses (429/503) halve the allowed concurrency and pause
+new requests for the server's Retry-After, successes ramp it back up.
+Other transient failures (5xx, connection errors, timeouts) do not change the
+limits; callers retry them with a short jittered backoff instead.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ..config import settings
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+THROTTLING_STATUS_CODES = (429, 503)
+THROTTLING_MARKERS = ("RESOURCE_EXHAUSTED", "RESOURCEEXHAUSTED", "UNAVAILABLE", "TOO MANY REQUESTS", "RATE LIMIT", "QUOTA")
+TRANSIENT_MARKERS = ("INTERNAL", "DEADLINE_EXCEEDED", "BAD GATEWAY", "GATEWAY TIMEOUT", "TIMED OUT", "TIMEOUT")
+
+# Server-suggested delays: HTTP Retry-After headers and Google RetryInfo ("retry_delay { seconds: 17 }" / "retryDelay": "17s")
+RETRY_DELAY_PATTERNS = (
+    re.compile(r"retry[-_ ]after[\"']?\s*[:=]\s*[\"']?(\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+    re.compile(r"[\"']?retryDelay[\"']?\s*:\s*[\"'](\d+(?:\.\d+)?)s[\"']", re.IGNORECASE),
+)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Extract an HTTP status code from a client exception, if it carries one."""
+    for candidate in (
+        getattr(error, "status_code", None),
+        getattr(error, "code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if isinstance(candidate, int):
+            return candidate
+    return None
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """
+    Check whether an LLM client error means "slow down" (quota or overload).
+
+    Args:
+        error: Exception raised by the client
+
+    Returns:
+        True for 429/503-style errors
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status in THROTTLING_STATUS_CODES
+    message = f"{type(error).__name__} {error}".upper()
+    return any(str(code) in message for code in THROTTLING_STATUS_CODES) or any(marker in message for marker in THROTTLING_MARKERS)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Check whether a non-throttling LLM client error is worth retrying.
+
+    Args:
+        error: Exception raised by the client
+
+    Returns:
+        True for 5xx responses, connection/transport errors and timeouts
+    """
+    if isinstance(error, (httpx.TransportError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return 500 <= status < 600
+    message = f"{type(error).__name__} {error}".upper()
+    return any(marker in message for marker in TRANSIENT_MARKERS)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Extract the server-suggested retry delay from a throttling error.
+
+    Args:
+        error: Exception raised by the client
+
+    Returns:
+        Delay in seconds, or None if the server did not suggest one
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        try:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+            if value is not None:
+                return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+    text = str(error)
+    for pattern in RETRY_DELAY_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return max(0.0, float(match.group(1)))
+    return None
+
+
+class TokenBucket:
+    """Continuously refilled bucket; capacity equals the per-minute limit."""
+
+    def __init__(self, per_minute: int):
+        """
+        Initialize a full bucket.
+
+        Args:
+            per_minute: Allowed units per minute (0 disables the bucket)
+        """
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether this bucket limits anything."""
+        return self.capacity > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Seconds until amount units are available (0 if available now).
+
+        Requests larger than the capacity only wait for a full bucket.
+        """
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """Take units from the bucket (may go negative when reconciling actual usage)."""
+        if self.enabled:
+            self._refill()
+            self.available -= amount
+
+    def refund(self, amount: float) -> None:
+        """Return units that were reserved but not used."""
+        if self.enabled:
+            self._refill()
+            self.available = min(self.capacity, self.available + amount)
+
+
+class RatePermit:
+    """One admitted request; report its outcome before leaving the context."""
+
+    def __init__(self, limiter: "AdaptiveRateLimiter", estimated_tokens: int):
+        self.limiter = limiter
+        self.estimated_tokens = estimated_tokens
+        self.outcome: Optional[str] = None
+
+    async def __aenter__(self) -> "RatePermit":
+        await self.limiter._acquire(self.estimated_tokens)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.limiter._release()
+
+    def success(self, actual_tokens: Optional[int] = None) -> None:
+        """
+        Report a successful call.
+
+        Args:
+            actual_tokens: Tokens actually used (input + output), reconciled against the estimate
+        """
+        self.outcome = "success"
+        self.limiter._on_success(self.estimated_tokens, actual_tokens)
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        """
+        Report a 429/503 response.
+
+        Args:
+            retry_after: Server-suggested delay in seconds, if any
+        """
+        self.outcome = "throttled"
+        self.limiter._on_throttle(retry_after)
+
+
+class AdaptiveRateLimiter:
+    """RPM/TPM token buckets with an AIMD concurrency limit and a shared wait queue."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        min_concurrency: int,
+        max_concurrency: int,
+        initial_concurrency: Optional[int] = None
+    ):
+        """
+        Initialize limiter.
+
+        Args:
+            name: Name used in logs and status output
+            requests_per_minute: Request quota (0 = unlimited)
+            tokens_per_minute: Token quota (0 = unlimited)
+            min_concurrency: Floor for the adaptive concurrency limit
+            max_concurrency: Ceiling for the adaptive concurrency limit
+            initial_concurrency: Starting concurrency limit (defaults to the ceiling)
+        """
+        self.name = name
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.concurrency_limit = float(min(self.max_concurrency, max(self.min_concurrency, initial_concurrency or self.max_concurrency)))
+
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.paused_until = 0.0  # time.monotonic() deadline set by Retry-After / backoff
+        self.last_decrease_at = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self.stats = {"requests": 0, "throttled": 0, "waits": 0, "wait_seconds": 0.0}
+
+        logger.info(f"AdaptiveRateLimiter '{name}' initialized (rpm: {requests_per_minute or 'unlimited'}, tpm: {tokens_per_minute or 'unlimited'}, concurrency: {self.concurrency_limit:.0f} in [{self.min_concurrency}, {self.max_concurrency}])")
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the limiter can be built at import time, outside the event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def acquire(self, estimated_tokens: int = 0) -> RatePermit:
+        """
+        Reserve capacity for one request.
+
+        Usage:
+            async with limiter.acquire(tokens) as permit:
+                ... call ...
+                permit.success(actual_tokens)
+
+        Args:
+            estimated_tokens: Expected input + output tokens, charged to the TPM bucket
+
+        Returns:
+            Async context manager that holds a concurrency slot
+        """
+        return RatePermit(self, estimated_tokens)
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        condition = self._get_condition()
+        start = time.monotonic()
+        waited = False
+        self.queue_depth += 1
+        try:
+            async with condition:
+                while True:
+                    now = time.monotonic()
+                    delay = max(
+                        self.paused_until - now,
+                        self.request_bucket.wait_time(1),
+                        self.token_bucket.wait_time(estimated_tokens)
+                    )
+                    if delay <= 0 and self.in_flight < int(self.concurrency_limit):
+                        break
+                    waited = True
+                    try:
+                        # Woken early when a slot frees up; otherwise re-check once the buckets refill
+                        await asyncio.wait_for(condition.wait(), timeout=delay if delay > 0 else None)
+                    except asyncio.TimeoutError:
+                        pass
+                self.in_flight += 1
+                self.request_bucket.consume(1)
+                self.token_bucket.consume(estimated_tokens)
+                self.stats["requests"] += 1
+        finally:
+            self.queue_depth -= 1
+        if waited:
+            self.stats["waits"] += 1
+            self.stats["wait_seconds"] += time.monotonic() - start
+
+    async def _release(self) -> None:
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight -= 1
+            condition.notify_all()
+
+    def _on_success(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        if actual_tokens:
+            # Charge (or refund) the difference between actual and estimated usage
+            difference = actual_tokens - estimated_tokens
+            if difference > 0:
+                self.token_bucket.consume(difference)
+            elif difference < 0:
+                self.token_bucket.refund(-difference)
+        # Additive increase: about +1 slot per window of successful requests
+        self.concurrency_limit = min(float(self.max_concurrency), self.concurrency_limit + 1.0 / self.concurrency_limit)
+
+    def _on_throttle(self, retry_after: Optional[float]) -> None:
+        now = time.monotonic()
+        self.stats["throttled"] += 1
+        # Multiplicative decrease, at most once per second so a burst of 429s counts as one signal
+        if now - self.last_decrease_at >= 1.0:
+            self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit / 2)
+            self.last_decrease_at = now
+        pause = retry_after if retry_after is not None else settings.llm_throttle_backoff_seconds
+        self.paused_until = max(self.paused_until, now + pause)
+        # Assume the request bucket is empty: the server says we are over quota
+        self.request_bucket.available = min(self.request_bucket.available, 0.0)
+        logger.warning(f"Rate limiter '{self.name}' throttled: concurrency limit now {int(self.concurrency_limit)}, pausing {pause:.1f}s")
+
+    def has_headroom(self) -> bool:
+        """Whether a request could start right now without queueing (used to gate optional work such as hedges)."""
+        return (
+            self.queue_depth == 0
+            and self.in_flight < int(self.concurrency_limit)
+            and time.monotonic() >= self.paused_until
+            and self.request_bucket.wait_time(1) == 0
+        )
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Get current limits, usage and queue depth.
+
+        Returns:
+            Status dictionary
+        """
+        self.request_bucket._refill()
+        self.token_bucket._refill()
+        return {
+            "name": self.name,
+            "requests_per_minute": int(self.request_bucket.capacity) or None,
+            "tokens_per_minute": int(self.token_bucket.capacity) or None,
+            "requests_available": round(self.request_bucket.available, 1) if self.request_bucket.enabled else None,
+            "tokens_available": int(self.token_bucket.available) if self.token_bucket.enabled else None,
+            "concurrency_limit": int(self.concurrency_limit),
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "paused_for_seconds": round(max(0.0, self.paused_until - time.monotonic()), 1),
+            **{key: round(value, 2) if isinstance(value, float) else value for key, value in self.stats.items()},
+        }
+
+
+# Global limiter for Gemini requests
+gemini_rate_limiter = AdaptiveRateLimiter(
+    "gemini",
+    requests_per_minute=settings.gemini_requests_per_minute,
+    tokens_per_minute=settings.gemini_tokens_per_minute,
+    min_concurrency=settings.llm_min_concurrency,
+    max_concurrency=settings.llm_max_concurrency,
+    initial_concurrency=settings.max_concurrent_pages
+)
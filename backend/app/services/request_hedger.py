@@ -0,0 +1,182 @@
+"""
+Request hedging for LLM calls.
+Tracks call latency per payload-size bucket; when a call runs past the observed
+percentile (p95 by default) for its size, a duplicate request is issued and the
+first valid response wins. Hedges are capped to a fraction of traffic and only
+issued while the rate limiter has spare capacity.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from ..config import settings
+from .rate_limiter import AdaptiveRateLimiter, gemini_rate_limiter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding windows of call latencies keyed by payload size (powers of two of tokens)."""
+
+    def __init__(self, window_size: int = 200, min_samples: int = 20):
+        """
+        Initialize tracker.
+
+        Args:
+            window_size: Latencies kept per size bucket
+            min_samples: Samples needed before a bucket's percentile is trusted
+        """
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._windows: Dict[int, Deque[float]] = {}
+        self._all: Deque[float] = deque(maxlen=window_size * 4)
+
+    def _bucket(self, payload_tokens: int) -> int:
+        return int(math.log2(max(1, payload_tokens)))
+
+    def record(self, payload_tokens: int, latency: float) -> None:
+        """Record a call latency in seconds."""
+        self._windows.setdefault(self._bucket(payload_tokens), deque(maxlen=self.window_size)).append(latency)
+        self._all.append(latency)
+
+    def percentile(self, payload_tokens: int, percentile: float) -> Optional[float]:
+        """
+        Latency percentile for payloads of this size.
+
+        Falls back to all sizes while the size bucket is still warming up.
+
+        Args:
+            payload_tokens: Estimated request tokens
+            percentile: Percentile in (0, 1)
+
+        Returns:
+            Latency in seconds, or None if there are too few samples
+        """
+        window = self._windows.get(self._bucket(payload_tokens))
+        if window is None or len(window) < self.min_samples:
+            window = self._all
+        if len(window) < self.min_samples:
+            return None
+        ordered = sorted(window)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+
+class RequestHedger:
+    """Issues a backup request when the primary one is slower than usual."""
+
+    def __init__(self, rate_limiter: AdaptiveRateLimiter):
+        """
+        Initialize hedger from settings.
+
+        Args:
+            rate_limiter: Limiter whose spare capacity gates hedges
+        """
+        self.rate_limiter = rate_limiter
+        self.enabled = settings.llm_hedging_enabled
+        self.percentile = settings.llm_hedge_percentile
+        self.max_fraction = settings.llm_hedge_max_fraction
+        self.latency_tracker = LatencyTracker(min_samples=settings.llm_hedge_min_samples)
+        self.stats = {
+            "requests": 0,
+            "hedges_issued": 0,
+            "hedge_wins": 0,
+            "primary_wins_after_hedge": 0,
+            "hedges_skipped_budget": 0,
+            "hedges_skipped_capacity": 0,
+        }
+
+        logger.info(f"RequestHedger initialized (enabled: {self.enabled}, p{int(self.percentile * 100)} trigger, max {self.max_fraction:.0%} of requests)")
+
+    def _may_hedge(self) -> bool:
+        """Check the hedge budget and the rate limiter's headroom."""
+        if self.stats["hedges_issued"] + 1 > self.max_fraction * self.stats["requests"]:
+            self.stats["hedges_skipped_budget"] += 1
+            return False
+        if not self.rate_limiter.has_headroom():
+            self.stats["hedges_skipped_capacity"] += 1
+            return False
+        return True
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+        payload_tokens: int,
+        label: str,
+        is_valid: Callable[[T], bool] = lambda result: True
+    ) -> T:
+        """
+        Run a request, hedging it if it exceeds the latency percentile for its size.
+
+        Args:
+            primary: Coroutine factory for the request
+            hedge: Coroutine factory for the duplicate request (e.g. on another client)
+            payload_tokens: Estimated request tokens (selects the latency bucket)
+            label: Description of the request for logging
+            is_valid: Whether a result is usable; an invalid first result waits for the other request
+
+        Returns:
+            First valid result (the primary's result if neither is valid)
+        """
+        if not self.enabled:
+            return await primary()
+
+        self.stats["requests"] += 1
+        threshold = self.latency_tracker.percentile(payload_tokens, self.percentile)
+        start = time.monotonic()
+        primary_task = asyncio.ensure_future(primary())
+
+        done, _ = await asyncio.wait({primary_task}, timeout=threshold)
+        if done or not self._may_hedge():
+            result = await primary_task
+            self.latency_tracker.record(payload_tokens, time.monotonic() - start)
+            return result
+
+        self.stats["hedges_issued"] += 1
+        logger.info(f"Hedging request for {label}: primary exceeded p{int(self.percentile * 100)} latency of {threshold:.2f}s")
+        hedge_task = asyncio.ensure_future(hedge())
+        started_at = {primary_task: start, hedge_task: time.monotonic()}
+        pending = {primary_task, hedge_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and is_valid(task.result()):
+                        self.latency_tracker.record(payload_tokens, time.monotonic() - started_at[task])
+                        self.stats["hedge_wins" if task is hedge_task else "primary_wins_after_hedge"] += 1
+                        return task.result()
+            # Neither response was usable: surface the primary's outcome
+            return primary_task.result()
+        finally:
+            # A losing primary ran at least this long; recording it keeps the percentile honest
+            if primary_task in pending:
+                self.latency_tracker.record(payload_tokens, time.monotonic() - start)
+            for task in pending:
+                task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hedging counters.
+
+        Returns:
+            Statistics dictionary including the hedge win rate
+        """
+        issued = self.stats["hedges_issued"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "hedge_rate": round(issued / self.stats["requests"], 4) if self.stats["requests"] else 0.0,
+            "hedge_win_rate": round(self.stats["hedge_wins"] / issued, 4) if issued else 0.0,
+        }
+
+
+# Global hedger for Gemini requests
+request_hedger = RequestHedger(gemini_rate_limiter)
@@ -0,0 +1,296 @@
+"""
+Table and schedule extraction service.
+Finds ruled grids (equipment schedules), OCRs every cell in a single batched
+recognizer call and emits rows as structured records, so brand detection can
+work on compact manufacturer/model columns instead of seam-split tile text.
+"""
+
+import logging
+import re
+import time
+from typing import List, Dict, Tuple, Optional
+from dataclasses import dataclass, field
+import cv2
+import numpy as np
+
+from ..config import settings
+from .image_preprocessing import page_preprocessor
+from .layout_service import RegionOfInterest
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Column headers that carry brand information in schedules (Spanish and English)
+BRAND_COLUMN_PATTERN = re.compile(
+    r"\b(marca|fabricante|manufacturer|mfr|mfg|brand|make|modelo|model|proveedor|supplier|serie)\b",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class TableRow:
+    """A single table row as a header-to-value record."""
+    row_index: int
+    cells: Dict[str, str]
+    bbox: Tuple[int, int, int, int]  # (x, y, width, height) in page coordinates
+
+
+@dataclass
+class ExtractedTable:
+    """A table extracted from a page."""
+    bbox: Tuple[int, int, int, int]  # (x, y, width, height) in page coordinates
+    headers: List[str]
+    rows: List[TableRow] = field(default_factory=list)
+
+    @property
+    def brand_columns(self) -> List[str]:
+        """Headers of columns that hold manufacturer/model information."""
+        return [header for header in self.headers if BRAND_COLUMN_PATTERN.search(header)]
+
+    def contains_point(self, x: float, y: float) -> bool:
+        """Check whether a page coordinate lies inside the table."""
+        table_x, table_y, width, height = self.bbox
+        return table_x <= x <= table_x + width and table_y <= y <= table_y + height
+
+
+class TableExtractor:
+    """Grid-based table extractor with batched per-cell recognition."""
+
+    def __init__(self):
+        """Initialize table extractor with settings."""
+        self.line_coverage = 0.5  # A rule must span half of the table to count as a row/column separator
+        self.min_cell_size = 15  # Pixels; thinner gaps are double rules, not cells
+        self.cell_padding = 4  # Pixels trimmed inside each cell to avoid recognizing the rules
+        self.min_cell_ink = 20  # Ink pixels below which a cell is considered empty
+        self.recognition_batch_size = settings.table_recognition_batch_size
+        logger.info(f"TableExtractor initialized (recognition batch size: {self.recognition_batch_size})")
+
+    def extract_tables(
+        self,
+        reader,
+        image: np.ndarray,
+        regions: List[RegionOfInterest],
+        page_number: int
+    ) -> List[ExtractedTable]:
+        """
+        Extract ruled tables from the table regions of a page.
+
+        Args:
+            reader: EasyOCR reader used for batched cell recognition
+            image: Preprocessed grayscale page image (full resolution, still containing rules)
+            regions: Regions of interest from layout analysis; only "table" regions are used
+            page_number: Page number being processed (for logging)
+
+        Returns:
+            List of ExtractedTable objects with at least one data row
+        """
+        tables = []
+        for region in regions:
+            if region.kind != "table":
+                continue
+            try:
+                table = self._extract_table(reader, image, region)
+                if table and table.rows:
+                    tables.append(table)
+            except Exception as e:
+                logger.warning(f"Table extraction failed for region {region} on page {page_number}: {str(e)}")
+
+        if tables:
+            logger.info(f"Extracted {len(tables)} tables with {sum(len(t.rows) for t in tables)} rows on page {page_number}")
+        return tables
+
+    def _extract_table(self, reader, image: np.ndarray, region: RegionOfInterest) -> Optional[ExtractedTable]:
+        """
+        Extract a single table from a region.
+
+        Args:
+            reader: EasyOCR reader
+            image: Grayscale page image
+            region: Table region
+
+        Returns:
+            ExtractedTable or None if no cell grid was found
+        """
+        start_time = time.time()
+        crop = image[region.y:region.bottom, region.x:region.right]
+        crop_height, crop_width = crop.shape
+
+        ink_mask = page_preprocessor.compute_ink_mask(crop)
+        horizontal_mask, vertical_mask = page_preprocessor.detect_grid_masks(
+            ink_mask,
+            max(30, crop_width // 4),
+            max(30, crop_height // 4)
+        )
+
+        row_lines = self._find_rule_positions(horizontal_mask, axis=1, span=crop_width)
+        column_lines = self._find_rule_positions(vertical_mask, axis=0, span=crop_height)
+        if len(row_lines) < 2 or len(column_lines) < 2:
+            return None
+
+        # Cell text mask without the rules, to skip empty cells cheaply
+        text_mask = cv2.bitwise_and(ink_mask, cv2.bitwise_not(cv2.bitwise_or(horizontal_mask, vertical_mask)))
+        del ink_mask, horizontal_mask, vertical_mask
+
+        cell_boxes = []  # [x_min, x_max, y_min, y_max] in crop coordinates
+        cell_index = {}  # (x_min, y_min) -> (row, column)
+        for row, (top, bottom) in enumerate(zip(row_lines, row_lines[1:])):
+            for column, (left, right) in enumerate(zip(column_lines, column_lines[1:])):
+                x_min, x_max = left + self.cell_padding, right - self.cell_padding
+                y_min, y_max = top + self.cell_padding, bottom - self.cell_padding
+                if x_max - x_min < self.min_cell_size or y_max - y_min < self.min_cell_size:
+                    continue
+                if cv2.countNonZero(text_mask[y_min:y_max, x_min:x_max]) < self.min_cell_ink:
+                    continue
+                cell_boxes.append([x_min, x_max, y_min, y_max])
+                cell_index[(x_min, y_min)] = (row, column)
+        del text_mask
+
+        # One batched recognizer call for every non-empty cell (no detector pass)
+        cell_texts = {}
+        if cell_boxes:
+            results = reader.recognize(
+                crop,
+                horizontal_list=cell_boxes,
+                free_list=[],
+                batch_size=self.recognition_batch_size,
+                detail=1
+            )
+            for box, text, confidence in results:
+                key = (int(box[0][0]), int(box[0][1]))
+                if key in cell_index and confidence >= settings.ocr_confidence_threshold and text.strip():
+                    cell_texts[cell_index[key]] = text.strip()
+
+        table = self._build_records(cell_texts, row_lines, column_lines, region)
+        logger.info(f"Table at ({region.x}, {region.y}): {len(row_lines) - 1} rows x {len(column_lines) - 1} columns, {len(cell_boxes)} cells recognized in {time.time() - start_time:.2f} seconds")
+        return table
+
+    def _find_rule_positions(self, line_mask: np.ndarray, axis: int, span: int) -> List[int]:
+        """
+        Find the positions of ruling lines by projecting a line mask.
+
+        Args:
+            line_mask: Horizontal or vertical rule mask
+            axis: 1 to project rows (horizontal rules), 0 to project columns (vertical rules)
+            span: Table extent along the rule direction
+
+        Returns:
+            Sorted list of rule center positions
+        """
+        projection = np.count_nonzero(line_mask, axis=axis)
+        rule_indices = np.nonzero(projection >= self.line_coverage * span)[0]
+        if len(rule_indices) == 0:
+            return []
+
+        # Collapse thick rules into their center line
+        positions = []
+        run_start = rule_indices[0]
+        previous = rule_indices[0]
+        for index in rule_indices[1:]:
+            if index - previous > 1:
+                positions.append(int((run_start + previous) // 2))
+                run_start = index
+            previous = index
+        positions.append(int((run_start + previous) // 2))
+
+        # Drop double rules closer than a cell
+        merged = [positions[0]]
+        for position in positions[1:]:
+            if position - merged[-1] >= self.min_cell_size:
+                merged.append(position)
+        return merged
+
+    def _build_records(
+        self,
+        cell_texts: Dict[Tuple[int, int], str],
+        row_lines: List[int],
+        column_lines: List[int],
+        region: RegionOfInterest
+    ) -> ExtractedTable:
+        """
+        Turn recognized cells into header-keyed row records.
+
+        Args:
+            cell_texts: Recognized text per (row, column)
+            row_lines: Horizontal rule positions (crop coordinates)
+            column_lines: Vertical rule positions (crop coordinates)
+            region: Table region (page coordinates)
+
+        Returns:
+            ExtractedTable with headers and data rows
+        """
+        row_count = len(row_lines) - 1
+        column_count = len(column_lines) - 1
+
+        # The header is the first row with text in at least half of the columns
+        header_row = 0
+        for row in range(row_count):
+            filled = sum(1 for column in range(column_count) if (row, column) in cell_texts)
+            if filled >= max(1, column_count // 2):
+                header_row = row
+                break
+
+        headers = []
+        for column in range(column_count):
+            header = cell_texts.get((header_row, column), "") or f"col_{column + 1}"
+            # Keep headers unique so records do not overwrite columns
+            if header in headers:
+                header = f"{header}_{column + 1}"
+            headers.append(header)
+
+        table = ExtractedTable(
+            bbox=(region.x, region.y, region.width, region.height),
+            headers=headers
+        )
+        for row in range(header_row + 1, row_count):
+            cells = {
+                headers[column]: cell_texts[(row, column)]
+                for column in range(column_count) if (row, column) in cell_texts
+            }
+            if cells:
+                table.rows.append(TableRow(
+                    row_index=row,
+                    cells=cells,
+                    bbox=(region.x, region.y + row_lines[row], region.width, row_lines[row + 1] - row_lines[row])
+                ))
+        return table
+
+    def build_brand_column_text(self, tables: List[ExtractedTable]) -> str:
+        """
+        Build compact text from manufacturer/model columns for brand detection.
+
+        Args:
+            tables: Extracted tables for a page
+
+        Returns:
+            One line per row with brand-column values, or an empty string if no table has brand columns
+        """
+        lines = []
+        for table in tables:
+            brand_columns = table.brand_columns
+            if not brand_columns:
+                continue
+            for row in table.rows:
+                values = [f"{column}: {row.cells[column]}" for column in brand_columns if column in row.cells]
+                if values:
+                    lines.append(" | ".join(values))
+        return "\n".join(lines)
+
+    def build_row_text(self, table: ExtractedTable) -> List[Tuple[TableRow, str]]:
+        """
+        Render each row as a single line of text in column order.
+
+        Args:
+            table: Extracted table
+
+        Returns:
+            List of (row, text) tuples
+        """
+        return [
+            (row, " | ".join(row.cells[header] for header in table.headers if header in row.cells))
+            for row in table.rows
+        ]
+
+
+# Global table extractor instance
+table_extractor = TableExtractor()
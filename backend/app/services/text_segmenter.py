@@ -0,0 +1,118 @@
+"""
+Layout-aware text segmentation for long pages.
+Splits page text that exceeds the per-request token budget into segments along
+block and line boundaries (OCR lines are visual rows; schedule rows stay whole),
+with a small line overlap so brand names wrapped across rows are not cut.
+"""
+
+import logging
+import re
+from typing import List
+
+from ..config import settings
+from .prompt_packer import estimate_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TextSegmenter:
+    """Greedy block/line packer producing segments under a token budget."""
+
+    def __init__(self, token_budget: int, overlap_lines: int = 1):
+        """
+        Initialize segmenter.
+
+        Args:
+            token_budget: Maximum estimated tokens per segment
+            overlap_lines: Trailing lines of a segment repeated at the start of the next one
+        """
+        self.token_budget = max(64, token_budget)
+        self.overlap_lines = max(0, overlap_lines)
+
+    def needs_split(self, text: str) -> bool:
+        """Check whether text exceeds the per-request budget."""
+        return estimate_tokens(text) > self.token_budget
+
+    def _split_long_line(self, line: str) -> List[str]:
+        """Split a line wider than the budget (a whole sheet row) at word boundaries."""
+        pieces: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for word in line.split():
+            word_tokens = estimate_tokens(word)
+            if current and current_tokens + word_tokens > self.token_budget:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(word)
+            current_tokens += word_tokens
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
+
+    def split(self, text: str) -> List[str]:
+        """
+        Split text into segments of at most token_budget estimated tokens.
+
+        Blank-line separated blocks are kept together when they fit; otherwise
+        the block is split between lines, and only over-wide lines are split
+        between words.
+
+        Args:
+            text: Page text
+
+        Returns:
+            List of segments (a single element when no split is needed)
+        """
+        if not self.needs_split(text):
+            return [text]
+
+        blocks = [block.splitlines() for block in re.split(r"\n\s*\n", text) if block.strip()]
+        segments: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+
+        def close_segment() -> None:
+            nonlocal current, current_tokens
+            if not current:
+                return
+            segments.append(current)
+            carry = current[-self.overlap_lines:] if self.overlap_lines else []
+            # Never carry more context than half a segment
+            carry = [line for line in carry if estimate_tokens(line) <= self.token_budget // 2]
+            current = list(carry)
+            current_tokens = sum(estimate_tokens(line) for line in current)
+
+        for block in blocks:
+            block_tokens = sum(estimate_tokens(line) for line in block)
+            if current_tokens + block_tokens <= self.token_budget:
+                current.extend(block)
+                current_tokens += block_tokens
+                continue
+            if block_tokens <= self.token_budget:
+                # Start the block in a fresh segment rather than splitting it
+                close_segment()
+                if current_tokens + block_tokens > self.token_budget:
+                    current, current_tokens = [], 0
+                current.extend(block)
+                current_tokens += block_tokens
+                continue
+            for line in block:
+                for piece in (self._split_long_line(line) if estimate_tokens(line) > self.token_budget else [line]):
+                    piece_tokens = estimate_tokens(piece)
+                    if current_tokens + piece_tokens > self.token_budget:
+                        close_segment()
+                        if current_tokens + piece_tokens > self.token_budget:
+                            current, current_tokens = [], 0
+                    current.append(piece)
+                    current_tokens += piece_tokens
+
+        if current and (not segments or current != segments[-1][-len(current):]):
+            segments.append(current)
+
+        return ["\n".join(lines) for lines in segments]
+
+
+# Global text segmenter instance
+text_segmenter = TextSegmenter(settings.llm_segment_token_budget, settings.llm_segment_overlap_lines)
@@ -0,0 +1,29 @@
+"""
+Shared pytest setup.
+
+Unit tests import single service modules. The `app.services` package
+initializer eagerly builds the Firebase, OCR and LLM services, so the package
+is registered without running it; each module is then imported on its own.
+Persistent stores default to memory only, so importing a service never
+writes under ./cache; tests that need a file point it at tmp_path.
+"""
+
+import os
+import sys
+import types
+from pathlib import Path
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("LLM_CACHE_PATH", "")
+os.environ.setdefault("BRAND_KNOWLEDGE_PATH", "")
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+if "app.services" not in sys.modules:
+    import app
+
+    services_package = types.ModuleType("app.services")
+    services_package.__path__ = [str(BACKEND_DIR / "app" / "services")]
+    sys.modules["app.services"] = services_package
+    app.services = services_package
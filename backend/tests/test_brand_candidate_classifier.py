@@ -0,0 +1,18 @@
+"""
+Tests for the brand-likeness classifier used by the model cascade.
+"""
+
+from app.config import settings
+from app.services.brand_candidate_classifier import brand_candidate_classifier
+
+
+def test_context_cue_scores_as_brand_like():
+    scores = brand_candidate_classifier.score("LLAVE MEZCLADORA MARCA ZORVEK MODELO ZX-200", ["zorvek"])
+
+    assert scores["zorvek"] >= settings.llm_cascade_brand_like_threshold
+
+
+def test_inflected_vocabulary_scores_low():
+    scores = brand_candidate_classifier.score("VER DETALLE DE INSTALACION EN PLANO", ["instalacion"])
+
+    assert scores["instalacion"] < settings.llm_cascade_brand_like_threshold
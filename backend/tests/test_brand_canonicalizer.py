@@ -0,0 +1,49 @@
+"""
+Tests for document-level brand canonicalization and review vote counting.
+"""
+
+from app.config import settings
+from app.services.brand_canonicalizer import brand_canonicalizer
+from app.services.brand_knowledge_base import BrandKnowledgeBase
+
+
+def _clusters(detections):
+    return {brand.name: set(brand.aliases) for brand in brand_canonicalizer.cluster(detections)}
+
+
+def test_known_spellings_resolve_to_gazetteer_brand():
+    clusters = _clusters({1: ["SCHNEIDER"], 2: ["Schneider Electric", "SCHNElDER"]})
+
+    assert clusters == {"Schneider Electric": {"SCHNEIDER", "Schneider Electric", "SCHNElDER"}}
+
+
+def test_head_name_joins_its_single_longer_form():
+    clusters = _clusters({1: ["ACME"], 2: ["Acme Industrial", "Acme"]})
+
+    assert clusters == {"Acme Industrial": {"ACME", "Acme", "Acme Industrial"}}
+
+
+def test_generic_head_does_not_merge_distinct_brands():
+    clusters = _clusters({1: ["Grupo", "Grupo Zafiro"], 2: ["Grupo Lamosa"]})
+
+    assert set(clusters) == {"Grupo", "Grupo Zafiro", "Grupo Lamosa"}
+
+
+def test_shared_head_does_not_chain_two_brands():
+    clusters = _clusters({1: ["Zeta", "Zeta Tools"], 2: ["Zeta Pumps"]})
+
+    assert set(clusters) == {"Zeta", "Zeta Tools", "Zeta Pumps"}
+
+
+def test_common_word_is_not_resolved_to_a_brand():
+    assert brand_canonicalizer.resolve_known("Construida") is None
+
+
+def test_votes_count_once_per_document(monkeypatch):
+    monkeypatch.setattr(settings, "brand_knowledge_enabled", False)
+    knowledge_base = BrandKnowledgeBase()
+    single_document = {"votes": {"doc-1:1": "confirmed", "doc-1:2": "confirmed", "doc-1:7": "confirmed"}}
+    two_documents = {"votes": {"doc-1:1": "confirmed", "doc-2:4": "confirmed"}}
+
+    assert knowledge_base.status_of(single_document) == "pending"
+    assert knowledge_base.status_of(two_documents) == "confirmed"
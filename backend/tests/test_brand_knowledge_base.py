@@ -0,0 +1,48 @@
+"""
+Tests for the review knowledge base.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.config import settings
+from app.services import brand_knowledge_base as knowledge_module
+from app.services.brand_gazetteer import BrandGazetteer
+from app.services.brand_knowledge_base import BrandKnowledgeBase
+
+
+@pytest.fixture
+def knowledge_base(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "brand_knowledge_enabled", True)
+    monkeypatch.setattr(settings, "brand_knowledge_path", str(tmp_path / "brand_knowledge.json"))
+    monkeypatch.setattr(settings, "brand_knowledge_min_reviews", 2)
+    # Confirmed names become gazetteer patterns; keep them out of the shared instance
+    monkeypatch.setattr(knowledge_module, "brand_gazetteer", BrandGazetteer())
+    return BrandKnowledgeBase()
+
+
+def test_review_with_aliases_is_written_once(knowledge_base, monkeypatch):
+    writes = []
+    write = knowledge_base._write
+    monkeypatch.setattr(knowledge_base, "_write", lambda payload: (writes.append(payload), write(payload)))
+
+    statuses = asyncio.run(knowledge_base.record_reviews(
+        "doc-1", [(1, "Helvex"), (3, "HELVEX S.A."), (4, "Helvx")], "confirmed", canonical_brand="Helvex"
+    ))
+
+    assert len(writes) == 1
+    assert set(statuses) == {"Helvex", "HELVEX S.A.", "Helvx"}
+    with open(knowledge_base.path, encoding="utf-8") as knowledge_file:
+        assert len(json.load(knowledge_file)["entries"]) == 3
+
+
+def test_one_document_counts_once_toward_min_reviews(knowledge_base):
+    statuses = asyncio.run(knowledge_base.record_reviews(
+        "doc-1", [(1, "Zorvek"), (2, "Zorvek")], "confirmed"
+    ))
+    assert statuses["Zorvek"] == "pending"
+
+    statuses = asyncio.run(knowledge_base.record_reviews("doc-2", [(5, "Zorvek")], "confirmed"))
+    assert statuses["Zorvek"] == "confirmed"
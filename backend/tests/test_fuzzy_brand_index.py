@@ -0,0 +1,63 @@
+"""
+Tests for the OCR-noise-tolerant fuzzy brand index.
+"""
+
+import pytest
+
+from app.services.brand_gazetteer import brand_gazetteer
+from app.services.fuzzy_brand_index import FuzzyBrandIndex
+
+
+@pytest.fixture
+def index():
+    fuzzy_index = FuzzyBrandIndex()
+    fuzzy_index.build(brand_gazetteer.patterns)
+    return fuzzy_index
+
+
+@pytest.mark.parametrize("token, brand", [
+    ("schnelder", "Schneider Electric"),
+    ("phi1ips", "Philips"),
+    ("5iemens", "Siemens"),
+    ("siernens", "Siemens"),
+    ("h0neywell", "Honeywell"),
+    ("rotop1as", "Rotoplas"),
+    ("he1vex", "Helvex"),
+])
+def test_ocr_variants_resolve_to_brand(index, token, brand):
+    assert index.lookup(token) == brand
+
+
+@pytest.mark.parametrize("token", [
+    "porcelanato",
+    "construida",
+    "legrande",
+    "construccion",
+    "carrera",
+    "helvetica",
+])
+def test_common_words_do_not_match(index, token):
+    assert index.lookup(token) is None
+
+
+def test_plain_spanish_text_yields_no_brands():
+    scan = brand_gazetteer.scan("PISO DE PORCELANATO 60X60 EN AREA CONSTRUIDA")
+
+    assert scan.brands == []
+    assert scan.fuzzy_matches == {}
+    assert not scan.can_skip_llm
+
+
+def test_fuzzy_only_hit_does_not_skip_llm():
+    scan = brand_gazetteer.scan("TABLERO SCHNElDER")
+
+    assert scan.brands == ["Schneider Electric"]
+    assert scan.fuzzy_matches == {"schnelder": "Schneider Electric"}
+    assert not scan.can_skip_llm
+
+
+def test_exact_hit_can_skip_llm():
+    scan = brand_gazetteer.scan("TABLERO SCHNEIDER")
+
+    assert scan.brands == ["Schneider Electric"]
+    assert scan.can_skip_llm
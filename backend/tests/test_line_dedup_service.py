@@ -0,0 +1,33 @@
+"""
+Tests for document-level line deduplication.
+"""
+
+from app.services.line_dedup_service import DocumentLineDeduplicator
+
+
+def test_lines_differing_in_a_brand_word_are_kept_apart():
+    deduplicator = DocumentLineDeduplicator()
+    pages = {
+        1: "TODAS LAS UNIDADES CONDENSADORAS DE AIRE ACONDICIONADO SERAN MARCA TRANE O SIMILAR APROBADO POR LA SUPERVISION DE OBRA",
+        2: "TODAS LAS UNIDADES CONDENSADORAS DE AIRE ACONDICIONADO SERAN MARCA CRANE O SIMILAR APROBADO POR LA SUPERVISION DE OBRA",
+    }
+
+    lines, stats = deduplicator.deduplicate(pages)
+    page_brands, unmapped = deduplicator.map_brands_to_pages(["Trane", "Crane"], lines)
+
+    assert stats["near_duplicate_lines"] == 0
+    assert page_brands == {1: ["Trane"], 2: ["Crane"]}
+    assert unmapped == 0
+
+
+def test_lines_differing_in_codes_and_ocr_confusions_fold():
+    deduplicator = DocumentLineDeduplicator()
+
+    assert deduplicator._is_safe_near_duplicate(
+        "todas las luminarias seran marca philips modelo 4x32",
+        "todas las luminarias seran marca phi1ips modelo 4x28",
+    )
+    assert not deduplicator._is_safe_near_duplicate(
+        "marca trane modelo 4ttr para azotea",
+        "marca crane modelo 4ttr para azotea",
+    )
@@ -0,0 +1,64 @@
+"""
+Tests for the LLM response cache.
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.services.llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(settings, "llm_cache_path", str(tmp_path / "llm_cache.sqlite"))
+    return LLMResponseCache()
+
+
+def test_concurrent_identical_requests_share_one_computation(cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"brands": ["Helvex"]}
+
+    async def scenario():
+        return await asyncio.gather(cache.get_or_compute("key", compute), cache.get_or_compute("key", compute))
+
+    (first, first_source), (second, second_source) = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert first == second == {"brands": ["Helvex"]}
+    assert {first_source, second_source} == {"miss", "in_flight"}
+
+
+def test_waiter_is_released_when_owner_is_cancelled(cache):
+    async def compute():
+        await asyncio.sleep(10)
+        return {"brands": []}
+
+    async def scenario():
+        owner = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(cache.get_or_compute("key", compute))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(waiter, timeout=1)
+        assert "key" not in cache._in_flight
+
+    asyncio.run(scenario())
+
+
+def test_replay_mode_uses_memory_tier_only(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "llm_cache_enabled", True)
+    monkeypatch.setattr(settings, "llm_cache_path", str(tmp_path / "llm_cache.sqlite"))
+    monkeypatch.setattr(settings, "llm_replay_mode", "replay")
+
+    cache = LLMResponseCache()
+
+    assert cache._connection is None
+    assert not (tmp_path / "llm_cache.sqlite").exists()
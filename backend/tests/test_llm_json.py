@@ -0,0 +1,56 @@
+"""
+Tests for tolerant LLM JSON parsing.
+"""
+
+from app.services.llm_json import parse_llm_json
+
+
+def test_plain_object():
+    parsed = parse_llm_json('{"brands_detected": ["Helvex", "Urrea"]}')
+
+    assert parsed.ok
+    assert parsed.complete
+    assert parsed.value == {"brands_detected": ["Helvex", "Urrea"]}
+
+
+def test_object_inside_prose_and_code_fence():
+    parsed = parse_llm_json('Here is the result:\n```json\n{"brands_detected": ["Trane"]}\n```\nLet me know.')
+
+    assert parsed.complete
+    assert parsed.value == {"brands_detected": ["Trane"]}
+
+
+def test_stray_brace_in_prose_is_skipped():
+    parsed = parse_llm_json('Brands {see below}: {"brands_detected": []}')
+
+    assert parsed.complete
+    assert parsed.value == {"brands_detected": []}
+
+
+def test_trailing_comma_is_tolerated():
+    parsed = parse_llm_json('{"brands_detected": ["Helvex", "Urrea",],}')
+
+    assert parsed.complete
+    assert parsed.value == {"brands_detected": ["Helvex", "Urrea"]}
+
+
+def test_truncated_output_keeps_complete_prefix():
+    parsed = parse_llm_json('{"brands_detected": ["Helvex", "Urrea", "Rotop')
+
+    assert parsed.ok
+    assert not parsed.complete
+    assert parsed.value == {"brands_detected": ["Helvex", "Urrea"]}
+
+
+def test_truncated_packed_output_drops_open_section():
+    parsed = parse_llm_json('{"pages": {"1": {"brands_detected": ["Trane"]}, "2": {"brands_detected": ["Car')
+
+    assert not parsed.complete
+    assert parsed.value["pages"]["1"] == {"brands_detected": ["Trane"]}
+
+
+def test_no_json():
+    for text in (None, "", "No brands found.", "[1, 2, 3]"):
+        parsed = parse_llm_json(text)
+        assert not parsed.ok
+        assert parsed.value is None
@@ -0,0 +1,17 @@
+"""
+Tests for LLM provider pool creation.
+"""
+
+import pytest
+
+from app.config import settings
+from app.services.llm_providers import create_provider_pool
+
+
+@pytest.mark.parametrize("base_url", ["", "   ", " , "])
+def test_openai_compatible_without_base_url_fails_at_startup(base_url, monkeypatch):
+    monkeypatch.setattr(settings, "llm_provider", "openai_compatible")
+    monkeypatch.setattr(settings, "llm_openai_base_url", base_url)
+
+    with pytest.raises(ValueError, match="LLM_OPENAI_BASE_URL"):
+        create_provider_pool("local-model")
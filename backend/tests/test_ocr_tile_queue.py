@@ -0,0 +1,59 @@
+"""
+Tests for the shared OCR tile queue.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.config import settings
+from app.services.ocr_tile_queue import OCRTileQueue
+
+
+@pytest.fixture
+def tile_queue(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_tile_workers", 2)
+    monkeypatch.setattr(settings, "ocr_tile_queue_size", 2)
+    return OCRTileQueue()
+
+
+def test_tiles_are_produced_lazily_and_results_keep_tile_order(tile_queue):
+    produced = []
+    max_ahead = []
+    finished = []
+
+    def tiles():
+        for index in range(10):
+            produced.append(index)
+            max_ahead.append(len(produced) - len(finished))
+            yield index
+
+    async def runner(tile):
+        await asyncio.sleep(0.001 * (10 - tile))
+        finished.append(tile)
+        return tile * 2
+
+    results = asyncio.run(tile_queue.run_page(tiles(), runner))
+
+    assert results == [index * 2 for index in range(10)]
+    # Never more tiles alive than the buffer plus the workers (plus the one being enqueued)
+    assert max(max_ahead) <= tile_queue.queue_size + tile_queue.workers + 1
+
+
+def test_blocking_calls_run_off_the_event_loop(tile_queue):
+    loop_thread = threading.get_ident()
+
+    async def runner(tile):
+        return await tile_queue.run_blocking(threading.get_ident)
+
+    results = asyncio.run(tile_queue.run_page(iter(range(4)), runner))
+
+    assert all(thread != loop_thread for thread in results)
+
+
+def test_empty_page_returns_immediately(tile_queue):
+    async def runner(tile):
+        return tile
+
+    assert asyncio.run(tile_queue.run_page(iter([]), runner)) == []
@@ -0,0 +1,27 @@
+"""
+Tests for LLM payload pruning.
+"""
+
+import pytest
+
+from app.services.prompt_pruning import prompt_pruner
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("SELLADOR MARCA 3M", "SELLADOR MARCA 3M"),
+    ("TUBERIA MARCA 4W", "MARCA 4W"),
+    ("IMPERMEABILIZANTE MARCA: 3M", "MARCA: 3M"),
+])
+def test_token_after_brand_cue_is_kept(text, expected):
+    assert prompt_pruner.prune(text)[0] == expected
+
+
+def test_measurements_are_removed():
+    pruned, stats = prompt_pruner.prune("LOSA 3.50m ESPESOR 12cm PENDIENTE 2% 45°")
+
+    assert pruned == ""
+    assert stats["measurements"] == 4
+
+
+def test_uppercase_code_is_not_a_measurement():
+    assert prompt_pruner.prune("CINTA AISLANTE 3M")[0] == "CINTA AISLANTE 3M"
@@ -0,0 +1,34 @@
+"""
+Tests for LLM error classification in the rate limiter.
+"""
+
+import asyncio
+
+import httpx
+
+from app.services.rate_limiter import is_throttling_error, is_transient_error
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_throttling_responses_are_not_transient_retries():
+    assert is_throttling_error(StatusError(429))
+    assert is_throttling_error(StatusError(503))
+    assert not is_throttling_error(StatusError(500))
+
+
+def test_server_errors_transport_errors_and_timeouts_are_transient():
+    assert is_transient_error(StatusError(500))
+    assert is_transient_error(StatusError(502))
+    assert is_transient_error(httpx.ConnectError("connection refused"))
+    assert is_transient_error(httpx.ReadTimeout("read timed out"))
+    assert is_transient_error(asyncio.TimeoutError())
+
+
+def test_client_errors_are_not_retried():
+    assert not is_transient_error(StatusError(400))
+    assert not is_transient_error(ValueError("invalid schema"))
@@ -18,7 +18,7 @@ export interface BrandDetection {
   page_number: number;
   brands_detected: string[];
   processing_time: number;
-  status: 'pending' | 'processing' | 'completed' | 'failed';
+  status: 'pending' | 'processing' | 'completed' | 'llm_failed' | 'failed';
   brands_review_status: Record<string, boolean>;
 }
 